@@ -0,0 +1,207 @@
+"""Array-based time-phased allocation for the OneStream outlook load file.
+
+The original allocator walked every well x category x month in Python and
+re-parsed each month label with pd.to_datetime on every call.  This module
+builds the month calendar once as datetime64 arrays and computes the day
+overlap between every well's phase window and every month in a single
+broadcast, producing a wells x categories x months matrix that is then
+flattened into the load_file DataFrame.  Phase dates come from the loader's
+cached schedule pivot (utils.data_loader.load_phase_dates).
+"""
+
+from collections import namedtuple
+from datetime import date
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from agent.engine import COST_CATEGORIES
+from utils.data_loader import SCHEDULE_PHASES
+
+CATEGORY_LABELS = {
+    "drill": "Drilling",
+    "comp": "Completions",
+    "fb": "Flowback",
+    "hu": "Hookup",
+}
+
+CATEGORY_ALLOCATION = {
+    "drill": "linear",
+    "comp": "linear",
+    "fb": "linear",
+    "hu": "lump_sum",
+}
+
+CATEGORY_PHASE_MAP = {
+    "drill": ("Spud", "TD"),
+    "comp": ("Frac Start", "Frac End"),
+    "fb": ("Frac End", "First Production"),
+    "hu": ("First Production", "First Production"),
+}
+
+MonthCalendar = namedtuple("MonthCalendar", ["labels", "starts", "ends"])
+
+
+@lru_cache(maxsize=32)
+def month_calendar(reference_date: date, n_months: int) -> MonthCalendar:
+    """Month labels ('Feb-26') plus datetime64[D] first/last-day arrays.
+
+    Cached per (reference_date, n_months); the arrays are read-only.
+    """
+    first = np.datetime64(reference_date.replace(day=1), "M")
+    months = first + np.arange(n_months)
+    starts = months.astype("datetime64[D]")
+    ends = (months + 1).astype("datetime64[D]") - np.timedelta64(1, "D")
+    starts.flags.writeable = False
+    ends.flags.writeable = False
+    labels = tuple(pd.Timestamp(m).strftime("%b-%y") for m in starts)
+    return MonthCalendar(labels, starts, ends)
+
+
+def future_outlook_matrix(cf: pd.DataFrame) -> np.ndarray:
+    """wells x categories matrix of future outlook from a close frame."""
+    return cf[[f"{cat}_future_outlook" for cat in COST_CATEGORIES]].to_numpy(dtype=float)
+
+
+def allocation_matrix(
+    future: np.ndarray,
+    phase_dates: np.ndarray,
+    scheduled: np.ndarray,
+    calendar: MonthCalendar,
+) -> np.ndarray:
+    """Allocate future outlook to months: returns a wells x categories x months array.
+
+    phase_dates is wells x SCHEDULE_PHASES datetime64[D] (NaT = missing phase)
+    and scheduled flags wells that have any schedule at all.
+
+    - linear categories spread by day across the phase window
+    - lump-sum categories land 100% in the end-phase month
+    - wells with positive outlook but nothing inside the window are spread
+      evenly across all months
+    Every cell is rounded to cents.
+    """
+    return spread_outside_window(future, phase_allocation(future, phase_dates, scheduled, calendar))
+
+
+def phase_allocation(
+    future: np.ndarray,
+    phase_dates: np.ndarray,
+    scheduled: np.ndarray,
+    calendar: MonthCalendar,
+) -> np.ndarray:
+    """allocation_matrix without the spread-evenly fallback.
+
+    Each month's cell depends only on that month, so a slice of the result
+    for a wider calendar equals the result for the narrower one.
+    """
+    n_wells = future.shape[0]
+    n_months = len(calendar.labels)
+    m_start = calendar.starts[None, :]
+    m_end = calendar.ends[None, :]
+    phase_idx = {p: i for i, p in enumerate(SCHEDULE_PHASES)}
+
+    alloc = np.zeros((n_wells, len(COST_CATEGORIES), n_months))
+    for c, cat in enumerate(COST_CATEGORIES):
+        fut = future[:, c]
+        start_phase, end_phase = CATEGORY_PHASE_MAP[cat]
+        end = phase_dates[:, phase_idx[end_phase]]
+        active = scheduled & (fut > 0) & ~np.isnat(end)
+
+        if CATEGORY_ALLOCATION[cat] == "linear":
+            start = phase_dates[:, phase_idx[start_phase]]
+            active &= ~np.isnat(start) & (start < end)
+            total_days = (end - start).astype("timedelta64[D]").astype(float) + 1
+            ov_start = np.maximum(start[:, None], m_start)
+            ov_end = np.minimum(end[:, None], m_end)
+            days = (ov_end - ov_start).astype("timedelta64[D]").astype(float) + 1
+            with np.errstate(divide="ignore", invalid="ignore"):
+                cells = np.round((fut / total_days)[:, None] * days, 2)
+            alloc[:, c, :] = np.where(active[:, None] & (days > 0), cells, 0.0)
+        else:  # lump_sum
+            hit = end.astype("datetime64[M]")[:, None] == calendar.starts.astype("datetime64[M]")[None, :]
+            alloc[:, c, :] = np.where(active[:, None] & hit, np.round(fut, 2)[:, None], 0.0)
+    return alloc
+
+
+def spread_outside_window(future: np.ndarray, alloc: np.ndarray) -> np.ndarray:
+    """Spread positive outlook evenly where nothing landed inside the window."""
+    n_months = alloc.shape[2]
+    spread = (future > 0) & ~alloc.any(axis=2)
+    if n_months:
+        per_month = np.round(future / n_months, 2)
+        alloc = np.where(spread[:, :, None], per_month[:, :, None], alloc)
+    return alloc
+
+
+def period_allocations(
+    future: np.ndarray,
+    phase_dates: np.ndarray,
+    scheduled: np.ndarray,
+    reference_dates: list,
+    n_months: int,
+) -> dict:
+    """allocation_matrix for several reference dates from one broadcast.
+
+    The phase allocation runs once over a calendar spanning every window;
+    each reference date then takes its n_months slice and applies the
+    spread-evenly fallback.  Returns {reference_date: (calendar, alloc)}.
+    """
+    months = {d: np.datetime64(d.replace(day=1), "M") for d in reference_dates}
+    first = min(months.values(), default=None)
+    if first is None:
+        return {}
+    span = int((max(months.values()) - first).astype(int)) + n_months
+    union = phase_allocation(
+        future, phase_dates, scheduled, month_calendar(first.astype(object), span),
+    )
+    results = {}
+    for d, month in months.items():
+        offset = int((month - first).astype(int))
+        window = union[:, :, offset:offset + n_months]
+        results[d] = (month_calendar(d, n_months), spread_outside_window(future, window))
+    return results
+
+
+def load_file_frame(
+    wells: pd.DataFrame,
+    alloc: np.ndarray,
+    calendar: MonthCalendar,
+) -> pd.DataFrame:
+    """Flatten a wells x categories x months matrix into the OneStream load file."""
+    n_wells, n_cats, n_months = alloc.shape
+    months = list(calendar.labels)
+    flat = alloc.reshape(n_wells * n_cats, n_months)
+
+    # Sum month by month (not np.sum) so totals match the sequential sum
+    # the per-row allocator used before rounding.
+    total = np.zeros(n_wells * n_cats)
+    for j in range(n_months):
+        total = total + flat[:, j]
+
+    load_df = pd.DataFrame({
+        "well_name": np.repeat(wells["well_name"].to_numpy(), n_cats),
+        "wbs_element": np.repeat(wells["wbs_element"].to_numpy(), n_cats),
+        "cost_category": np.tile([CATEGORY_LABELS[c] for c in COST_CATEGORIES], n_wells),
+    })
+    load_df = pd.concat(
+        [load_df, pd.DataFrame(flat, columns=months)], axis=1,
+    )
+    load_df["total"] = np.round(total, 2)
+    return load_df
+
+
+def allocate_load_file(
+    cf: pd.DataFrame,
+    phase_dates: np.ndarray,
+    scheduled: np.ndarray,
+    calendar: MonthCalendar,
+) -> pd.DataFrame:
+    """Vectorized equivalent of the per-well outlook load-file loop.
+
+    cf is a close frame (agent.engine.build_close_frame), so the future
+    outlook per category is read rather than recomputed; phase_dates and
+    scheduled are row-aligned with cf.
+    """
+    alloc = allocation_matrix(future_outlook_matrix(cf), phase_dates, scheduled, calendar)
+    return load_file_frame(cf, alloc, calendar)
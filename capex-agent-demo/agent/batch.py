@@ -0,0 +1,88 @@
+"""Batch multi-period close runner.
+
+Re-running a year of closes used to mean calling every tool once per period
+with REFERENCE_DATE edited in between.  run_close_batch takes the list of
+periods and shares everything that doesn't depend on the period:
+
+- the close frame (one kernel pass) — net-down and the outlook step are the
+  same for every period and are computed once;
+- Large Swing baselines for all periods as one wells x periods matrix (the
+  previous period's snapshot where the store has one, else the master's
+  prior_gross_accrual), with swing flags from one broadcast;
+- the outlook load files from one phase allocation over a calendar spanning
+  every period's month window (agent.allocation.period_allocations).
+
+Only the per-period exception records, load-file frames and journal entries
+are built in a loop.
+"""
+
+import numpy as np
+
+from agent.allocation import future_outlook_matrix, load_file_frame, period_allocations
+from agent.engine import LARGE_SWING_THRESHOLD, accruals_view, net_down_view, outlook_view
+from agent.tools import close_view, journal_entry_for
+from utils.data_loader import load_phase_dates
+from utils.snapshots import list_periods, load_accrual_history, period_start, previous_period
+
+
+def prior_matrix(cf, periods: list) -> np.ndarray:
+    """wells x periods Large Swing baselines (dollars) for a close frame."""
+    prior = np.repeat(cf["prior_gross_accrual"].to_numpy(dtype=float)[:, None], len(periods), axis=1)
+    stored = set(list_periods())
+    columns = [j for j, p in enumerate(periods) if previous_period(p) in stored]
+    if columns:
+        history = load_accrual_history(
+            [previous_period(periods[j]) for j in columns], cf["wbs_element"],
+        )
+        # A well missing from the snapshot has no prior (0), as in
+        # utils.snapshots.prior_accrual_cents
+        prior[:, columns] = np.nan_to_num(history.values, nan=0.0)
+    return prior
+
+
+def run_close_batch(periods, business_unit: str = "all", months_forward: int = 6) -> dict:
+    """Run accruals, net-down, outlook, load file and journal entry for each period.
+
+    periods are 'YYYY-MM' labels; each period's load file starts in that
+    month.  Returns {period: {"accruals", "net_down", "outlook", "load_file",
+    "journal_entry"}}; net_down and outlook are the same dicts for every
+    period.
+    """
+    periods = list(dict.fromkeys(periods))
+    starts = {p: period_start(p) for p in periods}
+    cf = close_view(business_unit)
+    rows = cf.index.to_numpy()
+
+    net_down = net_down_view(cf)
+    outlook = outlook_view(cf)
+
+    prior = prior_matrix(cf, periods)
+    total_gross = cf["total_gross_accrual"].to_numpy()[:, None]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        swing = np.abs(total_gross - prior) / prior
+    negative = cf["negative_accrual"].to_numpy()[:, None]
+    large_swing = ~negative & (prior > 0) & (swing > LARGE_SWING_THRESHOLD)
+
+    phases = load_phase_dates()
+    allocations = period_allocations(
+        future_outlook_matrix(cf), phases.dates[rows], phases.scheduled[rows],
+        list(starts.values()), months_forward,
+    )
+
+    results = {}
+    for j, period in enumerate(periods):
+        accruals = accruals_view(cf.assign(
+            prior_gross_accrual=prior[:, j], swing=swing[:, j], large_swing=large_swing[:, j],
+        ))
+        calendar, alloc = allocations[starts[period]]
+        results[period] = {
+            "accruals": accruals,
+            "net_down": net_down,
+            "outlook": outlook,
+            "load_file": {
+                "load_file": load_file_frame(cf, alloc, calendar),
+                "months": list(calendar.labels),
+            },
+            **journal_entry_for(period, accruals["summary"], net_down["summary"]),
+        }
+    return results
@@ -0,0 +1,250 @@
+"""Token-budgeted encoders for tool results sent back to Claude.
+
+Every tool result goes through encode_result() before it becomes a
+tool_result block.  A result that fits the budget is sent as is (compact
+JSON).  A larger one is shrunk step by step, and is always valid JSON:
+
+1. its row lists ("tables") go columnar: {"columns": [...], "rows": [[...]]}
+   instead of repeating every key on every row;
+2. columns are pruned to the ones the agent reasons with (TableSpec.keep);
+   get_well_detail still has the full row for any single well;
+3. rows are ordered by size (TableSpec.sort_by) and cut to the largest page
+   that fits, with the table's total row count and a next_cursor the agent
+   can pass back (the tool's `cursor` input) for the following page;
+4. tables with an aggregate get whole-table totals (e.g. by business unit)
+   so the summary stays complete when the rows do not.
+
+Everything outside the tables (summaries, counts) is always kept.  A tool
+without tables whose result is over the budget keeps its top-level fields,
+in order, while they fit; the rest are named in omitted_fields next to a
+truncated marker.  The encoded size is measured exactly (compact
+json.dumps), and a page is serialized row by row as it is filled, so past
+the sort the cost follows what is sent, not the well count.  The budget is
+in tokens, estimated at CHARS_PER_TOKEN.
+"""
+
+import json
+import os
+from collections import namedtuple
+
+from agent.engine import COST_CATEGORIES
+
+# About the 50,000 characters results used to be cut at, so results that
+# were sent whole before still are
+RESULT_TOKEN_BUDGET = 12_500
+CHARS_PER_TOKEN = 4
+
+TableSpec = namedtuple("TableSpec", ["field", "keep", "sort_by", "aggregate"], defaults=(None, None, None))
+TableSpec.__doc__ = """A row list inside a tool result.
+
+field: key of the list in the result; keep: columns kept once pruning is
+needed (None keeps all); sort_by: column whose absolute value orders the
+rows, largest first, before paging (None keeps tool order); aggregate:
+rows -> dict of whole-table totals, added when the table is paged.
+"""
+
+PAGE_NOTE = (
+    "Large result: tables are columnar, pruned and paged. Pass a table's next_cursor "
+    "as `cursor` to get its next rows; use get_well_detail for every column of one well."
+)
+
+TRUNCATED_NOTE = (
+    "Large result: only the fields that fit were sent; omitted_fields names the rest. "
+    "Narrow the call (e.g. one business_unit) to see them."
+)
+
+KEY_COLUMNS = ["wbs_element", "well_name", "business_unit"]
+EXCEPTION_COLUMNS = ["wbs_element", "well_name", "exception_type", "severity", "detail"]
+
+
+def _master_by_bu(rows: list) -> dict:
+    """Well count and budget/ITD/VOW per business unit over all master rows."""
+    totals = {}
+    for row in rows:
+        bu = totals.setdefault(row.get("business_unit"), {"well_count": 0, "budget": 0.0,
+                                                           "itd": 0.0, "vow": 0.0})
+        bu["well_count"] += 1
+        for measure in ("budget", "itd", "vow"):
+            bu[measure] += sum(row.get(f"{cat}_{measure}") or 0 for cat in COST_CATEGORIES)
+    return {"by_business_unit": {
+        bu: {k: round(v, 2) if isinstance(v, float) else v for k, v in t.items()}
+        for bu, t in totals.items()
+    }}
+
+
+EXCEPTIONS = TableSpec("exceptions", EXCEPTION_COLUMNS)
+
+TOOL_TABLES = {
+    "load_wbs_master": [
+        TableSpec("rows", KEY_COLUMNS + ["status", "start_date", "wi_pct", "system_wi_pct"],
+                  aggregate=_master_by_bu),
+    ],
+    "calculate_accruals": [
+        TableSpec("accruals", KEY_COLUMNS + ["wi_pct", "total_gross_accrual", "total_net_accrual",
+                                             "prior_gross_accrual"], "total_gross_accrual"),
+        EXCEPTIONS,
+    ],
+    "calculate_net_down": [
+        TableSpec("adjustments", ["wbs_element", "well_name", "system_wi_pct", "actual_wi_pct",
+                                  "net_down_adjustment"], "net_down_adjustment"),
+    ],
+    "calculate_outlook": [
+        TableSpec("outlook", KEY_COLUMNS + ["wi_pct", "total_future_outlook", "total_ops_budget"],
+                  "total_future_outlook"),
+        EXCEPTIONS,
+    ],
+    "get_exceptions": [EXCEPTIONS],
+    "generate_outlook_load_file": [TableSpec("top_10_wells")],
+    "run_scenarios": [TableSpec("scenarios")],
+}
+
+
+def result_budget() -> int:
+    """Per-result token budget from CAPEX_RESULT_TOKENS, else RESULT_TOKEN_BUDGET."""
+    return max(1, int(os.environ.get("CAPEX_RESULT_TOKENS", RESULT_TOKEN_BUDGET)))
+
+
+def _dumps(value) -> str:
+    return json.dumps(value, default=str, separators=(",", ":"))
+
+
+def parse_cursor(cursor: str, tables: list) -> tuple:
+    """(field, offset) of a next_cursor such as "accruals:40"."""
+    field, _, offset = str(cursor).rpartition(":")
+    if field not in {spec.field for spec in tables} or not offset.isdigit():
+        raise ValueError(f"Invalid cursor: {cursor!r}")
+    return field, int(offset)
+
+
+def _columns(rows: list, keep: list | None) -> list:
+    """Column names of a list of row dicts, pruned to keep."""
+    columns = list(rows[0]) if rows else []
+    return columns if keep is None else [c for c in columns if c in keep]
+
+
+def _columnar(rows: list) -> dict:
+    columns = _columns(rows, None)
+    return {"columns": columns, "rows": [[row.get(c) for c in columns] for row in rows]}
+
+
+def _ordered(rows: list, sort_by: str | None) -> list:
+    if sort_by is None:
+        return rows
+    return sorted(rows, key=lambda row: abs(row.get(sort_by) or 0), reverse=True)
+
+
+def _fits(payload: dict, fields: set, budget_chars: int) -> bool:
+    """Whether payload encodes within budget_chars, stopping once it cannot.
+
+    Table rows are sized one at a time, so an oversized result is rejected
+    after about budget_chars of encoding rather than after all of it.
+    """
+    skeleton = {
+        k: ({**v, "rows": []} if isinstance(v, dict) else []) if k in fields else v
+        for k, v in payload.items()
+    }
+    size = len(_dumps(skeleton))
+    for field in fields & payload.keys():
+        rows = payload[field]
+        rows = rows["rows"] if isinstance(rows, dict) else rows
+        for i, row in enumerate(rows):
+            size += len(_dumps(row)) + (1 if i else 0)
+            if size > budget_chars:
+                return False
+    return size <= budget_chars
+
+
+def _paged(result: dict, tables: list, budget_chars: int, cursor: tuple | None) -> dict:
+    """The result with its tables pruned, ordered and cut to fit budget_chars.
+
+    Pages are filled a row at a time, round-robin over the tables, from
+    each row's exact compact size, until a table's next row no longer fits;
+    at least one row of each non-empty table is always sent.
+    """
+    payload = {k: v for k, v in result.items() if k not in {s.field for s in tables}}
+    payload["page_note"] = PAGE_NOTE
+    pages = []
+    for spec in tables:
+        rows = result.get(spec.field)
+        if not isinstance(rows, list):
+            continue
+        offset = 0
+        if cursor is not None:
+            if cursor[0] != spec.field:
+                continue  # already sent on the first page
+            offset = cursor[1]
+        remaining = _ordered(rows, spec.sort_by)[offset:]
+        columns = _columns(remaining, spec.keep)
+        table = {"columns": columns, "rows": [], "total_rows": len(rows), "offset": offset,
+                 "next_cursor": f"{spec.field}:{len(rows)}"}  # longest it can be
+        if spec.aggregate is not None:
+            table.update(spec.aggregate(rows))
+        payload[spec.field] = table
+        pages.append((spec, table, remaining))
+
+    size = len(_dumps(payload))
+    open_pages = list(pages)
+    while open_pages:
+        for page in list(open_pages):
+            _, table, remaining = page
+            n = len(table["rows"])
+            if n == len(remaining):
+                open_pages.remove(page)
+                continue
+            values = [remaining[n].get(c) for c in table["columns"]]
+            cost = len(_dumps(values)) + (1 if n else 0)
+            if n and size + cost > budget_chars:
+                open_pages.remove(page)
+                continue
+            table["rows"].append(values)
+            size += cost
+
+    for spec, table, _ in pages:
+        end = table["offset"] + len(table["rows"])
+        table["next_cursor"] = f"{spec.field}:{end}" if end < table["total_rows"] else None
+    return payload
+
+
+def _truncated(result, budget_chars: int) -> dict:
+    """A result without tables cut to its leading top-level fields that fit.
+
+    A non-dict result is treated as a single field named "result".  The
+    marker and the names of the omitted fields are always sent, even when
+    they alone are over budget_chars.
+    """
+    items = result.items() if isinstance(result, dict) else [("result", result)]
+    payload = {"truncated": True, "note": TRUNCATED_NOTE, "omitted_fields": []}
+    size = len(_dumps(payload))
+    for key, value in items:
+        cost = len(_dumps({key: value})) - 1  # less the braces, plus a comma
+        if size + cost <= budget_chars:
+            payload[key] = value
+            size += cost
+        else:
+            payload["omitted_fields"].append(key)
+            size += len(_dumps(key)) + (1 if len(payload["omitted_fields"]) > 1 else 0)
+    return payload
+
+
+def encode_result(name: str, result, budget_tokens: int | None = None, cursor: str | None = None) -> str:
+    """A tool result as a JSON string within the token budget (see module doc).
+
+    cursor is a next_cursor from an earlier page of the same call; it
+    selects the table and the first row to send.
+    """
+    budget_chars = (result_budget() if budget_tokens is None else budget_tokens) * CHARS_PER_TOKEN
+    tables = TOOL_TABLES.get(name, [])
+    position = parse_cursor(cursor, tables) if cursor is not None else None
+    if not isinstance(result, dict) or not tables:
+        text = _dumps(result)
+        return text if len(text) <= budget_chars else _dumps(_truncated(result, budget_chars))
+
+    if position is None:
+        fields = {spec.field for spec in tables if isinstance(result.get(spec.field), list)}
+        if _fits(result, fields, budget_chars):
+            return _dumps(result)
+        # Columnar with every column and row, if that alone is enough
+        columnar = {k: _columnar(v) if k in fields else v for k, v in result.items()}
+        if _fits(columnar, fields, budget_chars):
+            return _dumps(columnar)
+    return _dumps(_paged(result, tables, budget_chars, position))
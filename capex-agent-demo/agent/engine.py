@@ -0,0 +1,224 @@
+"""Columnar close engine — whole-column versions of the close math.
+
+The tool functions in agent/tools.py originally walked the WBS master with
+df.iterrows() and built a Python dict per well, once per step.  Here the
+close kernel (build_close_frame) computes every derived column for all three
+steps in a single pass and stores them in one "close frame".  The step tools,
+get_well_detail and get_exceptions are then cheap column selections over that
+frame.  Python-level work is limited to formatting the (sparse) exception
+records.
+"""
+
+import numpy as np
+import pandas as pd
+
+from agent.summary import close_totals
+
+COST_CATEGORIES = ["drill", "comp", "fb", "hu"]
+
+LARGE_SWING_THRESHOLD = 0.25  # |current - prior| / prior
+
+# WI% values round-trip through CSV as floats; anything closer than this is
+# treated as a match rather than a (spurious) net-down.
+WI_PCT_TOLERANCE = 1e-6
+
+CLOSE_ID_COLUMNS = [
+    "wbs_element", "well_name", "business_unit", "status", "wi_pct", "system_wi_pct",
+]
+
+ACCRUAL_COLUMNS = (
+    ["wbs_element", "well_name", "business_unit", "wi_pct"]
+    + [f"{cat}_{kind}" for cat in COST_CATEGORIES
+       for kind in ("gross_accrual", "net_accrual")]
+    + ["total_gross_accrual", "total_net_accrual", "prior_gross_accrual"]
+)
+
+NET_DOWN_COLUMNS = [
+    "wbs_element", "well_name", "total_system_cost", "system_wi_pct",
+    "actual_wi_pct", "wi_discrepancy", "net_down_adjustment", "adjusted_net_cost",
+]
+
+OUTLOOK_COLUMNS = (
+    ["wbs_element", "well_name", "business_unit", "wi_pct"]
+    + [f"{cat}_{kind}" for cat in COST_CATEGORIES
+       for kind in ("total_in_system", "ops_budget", "future_outlook")]
+    + ["total_future_outlook", "total_ops_budget"]
+)
+
+WELL_DETAIL_COLUMNS = (
+    CLOSE_ID_COLUMNS
+    + [f"{cat}_{kind}" for cat in COST_CATEGORIES
+       for kind in ("itd", "vow", "gross_accrual", "net_accrual",
+                    "ops_budget", "future_outlook")]
+    + ["total_gross_accrual", "total_net_accrual", "net_down_adjustment",
+       "total_in_system", "total_future_outlook", "prior_gross_accrual"]
+)
+
+
+# ---------------------------------------------------------------------------
+# Close kernel
+# ---------------------------------------------------------------------------
+
+def build_close_frame(df: pd.DataFrame, tolerance: float = WI_PCT_TOLERANCE) -> pd.DataFrame:
+    """Compute every derived close column for all wells in one pass.
+
+    df is a WBS master frame as returned by the loader (money in cents); all
+    money columns in the close frame are dollars.
+
+    Per category: itd, vow, gross/net accrual, total_in_system, ops_budget,
+    future_outlook.  Per well: accrual/outlook/system-cost totals, net-down
+    columns, prior-period swing and the four exception flags
+    (negative_accrual, large_swing, wi_mismatch, over_budget).
+    """
+    wi = df["wi_pct"].to_numpy(dtype=float)
+    system_wi = df["system_wi_pct"].to_numpy(dtype=float)
+
+    def dollars(col):
+        # The loader stores money as int64 cents (utils.data_loader.WBS_SCHEMA)
+        return df[col].to_numpy() / 100
+
+    columns = {c: df[c].to_numpy() for c in CLOSE_ID_COLUMNS}
+    total_gross = 0
+    total_net = 0
+    total_system_cost = 0
+    total_future = 0
+    total_ops = 0
+    for cat in COST_CATEGORIES:
+        itd = dollars(f"{cat}_itd")
+        vow = dollars(f"{cat}_vow")
+        ops = dollars(f"{cat}_ops_budget")
+        gross = vow - itd
+        net = gross * wi
+        in_system = vow * wi
+        future = ops - in_system
+        columns[f"{cat}_itd"] = itd
+        columns[f"{cat}_vow"] = vow
+        columns[f"{cat}_gross_accrual"] = gross
+        columns[f"{cat}_net_accrual"] = net
+        columns[f"{cat}_total_in_system"] = in_system
+        columns[f"{cat}_ops_budget"] = ops
+        columns[f"{cat}_future_outlook"] = future
+        # Accumulate in category order so float totals match the row loops
+        total_gross = total_gross + gross
+        total_net = total_net + net
+        total_system_cost = total_system_cost + vow
+        total_future = total_future + future
+        total_ops = total_ops + ops
+
+    prior = dollars("prior_gross_accrual")
+    discrepancy = system_wi - wi
+    with np.errstate(divide="ignore", invalid="ignore"):
+        swing = np.abs(total_gross - prior) / prior
+    negative = np.asarray(total_gross < 0)
+
+    columns.update({
+        "total_gross_accrual": total_gross,
+        "total_net_accrual": total_net,
+        "total_system_cost": total_system_cost,
+        "total_in_system": total_system_cost * wi,
+        "total_future_outlook": total_future,
+        "total_ops_budget": total_ops,
+        "wi_discrepancy": discrepancy,
+        "net_down_adjustment": total_system_cost * discrepancy,
+        "adjusted_net_cost": total_system_cost * wi,
+        "prior_gross_accrual": prior,
+        "swing": swing,
+        # Large Swing is suppressed on wells that already have a Negative
+        # Accrual — the swing is just a symptom of the negative accrual.
+        "negative_accrual": negative,
+        "large_swing": ~negative & (prior > 0) & (swing > LARGE_SWING_THRESHOLD),
+        "wi_mismatch": np.abs(discrepancy) > tolerance,
+        "over_budget": np.asarray(total_future < 0),
+    })
+    return pd.DataFrame(columns, index=pd.RangeIndex(len(df)))
+
+
+# ---------------------------------------------------------------------------
+# Views over the close frame
+# ---------------------------------------------------------------------------
+
+def accrual_exceptions(cf: pd.DataFrame) -> list:
+    """Negative Accrual / Large Swing exception records, in well order."""
+    hits = cf[cf["negative_accrual"] | cf["large_swing"]]
+    exceptions = []
+    for rec in hits[["wbs_element", "well_name", "total_gross_accrual",
+                     "prior_gross_accrual", "swing", "negative_accrual"]].itertuples(index=False):
+        if rec.negative_accrual:
+            exceptions.append({
+                "wbs_element": rec.wbs_element,
+                "well_name": rec.well_name,
+                "exception_type": "Negative Accrual",
+                "severity": "HIGH",
+                "detail": f"Total gross accrual is negative: ${rec.total_gross_accrual:,.0f}",
+            })
+        else:
+            exceptions.append({
+                "wbs_element": rec.wbs_element,
+                "well_name": rec.well_name,
+                "exception_type": "Large Swing",
+                "severity": "MEDIUM",
+                "detail": (f"Swing of {rec.swing:.0%} vs prior (current=${rec.total_gross_accrual:,.0f}, "
+                           f"prior=${rec.prior_gross_accrual:,.0f})"),
+            })
+    return exceptions
+
+
+def net_down_exceptions(adjustments: list) -> list:
+    """WI% Mismatch exception records for a list of net-down adjustments."""
+    return [
+        {"wbs_element": a["wbs_element"], "well_name": a.get("well_name", ""),
+         "exception_type": "WI% Mismatch", "severity": "MEDIUM",
+         "detail": f"System WI={a['system_wi_pct']:.0%} vs Actual WI={a['actual_wi_pct']:.0%}, "
+                   f"adjustment=${a['net_down_adjustment']:,.0f}"}
+        for a in adjustments
+    ]
+
+
+def outlook_exceptions(cf: pd.DataFrame) -> list:
+    """Over Budget exception records, in well order."""
+    hits = cf[cf["over_budget"]]
+    return [
+        {"wbs_element": rec.wbs_element,
+         "well_name": rec.well_name,
+         "exception_type": "Over Budget",
+         "severity": "HIGH",
+         "detail": f"Total in system exceeds ops budget by ${abs(rec.total_future_outlook):,.0f}"}
+        for rec in hits[["wbs_element", "well_name", "total_future_outlook"]].itertuples(index=False)
+    ]
+
+
+def accruals_view(cf: pd.DataFrame) -> dict:
+    """calculate_accruals result from a close frame."""
+    return {
+        "accruals": cf[ACCRUAL_COLUMNS].to_dict(orient="records"),
+        "summary": close_totals(cf).accrual_summary(),
+        "exceptions": accrual_exceptions(cf),
+    }
+
+
+def net_down_view(cf: pd.DataFrame) -> dict:
+    """calculate_net_down result from a close frame (mismatched wells only)."""
+    nd = cf.loc[cf["wi_mismatch"]].rename(columns={"wi_pct": "actual_wi_pct"})
+    return {
+        "adjustments": nd[NET_DOWN_COLUMNS].to_dict(orient="records"),
+        "summary": close_totals(cf).net_down_summary(),
+    }
+
+
+def outlook_view(cf: pd.DataFrame) -> dict:
+    """calculate_outlook result from a close frame."""
+    return {
+        "outlook": cf[OUTLOOK_COLUMNS].to_dict(orient="records"),
+        "summary": close_totals(cf).outlook_summary(),
+        "exceptions": outlook_exceptions(cf),
+    }
+
+
+def well_detail_view(cf: pd.DataFrame, position: int) -> dict:
+    """get_well_detail waterfall for the well at a row position of the close frame.
+
+    Money values are float dollars like every other view (and to_dollars),
+    including the itd/vow/ops_budget inputs that were ints when the CSVs
+    were read as whole dollars.
+    """
+    return cf.iloc[[position]][WELL_DETAIL_COLUMNS].to_dict(orient="records")[0]
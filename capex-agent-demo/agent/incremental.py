@@ -0,0 +1,203 @@
+"""Incremental close recomputation from per-well deltas.
+
+On a typical daily refresh only a few dozen wells change VOW/ITD.  A
+CloseState holds a materialized close — the close frame, per-BU totals and
+the per-well exception/adjustment records — and apply_delta patches it:
+only the changed wells go through the close kernel, their old contributions
+are subtracted from the BU totals and the new ones added, and their
+exception records are replaced.  Row-level results and exception lists match
+a full recompute; totals (agent.summary.CloseTotals, integer cents) are
+patched rather than re-summed and come out identical to a fresh sum.
+"""
+
+import pandas as pd
+
+from agent.engine import (
+    ACCRUAL_COLUMNS,
+    NET_DOWN_COLUMNS,
+    OUTLOOK_COLUMNS,
+    accrual_exceptions,
+    build_close_frame,
+    net_down_exceptions,
+    net_down_view,
+    outlook_exceptions,
+)
+from agent.summary import CloseTotals, close_totals_by_bu
+
+
+def _splice(cf: pd.DataFrame, positions: dict, new_cf: pd.DataFrame, removed) -> tuple:
+    """(close frame, updated wells, added wells) after a delta.
+
+    Removals apply first, so a well that is both removed and changed is
+    re-added at the end.  These are the row rules of the delta merge in
+    utils.ingest (updates keep their position, new wells are appended in
+    order), so the result lines up with the merged master.  Updated rows
+    are written into cf in place, added and removed rows are appended or
+    dropped, and positions ({wbs_element: row}) is patched to match; new_cf
+    must have one row per well.
+    """
+    removed = [w for w in dict.fromkeys(removed) if w in positions]
+    if removed:
+        rows = sorted(positions.pop(w) for w in removed)
+        cf = cf.drop(index=rows).reset_index(drop=True)
+        # Only the rows after the first removed one move up
+        tail = cf["wbs_element"].iloc[rows[0]:].tolist()
+        positions.update(zip(tail, range(rows[0], rows[0] + len(tail))))
+
+    new_wbs = new_cf["wbs_element"].tolist()
+    updates = [i for i, w in enumerate(new_wbs) if w in positions]
+    updated = [new_wbs[i] for i in updates]
+    if updates:
+        rows = [positions[w] for w in updated]
+        upd = new_cf.iloc[updates]
+        for j, col in enumerate(cf.columns):
+            cf.iloc[rows, j] = upd[col].to_numpy()
+
+    additions = [i for i, w in enumerate(new_wbs) if w not in positions]
+    added = [new_wbs[i] for i in additions]
+    if additions:
+        positions.update(zip(added, range(len(cf), len(cf) + len(added))))
+        cf = pd.concat([cf, new_cf.iloc[additions]], ignore_index=True)
+    return cf, updated, added
+
+
+def _close_rows(changed: pd.DataFrame, like: pd.DataFrame) -> pd.DataFrame:
+    """Close frame rows for changed master rows, one per well (last one wins)."""
+    if not len(changed):
+        return like.iloc[0:0]
+    return build_close_frame(changed.drop_duplicates("wbs_element", keep="last"))
+
+
+def patch_close_frame(cf: pd.DataFrame, changed: pd.DataFrame, removed=()) -> pd.DataFrame:
+    """New close frame with removed wells dropped and changed master rows recomputed.
+
+    Rows follow the delta merge rules (see _splice); cf itself is left
+    untouched.
+    """
+    positions = {w: i for i, w in enumerate(cf["wbs_element"].tolist())}
+    return _splice(cf.copy(), positions, _close_rows(changed, cf), removed)[0]
+
+
+class CloseState:
+    """A patchable close over the full WBS master."""
+
+    def __init__(self, cf: pd.DataFrame):
+        self.cf = cf.reset_index(drop=True).copy()
+        self._reindex()
+        self.by_bu = close_totals_by_bu(self.cf)
+        # Each well has at most one record of each kind
+        self._accrual_exc = {}
+        self._adjustments = {}
+        self._outlook_exc = {}
+        self._add_records(self.cf)
+
+    @classmethod
+    def from_master(cls, df: pd.DataFrame) -> "CloseState":
+        """Full close of a WBS master frame (as returned by the loader)."""
+        return cls(build_close_frame(df))
+
+    # -- patching -----------------------------------------------------------
+
+    def apply_delta(self, changed: pd.DataFrame, removed=()) -> dict:
+        """Patch the close with changed/new master rows and removed wells.
+
+        changed holds complete WBS master rows (loader schema) for wells that
+        were updated or added; removed lists wbs_elements to drop.  Rows
+        follow patch_close_frame: removals first, then updates in place and
+        new wells appended in the given order, so a well both removed and
+        changed is re-added at the end; a well repeated in changed takes its
+        last row.  Updated rows are written into cf in place, so the work
+        follows the delta, not the well count; frames taken from cf earlier
+        (slices, copies) are unaffected under pandas copy-on-write.  Returns
+        the affected wells.
+        """
+        new_cf = _close_rows(changed, self.cf)
+        removed = [w for w in dict.fromkeys(removed) if w in self._pos]
+        gone = set(removed)
+        replaced = [w for w in new_cf["wbs_element"].tolist() if w in self._pos and w not in gone]
+        bus_before = list(self.by_bu)
+
+        # Totals: back out the old rows, add the new ones
+        old_rows = self.cf.iloc[[self._pos[w] for w in replaced + removed]]
+        self._patch_totals(old_rows, -1)
+        self._patch_totals(new_cf, +1)
+        self._drop_records(replaced + removed)
+        self._add_records(new_cf)
+
+        self.cf, updated, added = _splice(self.cf, self._pos, new_cf, removed)
+
+        for bu in [bu for bu, t in self.by_bu.items() if t.well_count == 0]:
+            del self.by_bu[bu]
+        if list(self.by_bu) != bus_before:
+            # Keep BUs in first-appearance order, as a fresh groupby would
+            order = self.cf["business_unit"].drop_duplicates().tolist()
+            self.by_bu = {bu: self.by_bu[bu] for bu in order}
+
+        return {"updated": updated, "added": added, "removed": removed}
+
+    def _reindex(self):
+        self._pos = {w: i for i, w in enumerate(self.cf["wbs_element"].tolist())}
+
+    def _patch_totals(self, rows: pd.DataFrame, sign: int):
+        if not len(rows):
+            return
+        for bu, totals in close_totals_by_bu(rows).items():
+            current = self.by_bu.get(bu, CloseTotals())
+            self.by_bu[bu] = current + totals if sign > 0 else current - totals
+
+    def _drop_records(self, wells):
+        for w in wells:
+            self._accrual_exc.pop(w, None)
+            self._adjustments.pop(w, None)
+            self._outlook_exc.pop(w, None)
+
+    def _add_records(self, cf: pd.DataFrame):
+        for rec in accrual_exceptions(cf):
+            self._accrual_exc[rec["wbs_element"]] = rec
+        for rec in net_down_view(cf)["adjustments"]:
+            self._adjustments[rec["wbs_element"]] = rec
+        for rec in outlook_exceptions(cf):
+            self._outlook_exc[rec["wbs_element"]] = rec
+
+    def _ordered(self, records: dict) -> list:
+        return [records[w] for w in sorted(records, key=self._pos.__getitem__)]
+
+    # -- results (same shapes as the agent tools, business_unit="all") ------
+
+    def totals(self) -> CloseTotals:
+        return CloseTotals.merge_all(self.by_bu.values())
+
+    def accruals(self) -> dict:
+        exceptions = self._ordered(self._accrual_exc)
+        return {
+            "accruals": self.cf[ACCRUAL_COLUMNS].to_dict(orient="records"),
+            "summary": self.totals().accrual_summary(),
+            "exceptions": exceptions,
+        }
+
+    def net_down(self) -> dict:
+        adjustments = [{k: a[k] for k in NET_DOWN_COLUMNS}
+                       for a in self._ordered(self._adjustments)]
+        return {"adjustments": adjustments, "summary": self.totals().net_down_summary()}
+
+    def outlook(self) -> dict:
+        exceptions = self._ordered(self._outlook_exc)
+        return {
+            "outlook": self.cf[OUTLOOK_COLUMNS].to_dict(orient="records"),
+            "summary": self.totals().outlook_summary(),
+            "exceptions": exceptions,
+        }
+
+    def exceptions(self) -> list:
+        """All exceptions in get_exceptions order (accrual, WI%, outlook)."""
+        return (
+            self._ordered(self._accrual_exc)
+            + net_down_exceptions(self.net_down()["adjustments"])
+            + self._ordered(self._outlook_exc)
+        )
+
+    def close_summary(self) -> dict:
+        return {
+            "by_business_unit": {bu: t.as_dict() for bu, t in self.by_bu.items()},
+            "grand_totals": self.totals().as_dict(),
+        }
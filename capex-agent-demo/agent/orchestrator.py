@@ -1,12 +1,17 @@
 """Agent orchestrator — Claude API tool-use loop for the CapEx Close Agent."""
 
+import asyncio
 import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
-from typing import Generator
+from typing import AsyncIterator, Generator, Iterator
 
 import anthropic
 import pandas as pd
 
+from agent.encoders import encode_result
 from agent.prompts import SYSTEM_PROMPT
 from agent.tool_definitions import TOOL_DEFINITIONS
 from agent.tools import (
@@ -18,8 +23,12 @@ from agent.tools import (
     get_close_summary,
     get_exceptions,
     get_well_detail,
+    refresh_from_deltas,
+    run_scenarios,
+    snapshot_close,
 )
-from utils.data_loader import load_wbs_master, load_drill_schedule
+from utils.data_loader import data_version, load_wbs_master, load_drill_schedule, to_dollars
+from utils.snapshots import prior_period_version
 
 
 # ---------------------------------------------------------------------------
@@ -27,12 +36,14 @@ from utils.data_loader import load_wbs_master, load_drill_schedule
 # ---------------------------------------------------------------------------
 
 TOOL_FUNCTIONS = {
-    "load_wbs_master": lambda **kw: _df_to_dict(load_wbs_master(kw.get("business_unit", "all"))),
-    "calculate_accruals": lambda **kw: calculate_accruals(kw.get("business_unit", "all")),
+    "load_wbs_master": lambda **kw: _df_to_dict(to_dollars(load_wbs_master(kw.get("business_unit", "all")))),
+    "calculate_accruals": lambda **kw: calculate_accruals(
+        kw.get("business_unit", "all"), prior_period=kw.get("prior_period")
+    ),
     "calculate_net_down": lambda **kw: calculate_net_down(kw.get("business_unit", "all")),
     "calculate_outlook": lambda **kw: calculate_outlook(kw.get("business_unit", "all")),
     "get_exceptions": lambda **kw: get_exceptions(
-        kw.get("business_unit", "all"), kw.get("severity", "all")
+        kw.get("business_unit", "all"), kw.get("severity", "all"), kw.get("prior_period")
     ),
     "get_well_detail": lambda **kw: get_well_detail(kw["wbs_element"]),
     "generate_journal_entry": lambda **kw: generate_journal_entry(kw.get("business_unit", "all")),
@@ -40,6 +51,9 @@ TOOL_FUNCTIONS = {
     "generate_outlook_load_file": lambda **kw: _outlook_to_dict(
         generate_outlook_load_file(kw.get("business_unit", "all"), kw.get("months_forward", 6))
     ),
+    "run_scenarios": lambda **kw: run_scenarios(kw["scenarios"], kw.get("business_unit", "all")),
+    "snapshot_close": lambda **kw: {"snapshot": str(snapshot_close(**kw))},
+    "refresh_from_deltas": lambda **kw: refresh_from_deltas()._asdict(),
 }
 
 
@@ -95,18 +109,181 @@ def _outlook_to_dict(result: dict) -> dict:
     }
 
 
+# Tools that must not run alongside other tool calls because they write
+# data.  A serial call waits for the calls before it and finishes before
+# the ones after it start.
+SERIAL_TOOLS = frozenset({"snapshot_close", "refresh_from_deltas"})
+
+TOOL_WORKERS = 4
+
+
+def default_tool_workers() -> int:
+    """Concurrent tool calls per turn, from CAPEX_TOOL_WORKERS."""
+    return max(1, int(os.environ.get("CAPEX_TOOL_WORKERS", TOOL_WORKERS)))
+
+
 def dispatch_tool(name: str, input_args: dict) -> str:
-    """Call a tool function and return the JSON result string."""
+    """Call a tool function and return the JSON result string.
+
+    The result is encoded within the per-result token budget
+    (agent.encoders.encode_result); a `cursor` input selects a later page
+    of a large result and is not passed to the tool.
+    """
     fn = TOOL_FUNCTIONS.get(name)
     if fn is None:
         return json.dumps({"error": f"Unknown tool: {name}"})
+    args = dict(input_args)
+    cursor = args.pop("cursor", None)
     try:
-        result = fn(**input_args)
-        return json.dumps(result, default=str)
+        return encode_result(name, fn(**args), cursor=cursor)
     except Exception as e:
         return json.dumps({"error": str(e)})
 
 
+def _tool_batches(tool_calls: list) -> Iterator[list]:
+    """Split a turn's tool calls into runs that may execute together."""
+    batch = []
+    for tc in tool_calls:
+        if tc.name in SERIAL_TOOLS:
+            if batch:
+                yield batch
+                batch = []
+            yield [tc]
+        else:
+            batch.append(tc)
+    if batch:
+        yield batch
+
+
+def execute_tool_calls(tool_calls: list, max_workers: int | None = None) -> Iterator[tuple]:
+    """Run a turn's tool calls; yields (tool_call, result_str) in call order.
+
+    Independent calls run concurrently on a bounded thread pool, so a turn
+    takes about as long as its slowest tool; SERIAL_TOOLS run on their own.
+    Each result is yielded as soon as it and every call before it are done.
+    """
+    workers = default_tool_workers() if max_workers is None else max(1, max_workers)
+    if workers == 1 or len(tool_calls) <= 1:
+        for tc in tool_calls:
+            yield tc, dispatch_tool(tc.name, tc.input)
+        return
+    with ThreadPoolExecutor(max_workers=min(workers, len(tool_calls))) as pool:
+        for batch in _tool_batches(tool_calls):
+            futures = [pool.submit(dispatch_tool, tc.name, tc.input) for tc in batch]
+            for tc, future in zip(batch, futures):
+                yield tc, future.result()
+
+
+# ---------------------------------------------------------------------------
+# Per-conversation result memo
+# ---------------------------------------------------------------------------
+
+_SCHEMA_DEFAULTS = {
+    tool["name"]: {
+        arg: prop["default"]
+        for arg, prop in tool["input_schema"]["properties"].items()
+        if "default" in prop
+    }
+    for tool in TOOL_DEFINITIONS
+}
+
+
+def canonical_input(name: str, input_args: dict) -> str:
+    """Tool input as a stable string: schema defaults filled in, keys sorted.
+
+    {} and {"business_unit": "all"} are the same calculate_accruals call.
+    """
+    args = {**_SCHEMA_DEFAULTS.get(name, {}), **input_args}
+    return json.dumps(args, sort_keys=True, separators=(",", ":"), default=str)
+
+
+class ToolResultMemo:
+    """Tool results already sent in one conversation, by call.
+
+    Keyed on (tool name, canonical input, data_version()), plus the snapshot
+    store's version for calls with a prior_period; the value is the
+    tool_use_id whose tool_result carries the payload.  A repeated call is
+    answered with a short reference to that result (reference()) instead of
+    running the tool and sending the payload again, so the memo only holds
+    ids, never results.  Use one memo per conversation and drop it when the
+    history is cleared: a reference is only useful while the earlier result
+    is still in the messages.  SERIAL_TOOLS and failed calls are not memoized,
+    and a repeat only becomes a reference once its source call succeeded.
+    """
+
+    def __init__(self):
+        self._ids = {}
+        self._keys = {}
+        self.hits = 0
+        self.misses = 0
+
+    def plan(self, tool_calls: list) -> dict:
+        """{tool_use_id: earlier tool_use_id} for the repeated calls of a batch.
+
+        Plan one _tool_batches batch at a time, after the batches before it
+        ran: data_version() is read here, so a serial tool that changed the
+        data earlier in the turn turns later repeats into misses.  Calls not
+        in the result are misses and must be executed, then passed to
+        record().  A call repeated within the batch refers to the first;
+        pass it to resolve() once the first has been recorded.
+        """
+        version = data_version()
+        refs = {}
+        for tc in tool_calls:
+            if tc.name in SERIAL_TOOLS or tc.name not in TOOL_FUNCTIONS:
+                continue
+            key = (tc.name, canonical_input(tc.name, tc.input), version,
+                   prior_period_version(tc.input))
+            self._keys[tc.id] = key
+            earlier = self._ids.get(key)
+            if earlier is not None:
+                refs[tc.id] = earlier
+                self.hits += 1
+            else:
+                self._ids[key] = tc.id
+                self.misses += 1
+        return refs
+
+    def record(self, tc, result_str: str) -> None:
+        """Keep an executed call's entry, unless the tool returned an error."""
+        key = self._keys.pop(tc.id, None)
+        if key is not None and result_str.startswith('{"error":') and self._ids.get(key) == tc.id:
+            del self._ids[key]
+
+    def resolve(self, tc, earlier_id: str) -> str | None:
+        """The reference() result for a planned repeat, or None to execute it.
+
+        None means the call it repeats failed: it is a miss after all and
+        takes that call's place, so execute it and record() it.
+        """
+        key = self._keys[tc.id]
+        source = self._ids.get(key)
+        if source is not None:
+            del self._keys[tc.id]
+            return self.reference(tc, source)
+        self._ids[key] = tc.id
+        self.hits -= 1
+        self.misses += 1
+        return None
+
+    @staticmethod
+    def reference(tc, earlier_id: str) -> str:
+        """The tool result sent for a repeated call."""
+        return json.dumps({
+            "same_result_as": earlier_id,
+            "note": (f"Identical {tc.name} call; the data has not changed. "
+                     f"Use the tool_result of {earlier_id} above."),
+        })
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self._ids)}
+
+    def clear(self) -> None:
+        self._ids.clear()
+        self._keys.clear()
+        self.hits = self.misses = 0
+
+
 # ---------------------------------------------------------------------------
 # Streaming event types
 # ---------------------------------------------------------------------------
@@ -131,6 +308,7 @@ class ToolResultEvent:
     """Result of a tool call (for UI breadcrumbs)."""
     tool_name: str
     result_preview: str = ""
+    cached: bool = False  # answered from the conversation's ToolResultMemo
     type: str = "tool_result"
 
 
@@ -141,6 +319,22 @@ class DoneEvent:
     type: str = "done"
 
 
+@dataclass
+class UsageEvent:
+    """Token usage the API reported for one turn, including prompt caching.
+
+    input_tokens counts only the uncached part of the prompt;
+    cache_read_input_tokens were served from the prompt cache and
+    cache_creation_input_tokens were written to it on this turn.
+    """
+    turn: int
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    type: str = "usage"
+
+
 @dataclass
 class ErrorEvent:
     """An error occurred."""
@@ -164,16 +358,137 @@ class ClarifyEvent:
 MAX_TURNS = 15  # Safety limit on tool-use loops
 
 
+def _read_response(response) -> tuple:
+    """(assistant_text, tool_use blocks) of a final message."""
+    assistant_text = ""
+    tool_calls = []
+    for block in response.content:
+        if block.type == "text":
+            assistant_text += block.text
+            # Text already streamed via text_stream
+        elif block.type == "tool_use":
+            tool_calls.append(block)
+    return assistant_text, tool_calls
+
+
+def _clarify_event(tool_calls: list) -> "ClarifyEvent | None":
+    """ClarifyEvent for an ask_user_question call, if the turn has one."""
+    clarify_tc = next(
+        (tc for tc in tool_calls if tc.name == "ask_user_question"),
+        None,
+    )
+    if clarify_tc is None:
+        return None
+    return ClarifyEvent(
+        question=clarify_tc.input.get("question", ""),
+        options=clarify_tc.input.get("options", []),
+        tool_use_id=clarify_tc.id,
+    )
+
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# Prompt cache breakpoints on the static prefix: the tool schemas (cached
+# first by the API) and the system prompt after them.
+CACHED_TOOL_DEFINITIONS = [
+    *TOOL_DEFINITIONS[:-1], {**TOOL_DEFINITIONS[-1], "cache_control": CACHE_CONTROL},
+]
+CACHED_SYSTEM = [{"type": "text", "text": SYSTEM_PROMPT, "cache_control": CACHE_CONTROL}]
+
+
+def _with_cache_breakpoint(message: dict) -> dict:
+    """Copy of a user message with a cache breakpoint on its last block."""
+    content = message["content"]
+    if isinstance(content, str):
+        content = [{"type": "text", "text": content}]
+    if not content or not isinstance(content[-1], dict):
+        return message
+    return {**message, "content": [*content[:-1], {**content[-1], "cache_control": CACHE_CONTROL}]}
+
+
+def cached_messages(messages: list) -> list:
+    """messages with cache breakpoints on the conversation's stable prefix.
+
+    The last user message gets a breakpoint, so this turn writes the whole
+    history to the cache; so does the user message before it, where the
+    previous turn wrote, so this turn reads everything up to there.  With
+    the tools and system breakpoints that is the API's limit of four.  The
+    caller's list and message dicts are left as they are.
+    """
+    marked = list(messages)
+    users = [i for i, m in enumerate(marked) if m.get("role") == "user"][-2:]
+    for i in users:
+        marked[i] = _with_cache_breakpoint(marked[i])
+    return marked
+
+
+def _usage_event(response, turn: int) -> "UsageEvent | None":
+    """UsageEvent from a final message's usage, if it has one."""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return None
+    return UsageEvent(
+        turn=turn,
+        input_tokens=usage.input_tokens or 0,
+        output_tokens=usage.output_tokens or 0,
+        cache_read_input_tokens=getattr(usage, "cache_read_input_tokens", None) or 0,
+        cache_creation_input_tokens=getattr(usage, "cache_creation_input_tokens", None) or 0,
+    )
+
+
+def _tool_result(tc, result_str: str, cached: bool = False) -> tuple:
+    """(ToolResultEvent, tool_result block) for one tool call."""
+    event = ToolResultEvent(tool_name=tc.name, result_preview=result_str[:200], cached=cached)
+    block = {"type": "tool_result", "tool_use_id": tc.id, "content": result_str}
+    return event, block
+
+
 class AgentOrchestrator:
     """Run the CapEx Close Agent via Claude API with tool-use loop."""
 
+    client_class = anthropic.Anthropic
+
     def __init__(
         self,
-        api_key: str,
+        api_key: str | None = None,
         model: str = "claude-sonnet-4-6",
+        max_tool_workers: int | None = None,
+        base_url: str | None = None,
+        client: anthropic.Anthropic | None = None,
+        memo: ToolResultMemo | None = None,
+        prompt_caching: bool = True,
     ):
-        self.client = anthropic.Anthropic(api_key=api_key)
+        self._owns_client = client is None
+        self.client = client or self.client_class(api_key=api_key, base_url=base_url)
         self.model = model
+        self.max_tool_workers = max_tool_workers
+        self.prompt_caching = prompt_caching
+        # One memo per conversation; pass the conversation's own when the
+        # orchestrator is rebuilt per turn (the Streamlit app)
+        self.memo = memo if memo is not None else ToolResultMemo()
+
+    def _request(self, messages: list) -> dict:
+        """messages.stream() arguments for the next turn.
+
+        With prompt_caching, the tools, system prompt and conversation
+        prefix carry cache breakpoints, so each turn of a close re-reads
+        them from the prompt cache instead of reprocessing them.
+        """
+        if not self.prompt_caching:
+            return {
+                "model": self.model,
+                "max_tokens": 8192,
+                "system": SYSTEM_PROMPT,
+                "tools": TOOL_DEFINITIONS,
+                "messages": messages,
+            }
+        return {
+            "model": self.model,
+            "max_tokens": 8192,
+            "system": CACHED_SYSTEM,
+            "tools": CACHED_TOOL_DEFINITIONS,
+            "messages": cached_messages(messages),
+        }
 
     def run(self, messages: list) -> Generator:
         """Run the agent loop, yielding events for streaming.
@@ -186,13 +501,7 @@ class AgentOrchestrator:
         """
         for turn in range(MAX_TURNS):
             try:
-                with self.client.messages.stream(
-                    model=self.model,
-                    max_tokens=8192,
-                    system=SYSTEM_PROMPT,
-                    tools=TOOL_DEFINITIONS,
-                    messages=messages,
-                ) as stream:
+                with self.client.messages.stream(**self._request(messages)) as stream:
                     for text in stream.text_stream:
                         yield TextEvent(text=text)
                     response = stream.get_final_message()
@@ -200,20 +509,14 @@ class AgentOrchestrator:
                 yield ErrorEvent(message=f"API error: {e}")
                 return
 
+            usage = _usage_event(response, turn)
+            if usage:
+                yield usage
+
             # Collect assistant text and tool calls from the final message
-            assistant_text = ""
-            tool_calls = []
-
-            for block in response.content:
-                if block.type == "text":
-                    assistant_text += block.text
-                    # Text already streamed above via text_stream
-                elif block.type == "tool_use":
-                    tool_calls.append(block)
-                    yield ToolCallEvent(
-                        tool_name=block.name,
-                        tool_input=block.input,
-                    )
+            assistant_text, tool_calls = _read_response(response)
+            for tc in tool_calls:
+                yield ToolCallEvent(tool_name=tc.name, tool_input=tc.input)
 
             # Append full assistant message to conversation
             messages.append({
@@ -227,35 +530,34 @@ class AgentOrchestrator:
                 return
 
             # Check for clarifying question tool
-            clarify_tc = next(
-                (tc for tc in tool_calls if tc.name == "ask_user_question"),
-                None,
-            )
-            if clarify_tc:
-                yield ClarifyEvent(
-                    question=clarify_tc.input.get("question", ""),
-                    options=clarify_tc.input.get("options", []),
-                    tool_use_id=clarify_tc.id,
-                )
+            clarify = _clarify_event(tool_calls)
+            if clarify:
+                yield clarify
                 return  # Pause — UI will resume with tool_result
 
-            # Process tool calls and build tool results
+            # Repeats of earlier calls get a reference to the earlier result;
+            # the rest run (concurrently where allowed), results in call order.
+            # Planned a batch at a time, as a serial tool may change the data
             tool_results = []
-            for tc in tool_calls:
-                result_str = dispatch_tool(tc.name, tc.input)
-                # Truncate very large results to stay within token budget
-                if len(result_str) > 50_000:
-                    result_str = result_str[:50_000] + '..."}'
-
-                yield ToolResultEvent(
-                    tool_name=tc.name,
-                    result_preview=result_str[:200],
+            for batch in _tool_batches(tool_calls):
+                refs = self.memo.plan(batch)
+                executed = execute_tool_calls(
+                    [tc for tc in batch if tc.id not in refs], self.max_tool_workers
                 )
-                tool_results.append({
-                    "type": "tool_result",
-                    "tool_use_id": tc.id,
-                    "content": result_str,
-                })
+                for tc in batch:
+                    reference = self.memo.resolve(tc, refs[tc.id]) if tc.id in refs else None
+                    if reference is not None:
+                        event, block = _tool_result(tc, reference, cached=True)
+                    else:
+                        if tc.id in refs:  # the call it repeats failed
+                            result_str = dispatch_tool(tc.name, tc.input)
+                        else:
+                            _, result_str = next(executed)
+                        self.memo.record(tc, result_str)
+                        event, block = _tool_result(tc, result_str)
+                    yield event
+                    tool_results.append(block)
+                executed.close()
 
             # Add tool results as a user message and loop
             messages.append({
@@ -265,3 +567,156 @@ class AgentOrchestrator:
 
         # Safety: exceeded max turns
         yield ErrorEvent(message="Exceeded maximum tool-use turns")
+
+
+# ---------------------------------------------------------------------------
+# asyncio variant
+# ---------------------------------------------------------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def tool_executor() -> ThreadPoolExecutor:
+    """Process-wide pool the async orchestrators run tools on.
+
+    Shared by every session, so CPU-bound tool work stays bounded
+    (default_tool_workers threads) however many sessions are streaming.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=default_tool_workers(), thread_name_prefix="capex-tool",
+            )
+        return _executor
+
+
+async def execute_tool_calls_async(
+    tool_calls: list, executor=None, max_workers: int | None = None,
+) -> AsyncIterator[tuple]:
+    """Async execute_tool_calls: tools run on an executor, off the event loop.
+
+    Yields (tool_call, result_str) in call order; independent calls overlap
+    (at most max_workers at a time, if given) and SERIAL_TOOLS run on their
+    own, as in execute_tool_calls.
+    """
+    loop = asyncio.get_running_loop()
+    executor = executor or tool_executor()
+    limit = asyncio.Semaphore(max(1, max_workers)) if max_workers is not None else None
+
+    async def call(tc):
+        if limit is None:
+            return await loop.run_in_executor(executor, dispatch_tool, tc.name, tc.input)
+        async with limit:
+            return await loop.run_in_executor(executor, dispatch_tool, tc.name, tc.input)
+
+    for batch in _tool_batches(tool_calls):
+        tasks = [asyncio.ensure_future(call(tc)) for tc in batch]
+        for tc, task in zip(batch, tasks):
+            yield tc, await task
+
+
+class AsyncAgentOrchestrator(AgentOrchestrator):
+    """AgentOrchestrator on the async Claude client.
+
+    run() is an async generator yielding the same events as the sync loop.
+    Only the API stream and the tool executor are awaited, so one event
+    loop can serve many concurrent close sessions; tools run on executor
+    (default: the shared tool_executor() thread pool), at most
+    max_tool_workers of a turn's calls at a time if it is set.
+
+    Building a client is expensive (it loads the TLS trust store), so a
+    server with many sessions should create one AsyncAnthropic and pass it
+    as client; aclose() only closes a client the orchestrator created.
+    """
+
+    client_class = anthropic.AsyncAnthropic
+
+    def __init__(
+        self,
+        api_key: str | None = None,
+        model: str = "claude-sonnet-4-6",
+        executor=None,
+        base_url: str | None = None,
+        client: anthropic.AsyncAnthropic | None = None,
+        memo: ToolResultMemo | None = None,
+        prompt_caching: bool = True,
+        max_tool_workers: int | None = None,
+    ):
+        super().__init__(api_key, model, max_tool_workers, base_url, client, memo, prompt_caching)
+        self.executor = executor
+
+    async def aclose(self):
+        if self._owns_client:
+            await self.client.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    async def run(self, messages: list) -> AsyncIterator:
+        """Run the agent loop, yielding events for streaming (see AgentOrchestrator.run)."""
+        for turn in range(MAX_TURNS):
+            try:
+                async with self.client.messages.stream(**self._request(messages)) as stream:
+                    async for text in stream.text_stream:
+                        yield TextEvent(text=text)
+                    response = await stream.get_final_message()
+            except anthropic.APIError as e:
+                yield ErrorEvent(message=f"API error: {e}")
+                return
+
+            usage = _usage_event(response, turn)
+            if usage:
+                yield usage
+
+            assistant_text, tool_calls = _read_response(response)
+            for tc in tool_calls:
+                yield ToolCallEvent(tool_name=tc.name, tool_input=tc.input)
+
+            messages.append({
+                "role": "assistant",
+                "content": response.content,
+            })
+
+            if not tool_calls:
+                yield DoneEvent(full_response=assistant_text)
+                return
+
+            clarify = _clarify_event(tool_calls)
+            if clarify:
+                yield clarify
+                return
+
+            tool_results = []
+            for batch in _tool_batches(tool_calls):
+                refs = self.memo.plan(batch)
+                executed = execute_tool_calls_async(
+                    [tc for tc in batch if tc.id not in refs], self.executor,
+                    self.max_tool_workers,
+                )
+                for tc in batch:
+                    reference = self.memo.resolve(tc, refs[tc.id]) if tc.id in refs else None
+                    if reference is not None:
+                        event, block = _tool_result(tc, reference, cached=True)
+                    else:
+                        if tc.id in refs:  # the call it repeats failed
+                            result_str = await asyncio.get_running_loop().run_in_executor(
+                                self.executor or tool_executor(), dispatch_tool, tc.name, tc.input)
+                        else:
+                            _, result_str = await anext(executed)
+                        self.memo.record(tc, result_str)
+                        event, block = _tool_result(tc, result_str)
+                    yield event
+                    tool_results.append(block)
+                await executed.aclose()
+
+            messages.append({
+                "role": "user",
+                "content": tool_results,
+            })
+
+        yield ErrorEvent(message="Exceeded maximum tool-use turns")
@@ -0,0 +1,203 @@
+"""Process-pool sharded close.
+
+parallel_close splits the well set into shards — one per business unit, or
+contiguous row ranges — and runs the close kernel, exception detection and
+the load-file allocation for each shard in a ProcessPoolExecutor worker.
+The parent writes the merged master and phase dates once per data version
+as Parquet (data_loader.write_shard_source) and sends each worker only its
+shard's partition key — a business unit and/or a row-position range — which
+the worker turns into a filtered columnar read of just its rows.  No shard
+rows are pickled, and no worker parses the full master.  Each shard's records
+carry their master row positions, and the merge sorts on those, so the
+merged exceptions, adjustments and load file come out in the same order as
+the single-process tools regardless of shard layout or completion order.
+
+workers=1 (or CAPEX_WORKERS=1) runs the shards serially in-process on the
+loaded frames, which is also the fallback when a process pool can't be
+started or breaks (e.g. a worker killed by the OOM killer), or when the
+Parquet copy can't be written (CAPEX_COLUMNAR_CACHE=0).
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pandas as pd
+
+from agent.allocation import allocate_load_file, month_calendar
+from agent.engine import (
+    COST_CATEGORIES,
+    accrual_exceptions,
+    build_close_frame,
+    net_down_view,
+    outlook_exceptions,
+)
+from agent.summary import CloseTotals, close_totals_by_bu, merge_by_bu
+from utils.data_loader import (
+    load_bu_partitions,
+    load_phase_dates,
+    load_wbs_master,
+    read_shard,
+    write_shard_source,
+)
+
+SHARD_MODES = ("bu", "rows")
+
+
+def default_workers() -> int:
+    """Worker count from CAPEX_WORKERS, else the CPU count."""
+    return int(os.environ.get("CAPEX_WORKERS", 0)) or os.cpu_count() or 1
+
+
+def plan_shards(business_unit: str = "all", shard_by: str = "bu", n_shards: int = 1) -> list:
+    """Row-position arrays for each shard, in master order."""
+    if shard_by not in SHARD_MODES:
+        raise ValueError(f"Unknown shard mode: {shard_by}")
+    partitions = load_bu_partitions()
+    if business_unit == "all":
+        positions = np.arange(len(load_wbs_master()), dtype=np.int64)
+    else:
+        positions = partitions.get(business_unit, np.empty(0, dtype=np.int64))
+    if shard_by == "bu":
+        return [p for bu, p in partitions.items() if business_unit in ("all", bu) and len(p)]
+    return [s for s in np.array_split(positions, max(1, n_shards)) if len(s)]
+
+
+def _positions_where(cf: pd.DataFrame, mask) -> list:
+    return cf.index[np.asarray(mask)].tolist()
+
+
+def shard_filters(business_unit: str, shard_by: str, positions: np.ndarray) -> list:
+    """Partition key for one shard, as pyarrow filters over write_shard_source."""
+    filters = []
+    if shard_by == "bu" or business_unit != "all":
+        bu = load_wbs_master()["business_unit"].iat[int(positions[0])]
+        filters.append(("business_unit", "==", str(bu)))
+    if shard_by == "rows":
+        filters += [("_position", ">=", int(positions[0])),
+                    ("_position", "<=", int(positions[-1]))]
+    return filters
+
+
+def shard_inputs(positions: np.ndarray) -> tuple:
+    """(positions, master rows, phase dates, scheduled flags) for one shard, in-process."""
+    phases = load_phase_dates()
+    return (positions, load_wbs_master().iloc[positions],
+            phases.dates[positions], phases.scheduled[positions])
+
+
+def run_shard(
+    positions: np.ndarray,
+    df: pd.DataFrame,
+    phase_dates: np.ndarray,
+    scheduled: np.ndarray,
+    months_forward: int,
+    reference_date,
+) -> dict:
+    """Close one shard of master rows; records are tagged with row positions.
+
+    df, phase_dates and scheduled are the master rows and phase data at
+    positions (shard_inputs, or read_shard in a worker).
+    """
+    cf = build_close_frame(df)
+    cf.index = pd.Index(positions)
+    calendar = month_calendar(reference_date, months_forward)
+    nd = net_down_view(cf)
+    return {
+        "accrual_exceptions": list(zip(
+            _positions_where(cf, cf["negative_accrual"] | cf["large_swing"]),
+            accrual_exceptions(cf),
+        )),
+        "adjustments": list(zip(_positions_where(cf, cf["wi_mismatch"]), nd["adjustments"])),
+        "outlook_exceptions": list(zip(
+            _positions_where(cf, cf["over_budget"]), outlook_exceptions(cf),
+        )),
+        "close_totals": close_totals_by_bu(cf),
+        "load_file": allocate_load_file(
+            cf, phase_dates, scheduled, calendar,
+        ).assign(_position=np.repeat(positions, len(COST_CATEGORIES))),
+        "months": list(calendar.labels),
+    }
+
+
+def run_partition(source, filters: list, months_forward: int, reference_date) -> dict:
+    """Worker entry point: read one partition from the shard source and close it."""
+    return run_shard(*read_shard(source, filters), months_forward, reference_date)
+
+
+def _map_shards(
+    shards: list, business_unit: str, shard_by: str, workers: int,
+    months_forward: int, reference_date,
+) -> list:
+    args = (months_forward, reference_date)
+    source = write_shard_source() if workers > 1 and len(shards) > 1 else None
+    if source is not None:
+        try:
+            with ProcessPoolExecutor(max_workers=min(workers, len(shards))) as pool:
+                futures = [
+                    pool.submit(run_partition, source,
+                                shard_filters(business_unit, shard_by, s), *args)
+                    for s in shards
+                ]
+                return [f.result() for f in futures]
+        except (OSError, NotImplementedError, BrokenProcessPool):
+            pass  # no process pool here, or a worker died: run serially
+    return [run_shard(*shard_inputs(s), *args) for s in shards]
+
+
+def _sorted_records(parts: list, key: str) -> list:
+    tagged = [rec for part in parts for rec in part[key]]
+    return [rec for _, rec in sorted(tagged, key=lambda t: t[0])]
+
+
+def parallel_close(
+    business_unit: str = "all",
+    shard_by: str = "bu",
+    workers: int | None = None,
+    months_forward: int = 6,
+    reference_date=None,
+) -> dict:
+    """Run the close and the outlook load file across worker processes.
+
+    Returns {"accruals", "net_down", "outlook", "close_totals", "load_file"}
+    with the streaming shapes (summaries and exceptions, no per-well record
+    lists, per-BU CloseTotals) plus the load file; each step carries a
+    "parallel" entry with the shard and worker counts.
+    """
+    from agent.tools import REFERENCE_DATE
+
+    workers = default_workers() if workers is None else max(1, workers)
+    reference_date = reference_date or REFERENCE_DATE
+    shards = plan_shards(business_unit, shard_by, workers)
+    parts = _map_shards(shards, business_unit, shard_by, workers, months_forward, reference_date)
+
+    accrual_exc = _sorted_records(parts, "accrual_exceptions")
+    adjustments = _sorted_records(parts, "adjustments")
+    outlook_exc = _sorted_records(parts, "outlook_exceptions")
+
+    by_bu = merge_by_bu(p["close_totals"] for p in parts)
+    # BUs in master first-appearance order, as the in-process groupby has them
+    by_bu = {bu: by_bu[bu] for bu in load_bu_partitions() if bu in by_bu}
+    totals = CloseTotals.merge_all(by_bu.values())
+
+    months = list(month_calendar(reference_date, months_forward).labels)
+    if parts:
+        load_df = (pd.concat([p["load_file"] for p in parts], ignore_index=True)
+                   .sort_values("_position", kind="stable")
+                   .drop(columns="_position").reset_index(drop=True))
+    else:
+        load_df = pd.DataFrame(columns=["well_name", "wbs_element", "cost_category", *months, "total"])
+
+    parallel = {"shards": len(shards), "workers": min(workers, max(1, len(shards))),
+                "shard_by": shard_by}
+    return {
+        "accruals": {"summary": totals.accrual_summary(), "exceptions": accrual_exc,
+                     "parallel": parallel},
+        "net_down": {"adjustments": adjustments, "summary": totals.net_down_summary(),
+                     "parallel": parallel},
+        "outlook": {"summary": totals.outlook_summary(), "exceptions": outlook_exc,
+                    "parallel": parallel},
+        "close_totals": by_bu,
+        "load_file": {"load_file": load_df, "months": months},
+    }
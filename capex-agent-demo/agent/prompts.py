@@ -78,4 +78,8 @@ reference date.
 3. Never skip exception reporting
 4. When asked about a specific well, use `get_well_detail` for the full waterfall
 5. When asked for exceptions, use `get_exceptions` with optional severity filter
+6. For what-if questions about WI% or ops budgets, use `run_scenarios` — put every \
+scenario in one call rather than calling it once per scenario
+7. Use `refresh_from_deltas` when the user says new delta files were dropped, then \
+rerun the steps; use `snapshot_close` only when the user asks to save the close
 """
@@ -0,0 +1,196 @@
+"""Vectorized what-if scenarios over the close frame.
+
+Finance asks things like "what if the WI% mismatches are corrected" or "what
+if ops budgets move by 10%".  evaluate_scenarios takes any number of
+scenarios at once, each a list of overrides to wi_pct, system_wi_pct or a
+{cat}_ops_budget column, scoped to one well, one business unit or every
+well.  The overrides are scattered into scenarios x wells input matrices,
+and the accrual, net-down and outlook math is broadcast over the scenario
+axis in one pass (there is no Python loop per scenario in the evaluation).
+Columns the overrides can't touch (ITD, VOW, gross accrual, Negative Accrual
+and Large Swing) come straight from the close frame.
+
+An override is a dict:
+
+    {"field": "system_wi_pct", "set": "wi_pct", "business_unit": "DJ Basin"}
+    {"field": "drill_ops_budget", "scale": 1.1}
+    {"field": "wi_pct", "set": 0.5, "wbs_element": "WBS-1001"}
+
+"set" takes a value (WI% as a fraction, ops budgets in dollars) or, for the
+WI fields, the name of the other WI field to copy its baseline value;
+"scale" multiplies.  Sets apply before scales, and a later set on the same
+well wins.  Ops budgets are rounded to whole cents, as the loader stores
+them, so a scenario gives exactly the totals of a close rerun on an edited
+master.
+"""
+
+import numpy as np
+import pandas as pd
+
+from agent.engine import COST_CATEGORIES, WI_PCT_TOLERANCE
+from agent.summary import CloseTotals, to_cents
+
+WI_FIELDS = ("wi_pct", "system_wi_pct")
+OPS_BUDGET_FIELDS = tuple(f"{cat}_ops_budget" for cat in COST_CATEGORIES)
+SCENARIO_FIELDS = WI_FIELDS + OPS_BUDGET_FIELDS
+
+SCENARIO_TOTAL_KEYS = [
+    "total_gross_accrual", "total_net_accrual", "total_net_down_adjustment",
+    "total_future_outlook", "wells_with_mismatch", "over_budget_count",
+]
+
+
+def _base_inputs(cf: pd.DataFrame) -> dict:
+    """Per-well baseline of every overridable field (ops budgets in cents)."""
+    base = {f: cf[f].to_numpy(dtype=float) for f in WI_FIELDS}
+    base.update({f: to_cents(cf[f]).astype(float) for f in OPS_BUDGET_FIELDS})
+    return base
+
+
+class _Scope:
+    """Row positions of a close frame by well and by business unit."""
+
+    def __init__(self, cf: pd.DataFrame):
+        self.n = len(cf)
+        self.wells = pd.Index(cf["wbs_element"].to_numpy())
+        self.bus = pd.Series(np.arange(self.n)).groupby(
+            cf["business_unit"].to_numpy(), sort=False).indices
+
+    def rows(self, override: dict) -> np.ndarray:
+        if "wbs_element" in override:
+            position = self.wells.get_indexer([override["wbs_element"]])[0]
+            if position < 0:
+                raise ValueError(f"WBS element {override['wbs_element']} not found")
+            return np.array([position])
+        if "business_unit" in override:
+            rows = self.bus.get(override["business_unit"])
+            if rows is None:
+                raise ValueError(f"Business unit {override['business_unit']} not found")
+            return rows
+        return np.arange(self.n)
+
+
+def _check_override(override: dict):
+    field = override.get("field")
+    if field not in SCENARIO_FIELDS:
+        raise ValueError(f"Unknown scenario field: {field!r}")
+    if ("set" in override) == ("scale" in override):
+        raise ValueError(f"Override of {field} needs exactly one of 'set' or 'scale'")
+    value = override.get("set")
+    if isinstance(value, str) and (field not in WI_FIELDS or value not in WI_FIELDS):
+        raise ValueError(f"{field} can't be set from {value!r}")
+
+
+def scenario_inputs(cf: pd.DataFrame, scenarios: list) -> dict:
+    """{field: scenarios x wells array} with every scenario's overrides applied."""
+    base = _base_inputs(cf)
+    scope = _Scope(cf)
+    n = scope.n
+    sets = {f: ([], []) for f in SCENARIO_FIELDS}
+    scales = {f: ([], []) for f in SCENARIO_FIELDS}
+
+    # Collect flat (scenario * n + row) targets; the arrays are written in bulk below
+    for s, scenario in enumerate(scenarios):
+        for override in scenario.get("overrides", []):
+            _check_override(override)
+            field = override["field"]
+            rows = scope.rows(override)
+            if "scale" in override:
+                values = np.full(len(rows), float(override["scale"]))
+                target = scales[field]
+            else:
+                value = override["set"]
+                if isinstance(value, str):
+                    values = base[value][rows]
+                elif field in OPS_BUDGET_FIELDS:
+                    values = np.full(len(rows), float(value) * 100)
+                else:
+                    values = np.full(len(rows), float(value))
+                target = sets[field]
+            target[0].append(s * n + rows)
+            target[1].append(values)
+
+    inputs = {}
+    for field in SCENARIO_FIELDS:
+        flat = np.tile(base[field], len(scenarios))
+        if sets[field][0]:
+            idx = np.concatenate(sets[field][0])[::-1]
+            values = np.concatenate(sets[field][1])[::-1]
+            # Reversed, np.unique's first occurrence is the last set given
+            idx, first = np.unique(idx, return_index=True)
+            flat[idx] = values[first]
+        if scales[field][0]:
+            np.multiply.at(flat, np.concatenate(scales[field][0]),
+                           np.concatenate(scales[field][1]))
+        if field in OPS_BUDGET_FIELDS:
+            flat = np.rint(flat)
+        inputs[field] = flat.reshape(len(scenarios), n)
+    return inputs
+
+
+def evaluate_scenarios(cf: pd.DataFrame, scenarios: list,
+                       tolerance: float = WI_PCT_TOLERANCE) -> list:
+    """CloseTotals for each scenario, in the order given."""
+    inputs = scenario_inputs(cf, scenarios)
+    wi = inputs["wi_pct"]
+    system_wi = inputs["system_wi_pct"]
+
+    # Same accumulation order as agent.engine.build_close_frame
+    total_net = 0
+    total_future = 0
+    for cat in COST_CATEGORIES:
+        gross = cf[f"{cat}_gross_accrual"].to_numpy()
+        vow = cf[f"{cat}_vow"].to_numpy()
+        total_net = total_net + gross * wi
+        total_future = total_future + (inputs[f"{cat}_ops_budget"] / 100 - vow * wi)
+
+    discrepancy = system_wi - wi
+    mismatch = np.abs(discrepancy) > tolerance
+    net_down = cf["total_system_cost"].to_numpy() * discrepancy
+    over_budget = total_future < 0
+
+    gross_accrual = int(to_cents(cf["total_gross_accrual"]).sum())
+    net_accrual = to_cents(total_net).sum(axis=1)
+    net_down_cents = np.where(mismatch, to_cents(net_down), 0).sum(axis=1)
+    future_outlook = to_cents(total_future).sum(axis=1)
+    negative = int(cf["negative_accrual"].sum())
+    large_swing = int(cf["large_swing"].sum())
+    mismatches = mismatch.sum(axis=1)
+    over_budgets = over_budget.sum(axis=1)
+
+    return [
+        CloseTotals(
+            gross_accrual, int(net_accrual[s]), int(net_down_cents[s]),
+            int(future_outlook[s]), len(cf),
+            (negative, large_swing, int(mismatches[s]), int(over_budgets[s])),
+        )
+        for s in range(len(scenarios))
+    ]
+
+
+def scenario_totals(totals: CloseTotals) -> dict:
+    """The compact per-scenario totals (SCENARIO_TOTAL_KEYS, dollars)."""
+    summary = totals.as_dict()
+    return {
+        "total_gross_accrual": summary["total_gross_accrual"],
+        "total_net_accrual": summary["total_net_accrual"],
+        "total_net_down_adjustment": summary["total_net_down_adjustment"],
+        "total_future_outlook": summary["total_future_outlook"],
+        "wells_with_mismatch": totals.count("wi_mismatch"),
+        "over_budget_count": totals.count("over_budget"),
+    }
+
+
+def compare_scenarios(cf: pd.DataFrame, scenarios: list) -> dict:
+    """Baseline plus each scenario's totals and change from the baseline."""
+    results = evaluate_scenarios(cf, [{"overrides": []}] + list(scenarios))
+    baseline = scenario_totals(results[0])
+    out = []
+    for i, (scenario, totals) in enumerate(zip(scenarios, results[1:]), 1):
+        delta = scenario_totals(totals - results[0])
+        out.append({
+            "name": scenario.get("name", f"scenario_{i}"),
+            "totals": scenario_totals(totals),
+            "change": delta,
+        })
+    return {"baseline": baseline, "scenarios": out}
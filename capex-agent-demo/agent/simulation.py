@@ -0,0 +1,234 @@
+"""Monte Carlo schedule-slip simulation for the monthly outlook.
+
+generate_outlook_load_file allocates future outlook from the planned phase
+dates; real spud and frac dates slip.  simulate_outlook samples a slip per
+well and phase for each trial, shifts the phase dates, and runs the month
+allocation (agent.allocation.allocation_matrix) for a whole batch of trials
+at once by stacking trials x wells on the allocator's well axis.  Each
+batch is reduced straight away to business unit x category x month totals,
+so memory is bounded by the batch size (SIM_BATCH_MB), not by
+trials x wells x months.
+
+Slips are in days.  Each phase's sampled slip is incremental and
+accumulates down the schedule (SCHEDULE_PHASES order): a late spud pushes
+TD, frac and first production back with it.  Distributions are set per
+phase, with optional per-basin (business unit) overrides:
+
+    {"kind": "triangular", "low": 0, "mode": 5, "high": 45}
+    {"kind": "uniform", "low": -5, "high": 15}
+    {"kind": "normal", "mean": 10, "sd": 7}
+    {"kind": "fixed", "days": 0}
+
+Sampled slips are rounded to whole days.  The future outlook itself does
+not change between trials, only when it lands.
+
+Each trial draws from its own random stream (numpy SeedSequence children of
+the seed, in trial order), so a seeded run gives the same trials however
+they are batched: the batch size only sets memory use.
+"""
+
+import os
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from agent.allocation import CATEGORY_LABELS, allocation_matrix
+from agent.engine import COST_CATEGORIES
+from utils.data_loader import SCHEDULE_PHASES
+
+PERCENTILES = (10, 50, 90)
+
+# Incremental slip per phase (days)
+DEFAULT_SLIPS = {
+    "Spud": {"kind": "triangular", "low": -5, "mode": 0, "high": 30},
+    "TD": {"kind": "triangular", "low": -2, "mode": 0, "high": 10},
+    "Frac Start": {"kind": "triangular", "low": 0, "mode": 5, "high": 45},
+    "Frac End": {"kind": "triangular", "low": -2, "mode": 0, "high": 10},
+    "First Production": {"kind": "triangular", "low": 0, "mode": 3, "high": 20},
+}
+
+SIM_BATCH_MB = 128
+
+SimulationResult = namedtuple("SimulationResult", ["months", "business_units", "trials", "totals"])
+SimulationResult.__doc__ = """Per-trial simulated outlook totals.
+
+months: month labels; business_units: BU per row of the second axis;
+trials: trial count; totals: trials x BUs x categories x months float64
+dollars (categories in COST_CATEGORIES order).
+"""
+
+
+def batch_bytes() -> int:
+    """Per-batch memory budget from CAPEX_SIM_BATCH_MB, else SIM_BATCH_MB."""
+    return int(float(os.environ.get("CAPEX_SIM_BATCH_MB", SIM_BATCH_MB)) * 1024 * 1024)
+
+
+def trials_per_batch(n_wells: int, n_months: int, budget: int | None = None) -> int:
+    """Trials that fit in one batch: the allocation matrix plus its temporaries."""
+    budget = batch_bytes() if budget is None else budget
+    per_trial = max(1, n_wells) * max(1, n_months) * 8 * (len(COST_CATEGORIES) + 6)
+    return max(1, budget // per_trial)
+
+
+def _check_spec(spec: dict) -> dict:
+    kind = spec.get("kind")
+    required = {
+        "triangular": ("low", "mode", "high"),
+        "uniform": ("low", "high"),
+        "normal": ("mean", "sd"),
+        "fixed": ("days",),
+    }.get(kind)
+    if required is None:
+        raise ValueError(f"Unknown slip distribution: {kind!r}")
+    missing = [k for k in required if k not in spec]
+    if missing:
+        raise ValueError(f"{kind} slip distribution needs {', '.join(missing)}")
+    if kind == "triangular" and not spec["low"] <= spec["mode"] <= spec["high"]:
+        raise ValueError("triangular slip distribution needs low <= mode <= high")
+    return spec
+
+
+def _quantile(spec: dict, u: np.ndarray, z: np.ndarray) -> np.ndarray:
+    """Slips for uniform draws u (standard normal draws z for "normal")."""
+    kind = spec["kind"]
+    if kind == "fixed":
+        return np.full(u.shape, float(spec["days"]))
+    if kind == "triangular":
+        low, mode, high = spec["low"], spec["mode"], spec["high"]
+        if low == high:
+            return np.full(u.shape, float(low))
+        # Inverse CDF, as numpy's Generator.triangular
+        width = high - low
+        return np.where(
+            u < (mode - low) / width,
+            low + np.sqrt(u * width * (mode - low)),
+            high - np.sqrt((1 - u) * width * (high - mode)),
+        )
+    if kind == "uniform":
+        return spec["low"] + u * (spec["high"] - spec["low"])
+    return spec["mean"] + spec["sd"] * z
+
+
+def resolve_slips(slips: dict | None = None, basin_slips: dict | None = None) -> dict:
+    """{(business_unit or None, phase): spec} from defaults plus overrides."""
+    phases = {**DEFAULT_SLIPS, **(slips or {})}
+    unknown = set(phases) - set(SCHEDULE_PHASES)
+    for overrides in (basin_slips or {}).values():
+        unknown |= set(overrides) - set(SCHEDULE_PHASES)
+    if unknown:
+        raise ValueError(f"Unknown schedule phase: {sorted(unknown)[0]}")
+    resolved = {(None, p): _check_spec(s) for p, s in phases.items()}
+    for bu, overrides in (basin_slips or {}).items():
+        resolved.update({(bu, p): _check_spec(s) for p, s in overrides.items()})
+    return resolved
+
+
+def sample_shifts(
+    rngs: list,
+    bu_codes: np.ndarray,
+    business_units: list,
+    slips: dict,
+) -> np.ndarray:
+    """trials x wells x phases cumulative slips as timedelta64[D], one rng per trial.
+
+    Each trial's generator draws the same fixed-shape arrays, so a trial's
+    slips depend only on its own stream.
+    """
+    shape = (len(bu_codes), len(SCHEDULE_PHASES))
+    u = np.stack([rng.random(shape) for rng in rngs])
+    z = np.stack([rng.standard_normal(shape) for rng in rngs])
+    steps = np.empty(u.shape)
+    for p, phase in enumerate(SCHEDULE_PHASES):
+        for b, bu in enumerate(business_units):
+            cols = np.flatnonzero(bu_codes == b)
+            spec = slips.get((bu, phase), slips[(None, phase)])
+            steps[:, cols, p] = _quantile(spec, u[:, cols, p], z[:, cols, p])
+    return np.cumsum(np.rint(steps), axis=2).astype("timedelta64[D]")
+
+
+def simulate_outlook(
+    cf: pd.DataFrame,
+    phase_dates: np.ndarray,
+    scheduled: np.ndarray,
+    calendar,
+    trials: int = 1000,
+    seed: int | None = None,
+    slips: dict | None = None,
+    basin_slips: dict | None = None,
+    batch_trials: int | None = None,
+) -> SimulationResult:
+    """Simulate the outlook load file's BU x category x month totals.
+
+    cf is a close frame; phase_dates and scheduled are row-aligned with it
+    (utils.data_loader.PhaseDates).  With a seed the result is reproducible
+    and does not depend on batch_trials or CAPEX_SIM_BATCH_MB.
+    """
+    if trials < 1:
+        raise ValueError("trials must be at least 1")
+    slips = resolve_slips(slips, basin_slips)
+    future = cf[[f"{cat}_future_outlook" for cat in COST_CATEGORIES]].to_numpy(dtype=float)
+    bu_codes, business_units = pd.factorize(cf["business_unit"].to_numpy())
+    business_units = [str(bu) for bu in business_units]
+    n_wells, n_months = len(cf), len(calendar.labels)
+    one_hot = np.zeros((n_wells, len(business_units)))
+    one_hot[np.arange(n_wells), bu_codes] = 1.0
+
+    batch = batch_trials or trials_per_batch(n_wells, n_months)
+    # spawn() continues from the children already handed out, so batch by
+    # batch the trials get the same streams as spawn(trials) in one go
+    seeds = np.random.SeedSequence(seed)
+    totals = np.empty((trials, len(business_units), len(COST_CATEGORIES), n_months))
+    for start in range(0, trials, batch):
+        size = min(batch, trials - start)
+        rngs = [np.random.default_rng(child) for child in seeds.spawn(size)]
+        shifted = phase_dates[None, :, :] + sample_shifts(rngs, bu_codes, business_units, slips)
+        alloc = allocation_matrix(
+            np.tile(future, (size, 1)),
+            shifted.reshape(size * n_wells, len(SCHEDULE_PHASES)),
+            np.tile(scheduled, size),
+            calendar,
+        ).reshape(size, n_wells, len(COST_CATEGORIES), n_months)
+        # Sum wells into BUs: trials x categories x months x BUs -> trials x BUs x ...
+        totals[start:start + size] = np.tensordot(alloc, one_hot, axes=([1], [0])).transpose(0, 3, 1, 2)
+    return SimulationResult(list(calendar.labels), business_units, trials, totals)
+
+
+def _percentile_rows(values: np.ndarray, months: list) -> dict:
+    """{"P10": {month: amount}, ...} over the trial axis of a trials x months array."""
+    bands = np.percentile(values, PERCENTILES, axis=0)
+    return {
+        f"P{q}": dict(zip(months, np.round(band, 2).tolist()))
+        for q, band in zip(PERCENTILES, bands)
+    }
+
+
+def summarize_simulation(result: SimulationResult) -> dict:
+    """P10/P50/P90 monthly totals by category, by BU, by BU and category, and overall.
+
+    Each percentile is taken over the trials' totals at that level, so
+    (e.g.) the P90 total is not the sum of the category P90s.
+    """
+    totals, months = result.totals, result.months
+    by_category = totals.sum(axis=1)
+    by_bu = totals.sum(axis=2)
+    return {
+        "months": months,
+        "trials": result.trials,
+        "total": _percentile_rows(by_category.sum(axis=1), months),
+        "by_category": {
+            CATEGORY_LABELS[cat]: _percentile_rows(by_category[:, c], months)
+            for c, cat in enumerate(COST_CATEGORIES)
+        },
+        "by_business_unit": {
+            bu: _percentile_rows(by_bu[:, b], months)
+            for b, bu in enumerate(result.business_units)
+        },
+        "by_business_unit_category": {
+            bu: {
+                CATEGORY_LABELS[cat]: _percentile_rows(totals[:, b, c], months)
+                for c, cat in enumerate(COST_CATEGORIES)
+            }
+            for b, bu in enumerate(result.business_units)
+        },
+    }
@@ -0,0 +1,62 @@
+"""Chunked streaming close for WBS extracts too large for one DataFrame.
+
+stream_close reads wbs_master.csv in bounded chunks, runs each chunk through
+the close kernel (agent.engine.build_close_frame), and folds the chunk's
+totals (agent.summary.CloseTotals), exceptions and net-down adjustments into
+running results.  Per-well record lists are not kept — only summaries and
+the (sparse) exception and adjustment lists — so peak memory is set by the
+chunk size, not the file.
+"""
+
+from agent.engine import (
+    accrual_exceptions,
+    build_close_frame,
+    net_down_view,
+    outlook_exceptions,
+)
+from agent.summary import CloseTotals, close_totals_by_bu, merge_by_bu
+from utils.cache import versioned_cache
+from utils.data_loader import STREAM_CHUNK_ROWS, data_version, iter_wbs_master_chunks
+from utils.snapshots import prior_period_version, with_prior_period
+
+
+@versioned_cache(data_version, maxsize=4, arg_version=prior_period_version)
+def stream_close(
+    business_unit: str = "all",
+    chunksize: int = STREAM_CHUNK_ROWS,
+    prior_period: str | None = None,
+) -> dict:
+    """Run all three close steps over the master in chunks.
+
+    prior_period takes the Large Swing baseline from that period's snapshot
+    (utils.snapshots) instead of the master's prior_gross_accrual column.
+
+    Returns {"accruals", "net_down", "outlook", "close_totals"} with the same
+    summary/exception shapes as the in-memory tools, minus the per-well
+    "accruals"/"outlook" record lists; close_totals maps each BU to its
+    merged agent.summary.CloseTotals.
+    """
+    accrual_exc, outlook_exc, adjustments = [], [], []
+    by_bu = {}
+    chunks = 0
+
+    for chunk in iter_wbs_master_chunks(business_unit, chunksize):
+        cf = build_close_frame(with_prior_period(chunk, prior_period))
+        chunks += 1
+        accrual_exc.extend(accrual_exceptions(cf))
+        adjustments.extend(net_down_view(cf)["adjustments"])
+        outlook_exc.extend(outlook_exceptions(cf))
+        by_bu = merge_by_bu([by_bu, close_totals_by_bu(cf)])
+
+    totals = CloseTotals.merge_all(by_bu.values())
+    streaming = {"chunks": chunks, "chunk_rows": chunksize}
+
+    return {
+        "accruals": {"summary": totals.accrual_summary(), "exceptions": accrual_exc,
+                     "streaming": streaming},
+        "net_down": {"adjustments": adjustments, "summary": totals.net_down_summary(),
+                     "streaming": streaming},
+        "outlook": {"summary": totals.outlook_summary(), "exceptions": outlook_exc,
+                    "streaming": streaming},
+        "close_totals": by_bu,
+    }
@@ -0,0 +1,173 @@
+"""Mergeable close totals.
+
+The step summaries used to be float sums over full record lists, so two
+shards' (or chunks', or BUs') results couldn't be combined without
+recomputing, and float addition made the combined totals depend on the
+order.  CloseTotals holds a set of wells' totals as integer cents plus well
+and exception counts; merge() (also +) is exact, associative and
+order-independent, and - backs a partial out again for incremental updates.
+Per-well amounts are rounded to cents before summing, so every path — in
+memory, streamed, sharded, incremental — produces identical totals.
+
+The step summary dicts and get_close_summary are rendered from CloseTotals.
+"""
+
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+# Close-frame exception flag -> (exception_type, severity) of its records
+EXCEPTION_FLAGS = {
+    "negative_accrual": ("Negative Accrual", "HIGH"),
+    "large_swing": ("Large Swing", "MEDIUM"),
+    "wi_mismatch": ("WI% Mismatch", "MEDIUM"),
+    "over_budget": ("Over Budget", "HIGH"),
+}
+
+# Flags counted by the step/close summaries' exception_count (WI% Mismatch
+# wells are reported as net-down adjustments instead)
+SUMMARY_EXCEPTION_FLAGS = ("negative_accrual", "large_swing", "over_budget")
+
+_CENT_COLUMNS = {
+    "gross_accrual": "total_gross_accrual",
+    "net_accrual": "total_net_accrual",
+    "net_down": "net_down_adjustment",
+    "future_outlook": "total_future_outlook",
+}
+
+
+def to_cents(values) -> np.ndarray:
+    """Dollar amounts -> int64 cents, rounded half to even."""
+    return np.rint(np.asarray(values, dtype=float) * 100).astype(np.int64)
+
+
+@dataclass(frozen=True)
+class CloseTotals:
+    """Close totals for a set of wells; money in integer cents."""
+
+    gross_accrual: int = 0
+    net_accrual: int = 0
+    net_down: int = 0           # mismatched (wi_mismatch) wells only
+    future_outlook: int = 0
+    well_count: int = 0
+    flag_counts: tuple = (0,) * len(EXCEPTION_FLAGS)   # in EXCEPTION_FLAGS order
+
+    def merge(self, other: "CloseTotals") -> "CloseTotals":
+        return CloseTotals(
+            self.gross_accrual + other.gross_accrual,
+            self.net_accrual + other.net_accrual,
+            self.net_down + other.net_down,
+            self.future_outlook + other.future_outlook,
+            self.well_count + other.well_count,
+            tuple(a + b for a, b in zip(self.flag_counts, other.flag_counts)),
+        )
+
+    __add__ = merge
+
+    def __sub__(self, other: "CloseTotals") -> "CloseTotals":
+        return CloseTotals(
+            self.gross_accrual - other.gross_accrual,
+            self.net_accrual - other.net_accrual,
+            self.net_down - other.net_down,
+            self.future_outlook - other.future_outlook,
+            self.well_count - other.well_count,
+            tuple(a - b for a, b in zip(self.flag_counts, other.flag_counts)),
+        )
+
+    @classmethod
+    def merge_all(cls, parts) -> "CloseTotals":
+        total = cls()
+        for part in parts:
+            total = total + part
+        return total
+
+    def count(self, flag: str) -> int:
+        return self.flag_counts[list(EXCEPTION_FLAGS).index(flag)]
+
+    @property
+    def exception_count(self) -> int:
+        return sum(self.count(f) for f in SUMMARY_EXCEPTION_FLAGS)
+
+    def by_type(self) -> dict:
+        """Exception counts by exception_type (all four types)."""
+        return {t: n for (t, _), n in zip(EXCEPTION_FLAGS.values(), self.flag_counts) if n}
+
+    def by_severity(self) -> dict:
+        counts = {}
+        for (_, severity), n in zip(EXCEPTION_FLAGS.values(), self.flag_counts):
+            if n:
+                counts[severity] = counts.get(severity, 0) + n
+        return counts
+
+    # -- rendered summaries (dollars) ----------------------------------------
+
+    def accrual_summary(self) -> dict:
+        return {
+            "total_gross_accrual": self.gross_accrual / 100,
+            "total_net_accrual": self.net_accrual / 100,
+            "well_count": self.well_count,
+            "exception_count": self.count("negative_accrual") + self.count("large_swing"),
+        }
+
+    def net_down_summary(self) -> dict:
+        return {
+            "wells_with_mismatch": self.count("wi_mismatch"),
+            "total_net_down_adjustment": self.net_down / 100,
+        }
+
+    def outlook_summary(self) -> dict:
+        return {
+            "total_future_outlook": self.future_outlook / 100,
+            "well_count": self.well_count,
+            "over_budget_count": self.count("over_budget"),
+        }
+
+    def as_dict(self) -> dict:
+        """The get_close_summary row for these wells."""
+        return {
+            "total_gross_accrual": self.gross_accrual / 100,
+            "total_net_accrual": self.net_accrual / 100,
+            "total_net_down_adjustment": self.net_down / 100,
+            "total_future_outlook": self.future_outlook / 100,
+            "well_count": self.well_count,
+            "exception_count": self.exception_count,
+        }
+
+
+def _cents_frame(cf: pd.DataFrame) -> pd.DataFrame:
+    columns = {name: to_cents(cf[col]) for name, col in _CENT_COLUMNS.items()}
+    columns["net_down"] = np.where(cf["wi_mismatch"], columns["net_down"], 0)
+    columns.update({flag: cf[flag].to_numpy().astype(np.int64) for flag in EXCEPTION_FLAGS})
+    return pd.DataFrame(columns, index=cf.index)
+
+
+def _from_sums(sums, well_count: int) -> CloseTotals:
+    return CloseTotals(
+        *(int(sums[name]) for name in _CENT_COLUMNS),
+        well_count=int(well_count),
+        flag_counts=tuple(int(sums[flag]) for flag in EXCEPTION_FLAGS),
+    )
+
+
+def close_totals(cf: pd.DataFrame) -> CloseTotals:
+    """CloseTotals for every well in a close frame."""
+    return _from_sums(_cents_frame(cf).sum(), len(cf))
+
+
+def close_totals_by_bu(cf: pd.DataFrame) -> dict:
+    """{business_unit: CloseTotals} from one grouped aggregation, first-appearance order."""
+    cents = _cents_frame(cf)
+    grouped = cents.groupby(cf["business_unit"].to_numpy(), sort=False)
+    sums = grouped.sum()
+    sizes = grouped.size()
+    return {str(bu): _from_sums(sums.loc[bu], sizes.loc[bu]) for bu in sums.index}
+
+
+def merge_by_bu(parts) -> dict:
+    """Merge several {business_unit: CloseTotals} maps (BU order of first appearance)."""
+    merged = {}
+    for part in parts:
+        for bu, totals in part.items():
+            merged[bu] = merged.get(bu, CloseTotals()) + totals
+    return merged
@@ -1,9 +1,19 @@
 """Claude API tool schemas for the CapEx Close Agent.
 
 These definitions are sent to the Claude API as the `tools` parameter.
-9 tools covering the 3-step close workflow + supporting queries.
+Tools covering the 3-step close workflow, supporting queries and what-if scenarios.
 """
 
+# Large results are paged (agent.encoders); the agent passes a page's
+# next_cursor back to get the following rows.
+CURSOR_PROPERTY = {
+    "type": "string",
+    "description": (
+        "Only to page through a large result: the next_cursor value of a table "
+        "in an earlier result of this tool, called with the same other arguments."
+    ),
+}
+
 TOOL_DEFINITIONS = [
     {
         "name": "load_wbs_master",
@@ -23,7 +33,8 @@ TOOL_DEFINITIONS = [
                         "Values: 'Permian Basin', 'DJ Basin', 'Powder River', or 'all'"
                     ),
                     "default": "all",
-                }
+                },
+                "cursor": CURSOR_PROPERTY,
             },
             "required": [],
         },
@@ -42,7 +53,15 @@ TOOL_DEFINITIONS = [
                     "type": "string",
                     "description": "Filter by business unit, or 'all'.",
                     "default": "all",
-                }
+                },
+                "prior_period": {
+                    "type": "string",
+                    "description": (
+                        "Optional closed period (YYYY-MM) to compare against for the "
+                        "Large Swing check. Defaults to the prior accrual in the WBS master."
+                    ),
+                },
+                "cursor": CURSOR_PROPERTY,
             },
             "required": [],
         },
@@ -61,7 +80,8 @@ TOOL_DEFINITIONS = [
                     "type": "string",
                     "description": "Filter by business unit, or 'all'.",
                     "default": "all",
-                }
+                },
+                "cursor": CURSOR_PROPERTY,
             },
             "required": [],
         },
@@ -80,7 +100,8 @@ TOOL_DEFINITIONS = [
                     "type": "string",
                     "description": "Filter by business unit, or 'all'.",
                     "default": "all",
-                }
+                },
+                "cursor": CURSOR_PROPERTY,
             },
             "required": [],
         },
@@ -105,6 +126,14 @@ TOOL_DEFINITIONS = [
                     "description": "Filter exceptions by severity level.",
                     "default": "all",
                 },
+                "prior_period": {
+                    "type": "string",
+                    "description": (
+                        "Optional closed period (YYYY-MM) to compare against for the "
+                        "Large Swing check. Defaults to the prior accrual in the WBS master."
+                    ),
+                },
+                "cursor": CURSOR_PROPERTY,
             },
             "required": [],
         },
@@ -120,7 +149,10 @@ TOOL_DEFINITIONS = [
             "properties": {
                 "wbs_element": {
                     "type": "string",
-                    "description": "The WBS element ID to look up (e.g., 'WBS-1007').",
+                    "description": (
+                        "The WBS element ID to look up (e.g., 'WBS-1007'). "
+                        "A well name or AFE number is also accepted."
+                    ),
                 }
             },
             "required": ["wbs_element"],
@@ -185,10 +217,109 @@ TOOL_DEFINITIONS = [
                     "maximum": 6,
                     "default": 6,
                 },
+                "cursor": CURSOR_PROPERTY,
             },
             "required": [],
         },
     },
+    {
+        "name": "run_scenarios",
+        "description": (
+            "What-if analysis: evaluate one or more scenarios that override WI% or ops "
+            "budgets and return each scenario's close totals (net accrual, net-down "
+            "adjustment, future outlook, mismatch and over-budget counts) and the change "
+            "from the current close. Use for questions like 'what if the WI% mismatches "
+            "are corrected' (set system_wi_pct to 'wi_pct') or 'what if drilling budgets "
+            "rise 10%' (scale drill_ops_budget by 1.1). Evaluate all scenarios in one call."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "scenarios": {
+                    "type": "array",
+                    "description": "Scenarios to evaluate together.",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string", "description": "Scenario label."},
+                            "overrides": {
+                                "type": "array",
+                                "items": {
+                                    "type": "object",
+                                    "properties": {
+                                        "field": {
+                                            "type": "string",
+                                            "enum": [
+                                                "wi_pct", "system_wi_pct",
+                                                "drill_ops_budget", "comp_ops_budget",
+                                                "fb_ops_budget", "hu_ops_budget",
+                                            ],
+                                        },
+                                        "set": {
+                                            "description": (
+                                                "New value: WI% as a fraction, ops budget in "
+                                                "dollars, or 'wi_pct'/'system_wi_pct' to copy "
+                                                "the other WI field."
+                                            ),
+                                        },
+                                        "scale": {
+                                            "type": "number",
+                                            "description": "Multiplier, e.g. 1.1 for +10%.",
+                                        },
+                                        "business_unit": {
+                                            "type": "string",
+                                            "description": "Limit to one business unit.",
+                                        },
+                                        "wbs_element": {
+                                            "type": "string",
+                                            "description": "Limit to one well.",
+                                        },
+                                    },
+                                    "required": ["field"],
+                                },
+                            },
+                        },
+                        "required": ["overrides"],
+                    },
+                },
+                "business_unit": {
+                    "type": "string",
+                    "description": "Filter by business unit, or 'all'.",
+                    "default": "all",
+                },
+                "cursor": CURSOR_PROPERTY,
+            },
+            "required": ["scenarios"],
+        },
+    },
+    {
+        "name": "snapshot_close",
+        "description": (
+            "Record the current close's accruals as the snapshot for a period, so later "
+            "closes can compare against it (prior_period). Replaces an existing snapshot "
+            "for that period. Only call when the user asks to lock in or save the close."
+        ),
+        "input_schema": {
+            "type": "object",
+            "properties": {
+                "period": {
+                    "type": "string",
+                    "description": "Period to record (YYYY-MM). Defaults to the current close period.",
+                },
+            },
+            "required": [],
+        },
+    },
+    {
+        "name": "refresh_from_deltas",
+        "description": (
+            "Apply any delta files dropped since the last refresh (updated, added and "
+            "removed wells, schedule changes) and update the close for the wells they "
+            "touch. Returns the files applied and the affected wells. Rerun the close "
+            "steps afterwards to see the new figures."
+        ),
+        "input_schema": {"type": "object", "properties": {}, "required": []},
+    },
     {
         "name": "ask_user_question",
         "description": (
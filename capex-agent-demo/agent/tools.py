@@ -1,13 +1,18 @@
 """Agent tools for the 3-step capex close process.
 
-Core calculation functions (calculate_accruals, calculate_net_down,
-calculate_outlook) are cached so that composite tools like get_exceptions,
-get_close_summary, and generate_journal_entry don't redundantly recompute.
+All derived close columns are computed once by the close kernel
+(agent.engine.build_close_frame) and cached as the "close frame".  The step
+functions (calculate_accruals, calculate_net_down, calculate_outlook),
+get_well_detail and the composite tools are views over that frame, and the
+step results are cached as well so that composite tools like get_exceptions,
+get_close_summary, and generate_journal_entry don't redundantly rebuild them.
+Both caches are keyed on utils.data_loader.data_version(), so results refresh
+automatically when the input CSVs change; calls with a prior_period also key
+on the snapshot store (utils.snapshots.snapshot_version()).
 """
 
 import sys
 from datetime import date, timedelta
-from functools import lru_cache
 from pathlib import Path
 
 _REPO_ROOT = Path(__file__).resolve().parent.parent
@@ -16,44 +21,117 @@ if str(_REPO_ROOT) not in sys.path:
 
 import pandas as pd
 
-from utils.data_loader import load_wbs_master, load_drill_schedule
+from agent.allocation import (
+    CATEGORY_ALLOCATION,
+    CATEGORY_LABELS,
+    CATEGORY_PHASE_MAP,
+    allocate_load_file,
+    month_calendar,
+)
+from agent.engine import (
+    COST_CATEGORIES,
+    WI_PCT_TOLERANCE,
+    accruals_view,
+    build_close_frame,
+    net_down_exceptions,
+    net_down_view,
+    outlook_view,
+    well_detail_view,
+)
+from agent.incremental import CloseState
+from agent.scenarios import compare_scenarios
+from agent.simulation import simulate_outlook, summarize_simulation
+from agent.streaming import stream_close
+from agent.summary import CloseTotals, close_totals_by_bu
+from utils.cache import versioned_cache
+from utils.data_loader import (
+    data_version,
+    find_well,
+    load_bu_partitions,
+    load_drill_schedule,
+    load_phase_dates,
+    load_wbs_master,
+    should_stream,
+    to_dollars,
+)
+from utils.snapshots import prior_period_version, with_prior_period, write_snapshot
+
+ENGINES = ("columnar", "rowwise")
+
+REFERENCE_DATE = date(2026, 1, 1)
+CLOSE_PERIOD = REFERENCE_DATE.strftime("%Y-%m")
 
-COST_CATEGORIES = ["drill", "comp", "fb", "hu"]
 
-CATEGORY_LABELS = {
-    "drill": "Drilling",
-    "comp": "Completions",
-    "fb": "Flowback",
-    "hu": "Hookup",
-}
+@versioned_cache(data_version, maxsize=4, arg_version=prior_period_version)
+def _close_frame(prior_period: str | None = None) -> pd.DataFrame:
+    """Close kernel output for the full WBS master, built once per data load.
 
-CATEGORY_ALLOCATION = {
-    "drill": "linear",
-    "comp": "linear",
-    "fb": "linear",
-    "hu": "lump_sum",
-}
+    prior_period swaps the Large Swing baseline for that period's snapshot.
+    """
+    return build_close_frame(with_prior_period(load_wbs_master(), prior_period))
 
-CATEGORY_PHASE_MAP = {
-    "drill": ("Spud", "TD"),
-    "comp": ("Frac Start", "Frac End"),
-    "fb": ("Frac End", "First Production"),
-    "hu": ("First Production", "First Production"),
-}
 
-REFERENCE_DATE = date(2026, 1, 1)
+@versioned_cache(data_version, maxsize=1)
+def _close_state() -> CloseState:
+    """Patchable close (agent.incremental.CloseState) over the close frame."""
+    return CloseState(_close_frame())
+
+
+def close_view(business_unit: str = "all", prior_period: str | None = None) -> pd.DataFrame:
+    """Close frame rows for one business unit (or all).
+
+    The cached frame itself (or an iloc slice of it): callers must not
+    modify it.
+    """
+    cf = _close_frame(prior_period)
+    if business_unit != "all":
+        positions = load_bu_partitions().get(business_unit, [])
+        cf = cf.iloc[positions]
+    return cf
 
 
-@lru_cache(maxsize=8)
-def calculate_accruals(business_unit: str = "all") -> dict:
+@versioned_cache(data_version, maxsize=16, arg_version=prior_period_version)
+def calculate_accruals(
+    business_unit: str = "all",
+    engine: str = "columnar",
+    streaming: bool | None = None,
+    prior_period: str | None = None,
+) -> dict:
     """Step 1: Calculate gross and net accruals per well per category.
 
     Gross Accrual = VOW - ITD (per category)
     Net Accrual = Gross Accrual * WI%
 
+    engine="columnar" (default) reads the cached close frame;
+    engine="rowwise" runs the original per-well loop and is kept as the
+    reference implementation.
+
+    streaming=True reads the master in chunks (agent.streaming) and returns
+    only the summary and exceptions, without the per-well records.  Left as
+    None, the columnar engine streams when utils.data_loader.should_stream()
+    says the master is over the size threshold; callers that need the
+    per-well records (the Excel close package) pass streaming=False.
+
+    prior_period ("YYYY-MM") runs the Large Swing check against that closed
+    period's snapshot (utils.snapshots) instead of the master's
+    prior_gross_accrual column.
+
     Returns dict with accruals (list), summary (dict), exceptions (list).
     """
-    df = load_wbs_master(business_unit)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown close engine: {engine}")
+    if streaming is None:
+        streaming = engine == "columnar" and should_stream()
+    if streaming:
+        return stream_close(business_unit, prior_period=prior_period)["accruals"]
+    if engine == "columnar":
+        return accruals_view(close_view(business_unit, prior_period))
+    df = with_prior_period(load_wbs_master(business_unit), prior_period)
+    return _calculate_accruals_rowwise(to_dollars(df))
+
+
+def _calculate_accruals_rowwise(df: pd.DataFrame) -> dict:
+    """Reference row-by-row accrual calculation (see calculate_accruals)."""
     accruals = []
     exceptions = []
 
@@ -118,19 +196,37 @@ def calculate_accruals(business_unit: str = "all") -> dict:
     return {"accruals": accruals, "summary": summary, "exceptions": exceptions}
 
 
-@lru_cache(maxsize=8)
-def calculate_net_down(business_unit: str = "all") -> dict:
+@versioned_cache(data_version, maxsize=16)
+def calculate_net_down(
+    business_unit: str = "all",
+    engine: str = "columnar",
+    streaming: bool | None = None,
+) -> dict:
     """Step 2: Calculate WI% net-down adjustments.
 
-    For wells where system_wi_pct != wi_pct:
+    For wells where system_wi_pct != wi_pct (beyond WI_PCT_TOLERANCE):
     Net-Down Adjustment = Total System Cost * (System WI% - Actual WI%)
     Adjusted Net Cost = Total System Cost * Actual WI%
+
+    engine and streaming behave as in calculate_accruals.
     """
-    df = load_wbs_master(business_unit)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown close engine: {engine}")
+    if streaming is None:
+        streaming = engine == "columnar" and should_stream()
+    if streaming:
+        return stream_close(business_unit)["net_down"]
+    if engine == "columnar":
+        return net_down_view(close_view(business_unit))
+    return _calculate_net_down_rowwise(to_dollars(load_wbs_master(business_unit)))
+
+
+def _calculate_net_down_rowwise(df: pd.DataFrame) -> dict:
+    """Reference row-by-row net-down calculation (see calculate_net_down)."""
     adjustments = []
 
     for _, row in df.iterrows():
-        if row["system_wi_pct"] == row["wi_pct"]:
+        if abs(row["system_wi_pct"] - row["wi_pct"]) <= WI_PCT_TOLERANCE:
             continue
 
         total_system_cost = 0
@@ -160,14 +256,33 @@ def calculate_net_down(business_unit: str = "all") -> dict:
     return {"adjustments": adjustments, "summary": summary}
 
 
-@lru_cache(maxsize=8)
-def calculate_outlook(business_unit: str = "all") -> dict:
+@versioned_cache(data_version, maxsize=16)
+def calculate_outlook(
+    business_unit: str = "all",
+    engine: str = "columnar",
+    streaming: bool | None = None,
+) -> dict:
     """Step 3: Calculate future outlook per well per category.
 
     Future Outlook = Ops Budget - (VOW * Actual WI%)
     Negative outlook = over budget.
+
+    engine and streaming behave as in calculate_accruals; the streamed result
+    omits the per-well outlook list.
     """
-    df = load_wbs_master(business_unit)
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown close engine: {engine}")
+    if streaming is None:
+        streaming = engine == "columnar" and should_stream()
+    if streaming:
+        return stream_close(business_unit)["outlook"]
+    if engine == "columnar":
+        return outlook_view(close_view(business_unit))
+    return _calculate_outlook_rowwise(to_dollars(load_wbs_master(business_unit)))
+
+
+def _calculate_outlook_rowwise(df: pd.DataFrame) -> dict:
+    """Reference row-by-row outlook calculation (see calculate_outlook)."""
     outlook = []
     exceptions = []
 
@@ -220,15 +335,7 @@ def calculate_outlook(business_unit: str = "all") -> dict:
 
 def _get_months_forward(n_months: int = 6) -> list:
     """Generate month labels like 'Feb-26', 'Mar-26', etc."""
-    months = []
-    d = REFERENCE_DATE.replace(day=1)
-    for i in range(n_months):
-        month_offset = d.month + i
-        year = d.year + (month_offset - 1) // 12
-        month = ((month_offset - 1) % 12) + 1
-        label = date(year, month, 1).strftime("%b-%y")
-        months.append(label)
-    return months
+    return list(month_calendar(REFERENCE_DATE, n_months).labels)
 
 
 def _allocate_linear(total: float, start_date, end_date, months: list) -> dict:
@@ -271,6 +378,7 @@ def _allocate_lump_sum(total: float, target_date, months: list) -> dict:
 def generate_outlook_load_file(
     business_unit: str = "all",
     months_forward: int = 6,
+    engine: str = "columnar",
 ) -> dict:
     """Generate monthly outlook grid (well x category x month) for OneStream.
 
@@ -279,9 +387,58 @@ def generate_outlook_load_file(
     - Completions: linear by day (Frac Start -> Frac End)
     - Flowback: linear by day (Frac End -> First Production)
     - Hookup: lump sum (100% in First Production month)
+
+    engine="columnar" uses the array allocator in agent/allocation.py;
+    engine="rowwise" runs the reference per-well loop.
+    """
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown close engine: {engine}")
+    if engine == "columnar":
+        calendar = month_calendar(REFERENCE_DATE, months_forward)
+        cf = close_view(business_unit)
+        # Close-frame rows keep their master row positions as the index
+        rows = cf.index.to_numpy()
+        phases = load_phase_dates()
+        load_df = allocate_load_file(
+            cf, phases.dates[rows], phases.scheduled[rows], calendar,
+        )
+        return {"load_file": load_df, "months": list(calendar.labels)}
+    return _generate_outlook_load_file_rowwise(
+        to_dollars(load_wbs_master(business_unit)), load_drill_schedule(), months_forward,
+    )
+
+
+def simulate_schedule_slip(
+    business_unit: str = "all",
+    months_forward: int = 6,
+    trials: int = 1000,
+    seed: int | None = None,
+    slips: dict | None = None,
+    basin_slips: dict | None = None,
+) -> dict:
+    """Monte Carlo outlook: P10/P50/P90 monthly totals under phase-date slips.
+
+    slips overrides the per-phase slip distributions and basin_slips the
+    per-business-unit ones (see agent.simulation).  Returns percentile
+    rows by category, by BU, by BU and category, and overall.
     """
-    wbs_df = load_wbs_master(business_unit)
-    sched_df = load_drill_schedule()
+    calendar = month_calendar(REFERENCE_DATE, months_forward)
+    cf = close_view(business_unit)
+    rows = cf.index.to_numpy()
+    phases = load_phase_dates()
+    result = simulate_outlook(
+        cf, phases.dates[rows], phases.scheduled[rows], calendar,
+        trials=trials, seed=seed, slips=slips, basin_slips=basin_slips,
+    )
+    return summarize_simulation(result)
+
+
+def _generate_outlook_load_file_rowwise(
+    wbs_df: pd.DataFrame,
+    sched_df: pd.DataFrame,
+    months_forward: int,
+) -> dict:
+    """Reference per-well load-file allocation (see generate_outlook_load_file)."""
     months = _get_months_forward(months_forward)
 
     # Build schedule lookup: {wbs_element: {phase: date}}
@@ -358,19 +515,19 @@ def _count_by(items: list, key: str) -> dict:
 def get_exceptions(
     business_unit: str = "all",
     severity: str = "all",
+    prior_period: str | None = None,
 ) -> dict:
-    """Get all exceptions from all 3 steps, optionally filtered by severity."""
-    accrual_result = calculate_accruals(business_unit)
+    """Get all exceptions from all 3 steps, optionally filtered by severity.
+
+    prior_period is passed to calculate_accruals (Large Swing baseline).
+    """
+    accrual_result = calculate_accruals(business_unit, prior_period=prior_period)
     net_down_result = calculate_net_down(business_unit)
     outlook_result = calculate_outlook(business_unit)
 
     all_exceptions = (
         accrual_result["exceptions"]
-        + [{"wbs_element": a["wbs_element"], "well_name": a.get("well_name", ""),
-            "exception_type": "WI% Mismatch", "severity": "MEDIUM",
-            "detail": f"System WI={a['system_wi_pct']:.0%} vs Actual WI={a['actual_wi_pct']:.0%}, "
-                      f"adjustment=${a['net_down_adjustment']:,.0f}"}
-           for a in net_down_result["adjustments"]]
+        + net_down_exceptions(net_down_result["adjustments"])
         + outlook_result["exceptions"]
     )
 
@@ -386,72 +543,33 @@ def get_exceptions(
 
 
 def get_well_detail(wbs_element: str) -> dict:
-    """Full waterfall detail for a single well: accrual -> net-down -> outlook."""
-    wbs_df = load_wbs_master()
-    row = wbs_df[wbs_df["wbs_element"] == wbs_element]
-    if row.empty:
-        return {"error": f"WBS element {wbs_element} not found"}
-    row = row.iloc[0]
-
-    detail = {
-        "wbs_element": row["wbs_element"],
-        "well_name": row["well_name"],
-        "business_unit": row["business_unit"],
-        "status": row["status"],
-        "wi_pct": row["wi_pct"],
-        "system_wi_pct": row["system_wi_pct"],
-    }
+    """Full waterfall detail for a single well: accrual -> net-down -> outlook.
 
-    total_gross = 0
-    total_net = 0
-    total_system_cost = 0
-    total_future = 0
-
-    for cat in COST_CATEGORIES:
-        vow = row[f"{cat}_vow"]
-        itd = row[f"{cat}_itd"]
-        gross = vow - itd
-        net = gross * row["wi_pct"]
-        in_system = vow * row["wi_pct"]
-        ops = row[f"{cat}_ops_budget"]
-        future = ops - in_system
-
-        detail[f"{cat}_itd"] = itd
-        detail[f"{cat}_vow"] = vow
-        detail[f"{cat}_gross_accrual"] = gross
-        detail[f"{cat}_net_accrual"] = net
-        detail[f"{cat}_ops_budget"] = ops
-        detail[f"{cat}_future_outlook"] = future
-
-        total_gross += gross
-        total_net += net
-        total_system_cost += vow
-        total_future += future
-
-    wi_discrepancy = row["system_wi_pct"] - row["wi_pct"]
-    net_down_adj = total_system_cost * wi_discrepancy
-
-    detail["total_gross_accrual"] = total_gross
-    detail["total_net_accrual"] = total_net
-    detail["net_down_adjustment"] = net_down_adj
-    detail["total_in_system"] = total_system_cost * row["wi_pct"]
-    detail["total_future_outlook"] = total_future
-    detail["prior_gross_accrual"] = row["prior_gross_accrual"]
-
-    return detail
+    The well is resolved through the loader's hash index, so wbs_element may
+    also be a well name or AFE number.  Money values are float dollars
+    (agent.engine.well_detail_view).
+    """
+    position = find_well(wbs_element)
+    if position is None:
+        return {"error": f"WBS element {wbs_element} not found"}
+    return well_detail_view(_close_frame(), position)
 
 
 def generate_journal_entry(business_unit: str = "all") -> dict:
     """Generate the net-down + accrual journal entry for GL posting."""
     accrual_result = calculate_accruals(business_unit)
     net_down_result = calculate_net_down(business_unit)
+    return journal_entry_for(CLOSE_PERIOD, accrual_result["summary"], net_down_result["summary"])
+
 
-    total_net_accrual = accrual_result["summary"]["total_net_accrual"]
-    total_wi_adjustment = net_down_result["summary"]["total_net_down_adjustment"]
+def journal_entry_for(period: str, accrual_summary: dict, net_down_summary: dict) -> dict:
+    """Journal entry for a period from accrual and net-down step summaries."""
+    total_net_accrual = accrual_summary["total_net_accrual"]
+    total_wi_adjustment = net_down_summary["total_net_down_adjustment"]
     net_down_amount = total_net_accrual - total_wi_adjustment
 
     journal_entry = {
-        "period": "2026-01",
+        "period": period,
         "description": "Monthly CapEx Gross Accrual with WI% Net-Down",
         "debit_account": "1410-000 CapEx WIP",
         "credit_account": "2110-000 Accrued Liabilities",
@@ -463,38 +581,82 @@ def generate_journal_entry(business_unit: str = "all") -> dict:
     return {"journal_entry": journal_entry}
 
 
-def get_close_summary(business_unit: str = "all") -> dict:
-    """Final close summary with all totals, grouped by BU."""
-    wbs_df = load_wbs_master()
-    bus = wbs_df["business_unit"].unique()
-
-    by_bu = {}
-    for bu in bus:
-        accruals = calculate_accruals(bu)
-        net_down = calculate_net_down(bu)
-        outlook = calculate_outlook(bu)
-
-        by_bu[bu] = {
-            "total_gross_accrual": accruals["summary"]["total_gross_accrual"],
-            "total_net_accrual": accruals["summary"]["total_net_accrual"],
-            "total_net_down_adjustment": net_down["summary"]["total_net_down_adjustment"],
-            "total_future_outlook": outlook["summary"]["total_future_outlook"],
-            "well_count": accruals["summary"]["well_count"],
-            "exception_count": accruals["summary"]["exception_count"] + outlook["summary"]["over_budget_count"],
-        }
+def get_close_summary(business_unit: str = "all", streaming: bool | None = None) -> dict:
+    """Final close summary with all totals, grouped by BU.
 
-    grand = {k: sum(v[k] for v in by_bu.values())
-             for k in ["total_gross_accrual", "total_net_accrual",
-                       "total_net_down_adjustment", "total_future_outlook",
-                       "well_count", "exception_count"]}
+    The grand totals are a merge of the per-BU CloseTotals partials (exact
+    integer cents), with exception counts by type and severity.  streaming
+    behaves as in calculate_accruals.
+    """
+    if streaming is None:
+        streaming = should_stream()
+    if streaming:
+        by_bu = stream_close(business_unit)["close_totals"]
+    else:
+        by_bu = close_totals_by_bu(close_view(business_unit))
+    grand = CloseTotals.merge_all(by_bu.values())
+    return {
+        "by_business_unit": {bu: totals.as_dict() for bu, totals in by_bu.items()},
+        "grand_totals": grand.as_dict(),
+        "exceptions_by_type": grand.by_type(),
+        "exceptions_by_severity": grand.by_severity(),
+    }
 
-    return {"by_business_unit": by_bu, "grand_totals": grand}
+
+def run_scenarios(scenarios: list, business_unit: str = "all") -> dict:
+    """What-if close totals for WI% and ops budget overrides.
+
+    scenarios is a list of {"name", "overrides"} dicts (see agent.scenarios);
+    all of them are evaluated together.  Returns the baseline totals and,
+    per scenario, its totals and the change from the baseline.
+    """
+    result = compare_scenarios(close_view(business_unit), scenarios)
+    return {"business_unit": business_unit, "scenario_count": len(scenarios), **result}
+
+
+def snapshot_close(period: str = CLOSE_PERIOD):
+    """Record the current close's accruals as the snapshot for period."""
+    return write_snapshot(period, _close_frame())
+
+
+def refresh_from_deltas():
+    """Ingest dropped delta files and patch the close for the changed wells.
+
+    Only updated/added wells go back through the close kernel
+    (agent.incremental.CloseState); the patched close frame and the
+    business_unit="all" step results are put straight into their caches for
+    the new data version.  Returns the utils.ingest.IngestReport.
+    """
+    from utils.ingest import ingest_deltas
+
+    state = _close_state()
+    report = ingest_deltas()
+    if report.updated or report.added or report.removed:
+        master = load_wbs_master()
+        changed = master[master["wbs_element"].isin(report.updated + report.added)]
+        state.apply_delta(changed, report.removed)
+    if report.files:
+        _close_state.cache_put(state)
+        _close_frame.cache_put(state.cf)
+        steps = {calculate_accruals: state.accruals(), calculate_net_down: state.net_down(),
+                 calculate_outlook: state.outlook()}
+        # streaming=None is the full result too while the master is under
+        # the streaming threshold
+        for streaming in [False] if should_stream() else [False, None]:
+            for step, result in steps.items():
+                step.cache_put(result, streaming=streaming)
+    return report
 
 
 def clear_caches():
     """Clear all calculation caches (and underlying data caches)."""
     from utils.data_loader import clear_caches as clear_data_caches
+    from utils.snapshots import clear_caches as clear_snapshot_caches
     calculate_accruals.cache_clear()
     calculate_net_down.cache_clear()
     calculate_outlook.cache_clear()
+    _close_frame.cache_clear()
+    _close_state.cache_clear()
+    stream_close.cache_clear()
     clear_data_caches()
+    clear_snapshot_caches()
@@ -19,6 +19,7 @@ from agent.orchestrator import (
     TextEvent,
     ToolCallEvent,
     ToolResultEvent,
+    ToolResultMemo,
 )
 from agent.tools import generate_outlook_load_file
 from utils.excel_export import generate_close_package
@@ -100,6 +101,8 @@ if "api_messages" not in st.session_state:
     st.session_state.api_messages = []  # Claude API messages (includes tool_use/tool_result)
 if "tools_called" not in st.session_state:
     st.session_state.tools_called = []
+if "tool_memo" not in st.session_state:
+    st.session_state.tool_memo = ToolResultMemo()  # repeated tool calls in this conversation
 if "run_agent" not in st.session_state:
     st.session_state.run_agent = False
 if "pending_question" not in st.session_state:
@@ -115,6 +118,7 @@ TOOL_DISPLAY_NAMES = {
     "generate_journal_entry": "Generating Journal Entry",
     "get_close_summary": "Generating Close Summary",
     "generate_outlook_load_file": "Generating OneStream Load File",
+    "run_scenarios": "Running What-If Scenarios",
 }
 
 # ---------------------------------------------------------------------------
@@ -144,19 +148,22 @@ with st.sidebar:
         st.subheader("Tools Used")
         for i, t in enumerate(st.session_state.tools_called, 1):
             st.text(f"  {i}. {TOOL_DISPLAY_NAMES.get(t, t)}")
+        memo = st.session_state.tool_memo
+        if memo.hits:
+            st.caption(f"Reused results: {memo.hits} of {memo.hits + memo.misses} calls")
 
     st.divider()
 
     # Data summary
     st.subheader("Data")
-    from utils.data_loader import load_wbs_master
+    from utils.data_loader import load_bu_partitions, load_wbs_master
 
     @st.cache_data
     def _load_summary():
         df = load_wbs_master()
         return {
             "wells": len(df),
-            "bus": list(df["business_unit"].unique()),
+            "bus": list(load_bu_partitions()),
         }
 
     summary = _load_summary()
@@ -202,6 +209,7 @@ with st.sidebar:
         st.session_state.messages = []
         st.session_state.api_messages = []
         st.session_state.tools_called = []
+        st.session_state.tool_memo = ToolResultMemo()
         st.session_state.run_agent = False
         st.session_state.pending_question = None
         st.rerun()
@@ -282,7 +290,7 @@ def _run_agent():
         st.stop()
 
     model = os.environ.get("CAPEX_MODEL", "claude-sonnet-4-6")
-    agent = AgentOrchestrator(api_key=api_key, model=model)
+    agent = AgentOrchestrator(api_key=api_key, model=model, memo=st.session_state.tool_memo)
 
     with st.chat_message("assistant"):
         breadcrumb_container = st.container()
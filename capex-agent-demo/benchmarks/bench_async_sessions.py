@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""Load test: concurrent close sessions on one event loop vs one thread each.
+
+Starts the fake Claude API (benchmarks/fake_api.py) in a separate process
+and runs N scripted close sessions (two API round trips plus
+calculate_net_down/calculate_outlook per session) at once:
+
+- async: N AsyncAgentOrchestrator.run() sessions on a single event loop
+  thread, tools on the shared tool executor;
+- sync (--sync): N AgentOrchestrator.run() sessions, one thread each, the way
+  Streamlit serves them.
+
+For each N it reports wall time, sessions/s, process CPU per session,
+"sessions per core" — concurrent sessions divided by the cores' worth of
+CPU the process actually used (CPU time / wall time) — and the peak thread
+count, which is what ties up a Streamlit server at month-end.
+
+    python benchmarks/bench_async_sessions.py
+    python benchmarks/bench_async_sessions.py --sessions 10 100 500 --latency 0.5 --sync
+"""
+
+import argparse
+import asyncio
+import socket
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import anthropic
+
+from agent.orchestrator import AgentOrchestrator, AsyncAgentOrchestrator
+
+PROMPT = [{"role": "user", "content": "Run net-down and outlook"}]
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_server(port: int, latency: float) -> subprocess.Popen:
+    proc = subprocess.Popen(
+        [sys.executable, str(Path(__file__).with_name("fake_api.py")),
+         "--port", str(port), "--latency", str(latency)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    proc.stdout.readline()  # "Fake Claude API on ..." once listening
+    return proc
+
+
+def run_async(n: int, base_url: str):
+    async def session(client):
+        agent = AsyncAgentOrchestrator(client=client)
+        return [e async for e in agent.run([dict(m) for m in PROMPT])]
+
+    async def run_all():
+        # One client (and connection pool) shared by every session
+        async with anthropic.AsyncAnthropic(api_key="bench", base_url=base_url) as client:
+            return await asyncio.gather(*(session(client) for _ in range(n)))
+
+    return asyncio.run(run_all())
+
+
+def run_sync(n: int, base_url: str):
+    client = anthropic.Anthropic(api_key="bench", base_url=base_url)
+
+    def session():
+        agent = AgentOrchestrator(client=client, max_tool_workers=1)
+        return list(agent.run([dict(m) for m in PROMPT]))
+
+    with client, ThreadPoolExecutor(max_workers=n) as pool:
+        return list(pool.map(lambda _: session(), range(n)))
+
+
+def measure(runner, n: int, base_url: str) -> dict:
+    peak = [threading.active_count()]
+    done_event = threading.Event()
+
+    def sample():
+        while not done_event.wait(0.01):
+            peak[0] = max(peak[0], threading.active_count())
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    wall0, cpu0 = time.perf_counter(), time.process_time()
+    results = runner(n, base_url)
+    wall = time.perf_counter() - wall0
+    cpu = time.process_time() - cpu0
+    done_event.set()
+    sampler.join()
+    done = sum(1 for events in results if events and events[-1].type == "done")
+    return {
+        "sessions": n,
+        "done": done,
+        "wall": wall,
+        "rate": done / wall,
+        "cpu_ms": 1000 * cpu / max(1, done),
+        "per_core": n / max(cpu / wall, 1e-9),
+        "threads": peak[0] - 1,  # minus the sampler
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50, 200])
+    parser.add_argument("--latency", type=float, default=0.25,
+                        help="fake model time per API response (s)")
+    parser.add_argument("--sync", action="store_true", help="also run thread-per-session")
+    args = parser.parse_args()
+
+    port = free_port()
+    server = start_server(port, args.latency)
+    base_url = f"http://127.0.0.1:{port}"
+    modes = [("async", run_async)] + ([("sync", run_sync)] if args.sync else [])
+    try:
+        # Warm the data caches so the first row isn't a cold load
+        run_async(1, base_url)
+        print(f"{'mode':<6} {'sessions':>8} {'done':>5} {'wall (s)':>9} {'sess/s':>8} "
+              f"{'cpu ms/sess':>12} {'sess/core':>10} {'threads':>8}")
+        for n in args.sessions:
+            for mode, runner in modes:
+                r = measure(runner, n, base_url)
+                print(f"{mode:<6} {r['sessions']:>8} {r['done']:>5} {r['wall']:>9.2f} "
+                      f"{r['rate']:>8.1f} {r['cpu_ms']:>12.1f} {r['per_core']:>10.0f} "
+                      f"{r['threads']:>8}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    main()
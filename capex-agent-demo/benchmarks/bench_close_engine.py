@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""Benchmark: columnar close engine vs the reference row-wise loops.
+
+Tiles data/wbs_master.csv up to N synthetic wells and times the net-down
+and accrual calculations on both engines.
+
+    python benchmarks/bench_close_engine.py                # 10k and 100k wells
+    python benchmarks/bench_close_engine.py --wells 1500 --repeat 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np
+import pandas as pd
+
+from agent.engine import accruals_view, build_close_frame, net_down_view
+from agent.tools import _calculate_accruals_rowwise, _calculate_net_down_rowwise
+from utils.data_loader import load_wbs_master, to_dollars
+
+CASES = {
+    "net_down": (_calculate_net_down_rowwise, lambda df: net_down_view(build_close_frame(df))),
+    "accruals": (_calculate_accruals_rowwise, lambda df: accruals_view(build_close_frame(df))),
+}
+
+
+def synthetic_master(n_wells: int) -> pd.DataFrame:
+    """Tile the demo master to n_wells rows with unique WBS elements."""
+    base = load_wbs_master()
+    reps = -(-n_wells // len(base))
+    df = pd.concat([base] * reps, ignore_index=True).head(n_wells).copy()
+    df["wbs_element"] = [f"WBS-{i:07d}" for i in range(n_wells)]
+    return df
+
+
+def best_of(fn, df: pd.DataFrame, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(df)
+        timings.append(time.perf_counter() - t0)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--wells", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'case':<10} {'wells':>8} {'rowwise (s)':>12} {'columnar (s)':>13} {'speedup':>9}")
+    for n in args.wells:
+        df = synthetic_master(n)
+        for case, (rowwise, columnar) in CASES.items():
+            # Row-wise loop is slow enough that one run is representative
+            t_row = best_of(rowwise, to_dollars(df), 1)
+            t_col = best_of(columnar, df, args.repeat)
+            speedup = t_row / t_col if t_col else np.inf
+            print(f"{case:<10} {n:>8,} {t_row:>12.3f} {t_col:>13.4f} {speedup:>8.0f}x")
+
+
+if __name__ == "__main__":
+    main()
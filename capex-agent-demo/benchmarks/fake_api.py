@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""Local fake of the Claude Messages API (streaming only), for load tests.
+
+Speaks just enough HTTP/1.1 + server-sent events for the anthropic SDK's
+messages.stream(): every POST /v1/messages gets a scripted close turn.
+
+- a user turn with plain text gets a short text block plus tool_use blocks
+  for calculate_net_down and calculate_outlook;
+- a user turn carrying tool_result blocks gets a final text answer.
+
+Each response waits `latency` seconds before its first event (model time),
+so the server is I/O-bound like the real API and many sessions can overlap.
+
+Prompt caching is simulated (PromptCache): every cache_control breakpoint
+in tools, system and messages stores the prompt prefix up to it, and the
+usage in message_start reports cache reads/writes the way the API does.
+Tokens are estimated at 4 characters each and there is no minimum
+cacheable length or expiry.
+
+    python benchmarks/fake_api.py --port 8765 --latency 0.2
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import threading
+from itertools import count
+
+TOOL_CALLS = [
+    ("calculate_net_down", {"business_unit": "all"}),
+    ("calculate_outlook", {"business_unit": "all"}),
+]
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode()
+
+
+def _prompt_segments(body: dict):
+    """(canonical text, has breakpoint) per cacheable block, in cache order."""
+    def segment(block):
+        if isinstance(block, dict):
+            marked = "cache_control" in block
+            block = {k: v for k, v in block.items() if k != "cache_control"}
+        else:
+            marked = False
+        return json.dumps(block, sort_keys=True), marked
+
+    yield segment(body["model"])
+    for tool in body.get("tools", []):
+        yield segment(tool)
+    system = body.get("system", [])
+    for block in [system] if isinstance(system, str) else system:
+        yield segment(block)
+    for message in body["messages"]:
+        content = message["content"]
+        for block in [content] if isinstance(content, str) else content:
+            yield segment({"role": message["role"], "block": block} if not isinstance(block, dict)
+                          else {**block, "role": message["role"]})
+
+
+class PromptCache:
+    """Prompt prefixes stored at cache breakpoints, as hashes."""
+
+    def __init__(self):
+        self._prefixes = set()
+
+    def usage(self, body: dict) -> dict:
+        """The request's input token usage, reading and writing the cache."""
+        digest = hashlib.sha256()
+        total = 0
+        breakpoints = []  # (tokens up to the breakpoint, prefix hash)
+        for text, marked in _prompt_segments(body):
+            digest.update(text.encode())
+            total += max(1, len(text) // 4)
+            if marked:
+                breakpoints.append((total, digest.hexdigest()))
+        read = max((n for n, h in breakpoints if h in self._prefixes), default=0)
+        written = max(0, breakpoints[-1][0] - read) if breakpoints else 0
+        self._prefixes.update(h for _, h in breakpoints)
+        return {"input_tokens": total - read - written, "cache_read_input_tokens": read,
+                "cache_creation_input_tokens": written}
+
+
+def _has_tool_results(body: dict) -> bool:
+    content = body["messages"][-1]["content"]
+    return isinstance(content, list) and any(
+        isinstance(b, dict) and b.get("type") == "tool_result" for b in content
+    )
+
+
+def scripted_events(body: dict, ids, usage: dict | None = None) -> list:
+    """The SSE events of one scripted response to a messages request."""
+    n = next(ids)
+    usage = {**(usage or {"input_tokens": 1000}), "output_tokens": 1}
+    events = [_sse("message_start", {"type": "message_start", "message": {
+        "id": f"msg_{n}", "type": "message", "role": "assistant", "model": body["model"],
+        "content": [], "stop_reason": None, "stop_sequence": None, "usage": usage,
+    }})]
+
+    def text(index, value):
+        events.extend([
+            _sse("content_block_start", {"type": "content_block_start", "index": index,
+                                         "content_block": {"type": "text", "text": ""}}),
+            _sse("content_block_delta", {"type": "content_block_delta", "index": index,
+                                         "delta": {"type": "text_delta", "text": value}}),
+            _sse("content_block_stop", {"type": "content_block_stop", "index": index}),
+        ])
+
+    if _has_tool_results(body):
+        text(0, "Net-down and outlook are done.")
+        stop_reason = "end_turn"
+    else:
+        text(0, "Running net-down and outlook.")
+        for i, (name, tool_input) in enumerate(TOOL_CALLS, 1):
+            events.extend([
+                _sse("content_block_start", {"type": "content_block_start", "index": i,
+                                             "content_block": {"type": "tool_use",
+                                                               "id": f"toolu_{n}_{i}",
+                                                               "name": name, "input": {}}}),
+                _sse("content_block_delta", {"type": "content_block_delta", "index": i,
+                                             "delta": {"type": "input_json_delta",
+                                                       "partial_json": json.dumps(tool_input)}}),
+                _sse("content_block_stop", {"type": "content_block_stop", "index": i}),
+            ])
+        stop_reason = "tool_use"
+    events.append(_sse("message_delta", {"type": "message_delta",
+                                         "delta": {"stop_reason": stop_reason, "stop_sequence": None},
+                                         "usage": {"output_tokens": 20}}))
+    events.append(_sse("message_stop", {"type": "message_stop"}))
+    return events
+
+
+class FakeAnthropicServer:
+    """asyncio HTTP server replaying scripted streaming responses."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.requests = 0
+        self.cache = PromptCache()
+        self._ids = count(1)
+        self._thread = None
+        self._loop = None
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = json.loads(await reader.readexactly(int(headers.get("content-length", 0))))
+                self.requests += 1
+                await asyncio.sleep(self.latency)
+                writer.write(b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\n"
+                             b"cache-control: no-cache\r\ntransfer-encoding: chunked\r\n\r\n")
+                for event in scripted_events(body, self._ids, self.cache.usage(body)):
+                    writer.write(b"%x\r\n%s\r\n" % (len(event), event))
+                writer.write(b"0\r\n\r\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self._server
+
+    def start(self) -> "FakeAnthropicServer":
+        """Serve from a background thread with its own event loop."""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            self._loop.run_until_complete(self.serve())
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait(5)
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(5)
+        self._loop.close()
+        self._loop = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    async def run():
+        server = FakeAnthropicServer(args.host, args.port, args.latency)
+        await server.serve()
+        print(f"Fake Claude API on {server.base_url} (latency {args.latency}s)", flush=True)
+        await asyncio.Event().wait()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
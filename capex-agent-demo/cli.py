@@ -17,6 +17,7 @@ from agent.orchestrator import (
     TextEvent,
     ToolCallEvent,
     ToolResultEvent,
+    UsageEvent,
 )
 
 load_dotenv()
@@ -33,6 +34,7 @@ TOOL_ICONS_EMOJI = {
     "generate_journal_entry": "📝",
     "get_close_summary": "📋",
     "generate_outlook_load_file": "📁",
+    "run_scenarios": "🔀",
 }
 
 TOOL_ICONS_ASCII = {
@@ -45,6 +47,7 @@ TOOL_ICONS_ASCII = {
     "generate_journal_entry": "[journal]",
     "get_close_summary": "[summary]",
     "generate_outlook_load_file": "[file]",
+    "run_scenarios": "[what-if]",
 }
 
 TOOL_ICONS = TOOL_ICONS_ASCII if _USE_ASCII else TOOL_ICONS_EMOJI
@@ -82,6 +85,7 @@ def main():
         messages.append({"role": "user", "content": user_input})
 
         print()
+        cache_read = cache_written = 0
         for event in agent.run(messages):
             if isinstance(event, ToolCallEvent):
                 fallback = "[>]" if _USE_ASCII else "🔧"
@@ -91,12 +95,17 @@ def main():
                 pass  # Handled by the tool call event
             elif isinstance(event, TextEvent):
                 print(event.text, end="", flush=True)
+            elif isinstance(event, UsageEvent):
+                cache_read += event.cache_read_input_tokens
+                cache_written += event.cache_creation_input_tokens
             elif isinstance(event, DoneEvent):
                 pass
             elif isinstance(event, ErrorEvent):
                 err_icon = "[X]" if _USE_ASCII else "❌"
                 print(f"\n{err_icon} Error: {event.message}")
 
+        if cache_read or cache_written:
+            print(f"\n  (prompt cache: {cache_read:,} tokens read, {cache_written:,} written)")
         print("\n")
 
 
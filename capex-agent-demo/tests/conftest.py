@@ -0,0 +1,119 @@
+"""Shared pytest fixtures."""
+
+import shutil
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import data_loader
+
+
+@pytest.fixture
+def tmp_data_dir(tmp_path, monkeypatch):
+    """Point the data loader at a scratch copy of the CSVs."""
+    for name in data_loader.DATA_FILES:
+        shutil.copy(data_loader.DATA_DIR / name, tmp_path / name)
+    monkeypatch.setattr(data_loader, "DATA_DIR", tmp_path)
+    yield tmp_path
+
+
+# ---------------------------------------------------------------------------
+# Fake Claude API client for orchestrator tests
+# ---------------------------------------------------------------------------
+
+def text_block(text: str):
+    return SimpleNamespace(type="text", text=text)
+
+
+def tool_use_block(tool_use_id: str, name: str, tool_input: dict | None = None):
+    return SimpleNamespace(type="tool_use", id=tool_use_id, name=name, input=tool_input or {})
+
+
+class FakeStream:
+    """Stands in for the context manager returned by messages.stream()."""
+
+    def __init__(self, message):
+        self.message = message
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        return (b.text for b in self.message.content if b.type == "text")
+
+    def get_final_message(self):
+        return self.message
+
+
+class FakeMessages:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeStream(SimpleNamespace(content=self.responses.pop(0)))
+
+
+@pytest.fixture
+def fake_orchestrator():
+    """Build an AgentOrchestrator whose client replays canned responses.
+
+    Each response is a list of content blocks (text_block/tool_use_block).
+    """
+    from agent.orchestrator import AgentOrchestrator
+
+    def build(responses, **kwargs):
+        orchestrator = AgentOrchestrator(api_key="test-key", **kwargs)
+        orchestrator.client = SimpleNamespace(messages=FakeMessages(responses))
+        return orchestrator
+
+    return build
+
+
+class FakeAsyncStream(FakeStream):
+    """Async counterpart of FakeStream (AsyncAnthropic messages.stream())."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    @property
+    def text_stream(self):
+        async def texts():
+            for block in self.message.content:
+                if block.type == "text":
+                    yield block.text
+        return texts()
+
+    async def get_final_message(self):
+        return self.message
+
+
+class FakeAsyncMessages(FakeMessages):
+    def stream(self, **kwargs):
+        self.calls.append(kwargs)
+        return FakeAsyncStream(SimpleNamespace(content=self.responses.pop(0)))
+
+
+@pytest.fixture
+def fake_async_orchestrator():
+    """AsyncAgentOrchestrator counterpart of fake_orchestrator."""
+    from agent.orchestrator import AsyncAgentOrchestrator
+
+    def build(responses, **kwargs):
+        orchestrator = AsyncAgentOrchestrator(api_key="test-key", **kwargs)
+        orchestrator.client = SimpleNamespace(messages=FakeAsyncMessages(responses))
+        return orchestrator
+
+    return build
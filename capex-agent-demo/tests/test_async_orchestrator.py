@@ -0,0 +1,145 @@
+"""Tests for the asyncio orchestrator."""
+
+import asyncio
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import anthropic
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import orchestrator
+from agent.orchestrator import AsyncAgentOrchestrator, ClarifyEvent, DoneEvent
+from benchmarks.fake_api import FakeAnthropicServer
+from tests.conftest import text_block, tool_use_block
+
+CLOSE_TURNS = [
+    [text_block("Running."),
+     tool_use_block("toolu_1", "calculate_net_down", {"business_unit": "all"}),
+     tool_use_block("toolu_2", "calculate_outlook", {"business_unit": "DJ Basin"})],
+    [text_block("All done.")],
+]
+
+
+async def _collect(agen) -> list:
+    return [event async for event in agen]
+
+
+def _shape(events) -> list:
+    """Events with the fields a UI reads, for sync/async comparison."""
+    return [(e.type, getattr(e, "text", None), getattr(e, "tool_name", None),
+             getattr(e, "result_preview", None), getattr(e, "full_response", None))
+            for e in events]
+
+
+class TestSameEventsAsSync:
+    def test_close_turns(self, fake_orchestrator, fake_async_orchestrator):
+        sync_messages = [{"role": "user", "content": "close"}]
+        async_messages = [{"role": "user", "content": "close"}]
+        sync_events = list(fake_orchestrator(CLOSE_TURNS).run(sync_messages))
+        async_events = asyncio.run(_collect(
+            fake_async_orchestrator(CLOSE_TURNS).run(async_messages)))
+        assert _shape(async_events) == _shape(sync_events)
+        assert async_messages[2] == sync_messages[2]
+        assert isinstance(async_events[-1], DoneEvent)
+
+    def test_clarify_pauses(self, fake_async_orchestrator):
+        turns = [[tool_use_block("toolu_9", "ask_user_question",
+                                 {"question": "Proceed?", "options": ["Yes", "No"]})]]
+        events = asyncio.run(_collect(
+            fake_async_orchestrator(turns).run([{"role": "user", "content": "close"}])))
+        assert isinstance(events[-1], ClarifyEvent)
+        assert events[-1].tool_use_id == "toolu_9"
+
+    def test_tools_run_on_given_executor(self, fake_async_orchestrator, monkeypatch):
+        seen = []
+        real = orchestrator.dispatch_tool
+
+        def spy(name, args):
+            seen.append(threading.current_thread().name)
+            return real(name, args)
+
+        monkeypatch.setattr(orchestrator, "dispatch_tool", spy)
+        with ThreadPoolExecutor(2, thread_name_prefix="test-tools") as executor:
+            agent = fake_async_orchestrator(CLOSE_TURNS, executor=executor)
+            asyncio.run(_collect(agent.run([{"role": "user", "content": "close"}])))
+        assert len(seen) == 2
+        assert all(name.startswith("test-tools") for name in seen)
+
+
+class TestInit:
+    def test_shares_base_initialiser(self):
+        memo = orchestrator.ToolResultMemo()
+        agent = AsyncAgentOrchestrator(api_key="test-key", memo=memo, prompt_caching=False,
+                                       max_tool_workers=2)
+        assert isinstance(agent.client, anthropic.AsyncAnthropic)
+        assert (agent.memo, agent.prompt_caching, agent.max_tool_workers) == (memo, False, 2)
+        assert agent.executor is None and agent._owns_client
+
+    def test_max_tool_workers_bounds_a_turn(self, fake_async_orchestrator, monkeypatch):
+        state = {"running": 0, "max_running": 0}
+        lock = threading.Lock()
+
+        def slow(name, args):
+            with lock:
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+            time.sleep(0.05)
+            with lock:
+                state["running"] -= 1
+            return "{}"
+
+        monkeypatch.setattr(orchestrator, "dispatch_tool", slow)
+        turns = [[tool_use_block(f"toolu_{i}", "get_well_detail", {"wbs_element": f"WBS-{i}"})
+                  for i in range(6)], [text_block("Done.")]]
+        with ThreadPoolExecutor(6) as executor:
+            agent = fake_async_orchestrator(turns, executor=executor, max_tool_workers=2)
+            asyncio.run(_collect(agent.run([{"role": "user", "content": "close"}])))
+        assert state["max_running"] == 2
+
+
+@pytest.fixture
+def fake_api():
+    server = FakeAnthropicServer(latency=0.2).start()
+    yield server
+    server.stop()
+
+
+class TestAgainstFakeServer:
+    def test_concurrent_sessions_overlap(self, fake_api):
+        n_sessions = 20
+
+        async def session(client):
+            agent = AsyncAgentOrchestrator(client=client)
+            return await _collect(agent.run([{"role": "user", "content": "Run the close"}]))
+
+        async def run_all():
+            async with anthropic.AsyncAnthropic(api_key="test-key", base_url=fake_api.base_url) as client:
+                return await asyncio.gather(*(session(client) for _ in range(n_sessions)))
+
+        start = time.perf_counter()
+        results = asyncio.run(run_all())
+        elapsed = time.perf_counter() - start
+
+        # Two API round trips of 0.2s each per session; run one after another
+        # the sessions would take 8s
+        assert elapsed < 2.5
+        assert fake_api.requests == 2 * n_sessions
+        for events in results:
+            assert [e.type for e in events if e.type != "text"] == [
+                "usage", "tool_call", "tool_call", "tool_result", "tool_result", "usage", "done"]
+            assert events[-1].full_response == "Net-down and outlook are done."
+
+    def test_own_client_closes(self, fake_api):
+        async def one_session():
+            async with AsyncAgentOrchestrator(api_key="test-key", base_url=fake_api.base_url) as agent:
+                events = await _collect(agent.run([{"role": "user", "content": "Run the close"}]))
+            return events, agent.client.is_closed()
+
+        events, closed = asyncio.run(one_session())
+        assert events[-1].type == "done"
+        assert closed
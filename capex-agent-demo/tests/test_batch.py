@@ -0,0 +1,59 @@
+"""Tests for the batch multi-period close runner."""
+
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import tools
+from agent.allocation import allocate_load_file, month_calendar
+from agent.batch import run_close_batch
+from utils.data_loader import load_phase_dates
+from utils.snapshots import period_start, write_snapshot
+
+PERIODS = ["2025-10", "2025-11", "2025-12", "2026-01", "2026-02", "2026-06"]
+
+
+@pytest.fixture
+def store(tmp_data_dir):
+    tools.clear_caches()
+    yield
+    tools.clear_caches()
+
+
+class TestRunCloseBatch:
+    def test_current_period_matches_tools(self):
+        result = run_close_batch([tools.CLOSE_PERIOD])[tools.CLOSE_PERIOD]
+        assert result["accruals"] == tools.calculate_accruals()
+        assert result["net_down"] == tools.calculate_net_down()
+        assert result["outlook"] == tools.calculate_outlook()
+        assert result["journal_entry"] == tools.generate_journal_entry()["journal_entry"]
+        expected = tools.generate_outlook_load_file()
+        assert result["load_file"]["months"] == expected["months"]
+        pd.testing.assert_frame_equal(result["load_file"]["load_file"], expected["load_file"])
+
+    @pytest.mark.parametrize("business_unit", ["all", "DJ Basin"])
+    @pytest.mark.parametrize("months_forward", [1, 6, 12])
+    def test_load_files_match_per_period_allocation(self, business_unit, months_forward):
+        results = run_close_batch(PERIODS, business_unit, months_forward)
+        assert list(results) == PERIODS
+        cf = tools.close_view(business_unit)
+        phases = load_phase_dates()
+        rows = cf.index.to_numpy()
+        for period in PERIODS:
+            calendar = month_calendar(period_start(period), months_forward)
+            expected = allocate_load_file(cf, phases.dates[rows], phases.scheduled[rows], calendar)
+            pd.testing.assert_frame_equal(results[period]["load_file"]["load_file"], expected)
+            assert results[period]["journal_entry"]["period"] == period
+
+    def test_swing_uses_previous_period_snapshot(self, store):
+        cf = tools._close_frame().copy()
+        cf["total_gross_accrual"] = cf["total_gross_accrual"] * 0.5
+        write_snapshot("2025-12", cf)
+        results = run_close_batch(["2026-01", "2026-02"])
+        assert results["2026-01"]["accruals"] == tools.calculate_accruals(prior_period="2025-12")
+        assert results["2026-02"]["accruals"] == tools.calculate_accruals()
+        assert results["2026-01"]["accruals"] != results["2026-02"]["accruals"]
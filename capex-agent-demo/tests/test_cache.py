@@ -0,0 +1,134 @@
+"""Tests for the data-version-aware result cache."""
+
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from utils import data_loader
+from utils.cache import VersionedCache, cache_stats, versioned_cache
+
+
+class TestVersionedCache:
+    def test_hits_and_misses(self):
+        cache = VersionedCache(4, lambda: 1)
+        assert cache.get_or_compute("a", lambda: 10) == 10
+        assert cache.get_or_compute("a", lambda: 99) == 10
+        info = cache.info()
+        assert (info.hits, info.misses, info.currsize) == (1, 1, 1)
+
+    def test_lru_eviction(self):
+        cache = VersionedCache(2, lambda: 1)
+        cache.get_or_compute("a", lambda: 1)
+        cache.get_or_compute("b", lambda: 2)
+        cache.get_or_compute("a", lambda: 1)      # a is now most recent
+        cache.get_or_compute("c", lambda: 3)      # evicts b
+        assert cache.info().evictions == 1
+        assert cache.get_or_compute("a", lambda: -1) == 1
+        assert cache.get_or_compute("b", lambda: -2) == -2
+
+    def test_version_change_invalidates(self):
+        version = {"v": 1}
+        cache = VersionedCache(4, lambda: version["v"])
+        cache.get_or_compute("a", lambda: "old")
+        version["v"] = 2
+        assert cache.get_or_compute("a", lambda: "new") == "new"
+        assert cache.info().invalidations == 1
+
+    def test_put_primes_current_version(self):
+        version = {"v": 1}
+        cache = VersionedCache(4, lambda: version["v"])
+        cache.get_or_compute("a", lambda: "old")
+        version["v"] = 2
+        cache.put("a", "patched")
+        assert cache.get_or_compute("a", lambda: "recomputed") == "patched"
+
+    def test_concurrent_misses_compute_once(self):
+        cache = VersionedCache(4, lambda: 1)
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "value"
+
+        with ThreadPoolExecutor(4) as pool:
+            first = pool.submit(cache.get_or_compute, "a", slow)
+            started.wait(5)
+            others = [pool.submit(cache.get_or_compute, "a", slow) for _ in range(3)]
+            release.set()
+            results = [first.result()] + [f.result() for f in others]
+        assert results == ["value"] * 4
+        assert len(calls) == 1
+        assert cache.info().misses == 1
+
+    def test_failed_compute_lets_waiters_retry(self):
+        cache = VersionedCache(4, lambda: 1)
+
+        def boom():
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError):
+            cache.get_or_compute("a", boom)
+        assert cache.get_or_compute("a", lambda: "ok") == "ok"
+
+    def test_rejects_zero_maxsize(self):
+        with pytest.raises(ValueError):
+            VersionedCache(0, lambda: 1)
+
+    def test_decorator_interface(self):
+        calls = []
+
+        @versioned_cache(lambda: 1, maxsize=2)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        assert square(3) == 9 and square(3) == 9
+        assert calls == [3]
+        assert square.cache_info().hits == 1
+        square.cache_clear()
+        assert square(3) == 9
+        assert calls == [3, 3]
+        assert any(name.endswith("square") for name in cache_stats())
+
+    def test_default_and_explicit_arguments_share_entry(self):
+        calls = []
+
+        @versioned_cache(lambda: 1)
+        def power(x, n=2):
+            calls.append((x, n))
+            return x ** n
+
+        assert power(3) == power(3, 2) == power(x=3, n=2) == 9
+        assert calls == [(3, 2)]
+
+
+class TestDataVersionRefresh:
+    def test_overwritten_csv_refreshes_results(self, tmp_data_dir):
+        from agent.tools import calculate_accruals
+
+        before = calculate_accruals()["summary"]["total_gross_accrual"]
+        assert calculate_accruals()["summary"]["total_gross_accrual"] == before
+
+        path = tmp_data_dir / "wbs_master.csv"
+        df = pd.read_csv(path)
+        df.loc[0, "drill_vow"] += 1_000
+        df.to_csv(path, index=False)
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        after = calculate_accruals()["summary"]["total_gross_accrual"]
+        assert after == before + 1_000
+
+    def test_unchanged_files_keep_version(self, tmp_data_dir):
+        assert data_loader.data_version() == data_loader.data_version()
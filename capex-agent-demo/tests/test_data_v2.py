@@ -210,3 +210,155 @@ class TestDataLoader:
         df = load_drill_schedule()
         assert "planned_date" in df.columns
         assert pd.api.types.is_datetime64_any_dtype(df["planned_date"])
+
+
+class TestWellIndex:
+    def test_index_covers_key_columns(self):
+        from utils.data_loader import WELL_KEY_COLUMNS, load_well_index
+        df = load_wbs_master()
+        index = load_well_index()
+        for col in WELL_KEY_COLUMNS:
+            for pos, value in enumerate(df[col]):
+                assert index[col][value] == pos
+
+    def test_find_well_by_any_key(self):
+        from utils.data_loader import find_well
+        df = load_wbs_master()
+        row = df.iloc[6]
+        for key in (row["wbs_element"], row["well_name"], row["afe_number"]):
+            assert find_well(key) == 6
+        assert find_well("WBS-0000") is None
+
+    def test_index_rebuilt_after_clear(self):
+        from utils.data_loader import clear_caches, load_well_index
+        before = load_well_index()
+        clear_caches()
+        assert load_well_index() is not before
+
+
+class TestColumnarCache:
+    """Typed Parquet cache next to the CSVs."""
+
+    def test_first_load_writes_cache(self, tmp_data_dir):
+        from utils import data_loader
+        df = data_loader.load_wbs_master()
+        assert data_loader.columnar_cache_path("wbs_master.csv").exists()
+        assert isinstance(df["business_unit"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["status"].dtype, pd.CategoricalDtype)
+        assert pd.api.types.is_datetime64_any_dtype(df["start_date"])
+        sched = data_loader.load_drill_schedule()
+        assert isinstance(sched["planned_phase"].dtype, pd.CategoricalDtype)
+
+    def test_fresh_cache_skips_csv_parse(self, tmp_data_dir, monkeypatch):
+        from utils import data_loader
+        expected = data_loader.load_wbs_master()
+        data_loader.clear_caches()
+
+        def fail(*args, **kwargs):
+            raise AssertionError("CSV should not be parsed when the cache is fresh")
+
+        monkeypatch.setattr(data_loader.pd, "read_csv", fail)
+        pd.testing.assert_frame_equal(data_loader.load_wbs_master(), expected)
+
+    def test_stale_cache_falls_back_to_csv(self, tmp_data_dir):
+        from utils import data_loader
+        data_loader.load_wbs_master()
+        path = tmp_data_dir / "wbs_master.csv"
+        raw = pd.read_csv(path)
+        raw.loc[0, "well_name"] = "Renamed 1001-7H"
+        raw.to_csv(path, index=False)
+        data_loader.clear_caches()
+        assert data_loader.load_wbs_master().iloc[0]["well_name"] == "Renamed 1001-7H"
+
+    def test_corrupt_cache_falls_back_to_csv(self, tmp_data_dir):
+        from utils import data_loader
+        data_loader.load_wbs_master()
+        data_loader.columnar_cache_path("wbs_master.csv").write_bytes(b"not parquet")
+        data_loader.clear_caches()
+        assert len(data_loader.load_wbs_master()) == 18
+
+    def test_cache_can_be_disabled(self, tmp_data_dir, monkeypatch):
+        from utils import data_loader
+        monkeypatch.setenv("CAPEX_COLUMNAR_CACHE", "0")
+        data_loader.load_drill_schedule()
+        assert not data_loader.columnar_cache_path("drill_schedule.csv").exists()
+
+
+class TestWbsSchema:
+    """Declared compact schema for the WBS master."""
+
+    def test_declared_dtypes(self):
+        from utils.data_loader import WBS_SCHEMA
+        df = load_wbs_master()
+        for col, dtype in WBS_SCHEMA.items():
+            assert str(df[col].dtype) == str(pd.Series(dtype=dtype).dtype), col
+
+    def test_money_is_int64_cents(self, wbs_master):
+        from utils.data_loader import MONEY_COLUMNS
+        df = load_wbs_master()
+        for col in MONEY_COLUMNS:
+            assert df[col].dtype == "int64"
+            assert (df[col].to_numpy() == wbs_master[col].to_numpy() * 100).all(), col
+
+    def test_to_dollars_round_trip(self, wbs_master):
+        from utils.data_loader import MONEY_COLUMNS, to_dollars
+        dollars = to_dollars(load_wbs_master())
+        for col in MONEY_COLUMNS:
+            assert (dollars[col].to_numpy() == wbs_master[col].to_numpy()).all(), col
+
+    def test_fractional_dollars_rounded_to_cents(self):
+        from utils.data_loader import to_cents
+        cents = to_cents(pd.Series([1.005, 2.5, 10.0]))
+        assert cents.tolist() == [100, 250, 1000]
+
+    def test_memory_report(self):
+        from utils.data_loader import wbs_memory_report
+        report = wbs_memory_report()
+        assert "TOTAL" in report.index
+        total = report.loc["TOTAL"]
+        assert total["bytes_after"] < total["bytes_before"]
+        assert report.loc["business_unit", "dtype_after"] == "category"
+
+
+class TestBuPartitions:
+    def test_partitions_cover_master(self):
+        from utils.data_loader import load_bu_partitions
+        df = load_wbs_master()
+        partitions = load_bu_partitions()
+        assert list(partitions) == list(dict.fromkeys(df["business_unit"].astype(str)))
+        assert sum(len(p) for p in partitions.values()) == len(df)
+        for bu, positions in partitions.items():
+            assert (df["business_unit"].iloc[positions] == bu).all()
+
+    def test_filtered_load_is_cached(self):
+        first = load_wbs_master("Permian Basin")
+        assert load_wbs_master("Permian Basin") is first
+
+    def test_filtered_load_matches_mask(self):
+        df = load_wbs_master()
+        for bu in ("Permian Basin", "DJ Basin", "Powder River"):
+            expected = df[df["business_unit"] == bu]
+            pd.testing.assert_frame_equal(load_wbs_master(bu), expected)
+
+
+class TestPhaseDatePivot:
+    def test_aligned_with_master(self, drill_schedule):
+        from utils.data_loader import SCHEDULE_PHASES, load_phase_dates
+        phases = load_phase_dates()
+        df = load_wbs_master()
+        assert list(phases.index) == list(df["wbs_element"])
+        assert phases.dates.shape == (len(df), len(SCHEDULE_PHASES))
+        for rec in drill_schedule.itertuples(index=False):
+            row = phases.index.get_loc(rec.wbs_element)
+            col = SCHEDULE_PHASES.index(rec.planned_phase)
+            assert phases.dates[row, col] == rec.planned_date.to_datetime64().astype("datetime64[D]")
+
+    def test_missing_phases_are_nat(self, drill_schedule):
+        import numpy as np
+        from utils.data_loader import pivot_phase_dates
+        sched = drill_schedule[~((drill_schedule["wbs_element"] == "WBS-1002")
+                                 & (drill_schedule["planned_phase"] == "TD"))]
+        phases = pivot_phase_dates(["WBS-1002", "WBS-9999"], sched)
+        assert np.isnat(phases.dates[0]).tolist() == [False, True, False, False, False]
+        assert np.isnat(phases.dates[1]).all()
+        assert phases.scheduled.tolist() == [True, False]
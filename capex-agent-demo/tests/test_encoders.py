@@ -0,0 +1,127 @@
+"""Tests for the token-budgeted tool result encoders."""
+
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.encoders import CHARS_PER_TOKEN, TOOL_TABLES, encode_result
+from agent.orchestrator import TOOL_FUNCTIONS, dispatch_tool
+from agent.tool_definitions import TOOL_DEFINITIONS
+
+
+def _accruals(n_wells: int) -> dict:
+    """A calculate_accruals-shaped result with n_wells rows."""
+    rows = [
+        {"wbs_element": f"WBS-{i:05d}", "well_name": f"Well {i}", "business_unit": "DJ Basin",
+         "wi_pct": 0.75, "drill_gross_accrual": 1000.0 * i, "drill_net_accrual": 750.0 * i,
+         "total_gross_accrual": float((i * 7919) % 100_003 - 50_000),
+         "total_net_accrual": 1.5 * i, "prior_gross_accrual": 2.0 * i}
+        for i in range(n_wells)
+    ]
+    exceptions = [{"wbs_element": f"WBS-{i:05d}", "well_name": f"Well {i}",
+                   "exception_type": "Negative Accrual", "severity": "HIGH",
+                   "detail": "Total gross accrual is negative"} for i in range(0, n_wells, 50)]
+    summary = {"total_gross_accrual": 123.0, "well_count": n_wells,
+               "exception_count": len(exceptions)}
+    return {"accruals": rows, "summary": summary, "exceptions": exceptions}
+
+
+class TestEncodeResult:
+    def test_small_result_is_unchanged(self):
+        result = _accruals(5)
+        assert json.loads(encode_result("calculate_accruals", result, 4_000)) == result
+
+    def test_tools_without_tables_are_plain_json(self):
+        result = {"journal_entry": {"period": "2026-01", "total_net_accrual": 1.0}}
+        assert json.loads(encode_result("generate_journal_entry", result, 100)) == result
+
+    def test_default_budget_keeps_results_under_the_old_cap(self, monkeypatch):
+        monkeypatch.delenv("CAPEX_RESULT_TOKENS", raising=False)
+        result = _accruals(150)
+        assert len(json.dumps(result, separators=(",", ":"))) < 50_000
+        assert json.loads(encode_result("calculate_accruals", result)) == result
+
+    def test_tools_without_tables_are_truncated(self):
+        result = {"period": "2026-01", "lines": ["x" * 40] * 100, "total": 1.0}
+        text = encode_result("generate_journal_entry", result, 200)
+        assert len(text) <= 200 * CHARS_PER_TOKEN
+        payload = json.loads(text)
+        assert payload["truncated"] is True
+        assert payload["omitted_fields"] == ["lines"]
+        assert (payload["period"], payload["total"]) == ("2026-01", 1.0)
+
+        payload = json.loads(encode_result("get_well_detail", ["x" * 40] * 100, 200))
+        assert payload["omitted_fields"] == ["result"]
+
+    @pytest.mark.parametrize("n_wells", [200, 1_500, 20_000])
+    def test_large_result_stays_within_budget(self, n_wells):
+        text = encode_result("calculate_accruals", _accruals(n_wells), 1_000)
+        assert len(text) <= 1_000 * CHARS_PER_TOKEN
+        payload = json.loads(text)
+        assert payload["summary"]["well_count"] == n_wells
+        table = payload["accruals"]
+        assert table["total_rows"] == n_wells
+        assert "drill_gross_accrual" not in table["columns"]
+        assert table["rows"] and table["next_cursor"] == f"accruals:{len(table['rows'])}"
+
+    def test_columnar_before_pruning(self):
+        result = _accruals(40)
+        full = len(json.dumps(result, separators=(",", ":")))
+        payload = json.loads(encode_result("calculate_accruals", result, int(full * 0.8) // CHARS_PER_TOKEN))
+        assert "drill_gross_accrual" in payload["accruals"]["columns"]
+        assert len(payload["accruals"]["rows"]) == 40
+
+    def test_cursor_pages_cover_every_row_once(self):
+        result = _accruals(500)
+        seen, cursor = [], None
+        while True:
+            payload = json.loads(encode_result("calculate_accruals", result, 800, cursor=cursor))
+            table = payload["accruals"]
+            assert ("exceptions" in payload) == (cursor is None)
+            assert table["offset"] == len(seen)
+            seen += [row[table["columns"].index("total_gross_accrual")] for row in table["rows"]]
+            cursor = table["next_cursor"]
+            if cursor is None:
+                break
+        assert len(seen) == 500
+        assert seen == sorted(seen, key=abs, reverse=True)
+
+    def test_invalid_cursor(self):
+        with pytest.raises(ValueError, match="Invalid cursor"):
+            encode_result("calculate_accruals", _accruals(5), cursor="outlook:3")
+
+    def test_master_pages_keep_business_unit_totals(self):
+        rows = [{"wbs_element": f"WBS-{i}", "well_name": "w", "business_unit": bu,
+                 "drill_budget": 10.0, "drill_itd": 1.0, "drill_vow": 2.0}
+                for i, bu in enumerate(["A", "B"] * 500)]
+        payload = json.loads(encode_result("load_wbs_master", {"rows": rows, "row_count": 1000}, 500))
+        assert payload["rows"]["by_business_unit"]["A"] == {
+            "well_count": 500, "budget": 5000.0, "itd": 500.0, "vow": 1000.0}
+        assert len(payload["rows"]["rows"]) < 1000
+
+    def test_tables_are_for_known_tools(self):
+        for name in TOOL_TABLES:
+            assert name in TOOL_FUNCTIONS
+
+    def test_paged_tools_take_a_cursor(self):
+        schemas = {t["name"]: t["input_schema"]["properties"] for t in TOOL_DEFINITIONS}
+        for name in TOOL_TABLES:
+            assert "cursor" in schemas[name]
+
+
+class TestDispatchPaging:
+    def test_dispatch_follows_cursor(self, monkeypatch):
+        monkeypatch.setenv("CAPEX_RESULT_TOKENS", "400")
+        first = json.loads(dispatch_tool("calculate_accruals", {}))
+        table = first["accruals"]
+        assert table["next_cursor"] is not None
+        rest = json.loads(dispatch_tool("calculate_accruals", {"cursor": table["next_cursor"]}))
+        assert rest["accruals"]["offset"] == len(table["rows"])
+
+    def test_bad_cursor_is_a_tool_error(self):
+        payload = json.loads(dispatch_tool("calculate_outlook", {"cursor": "nope"}))
+        assert "Invalid cursor" in payload["error"]
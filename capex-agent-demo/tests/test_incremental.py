@@ -0,0 +1,198 @@
+"""Tests for incremental close recomputation."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.engine import (
+    COST_CATEGORIES,
+    accruals_view,
+    build_close_frame,
+    net_down_exceptions,
+    net_down_view,
+    outlook_exceptions,
+    outlook_view,
+)
+from agent.incremental import CloseState, patch_close_frame
+from agent.summary import close_totals_by_bu
+from utils.data_loader import load_wbs_master
+
+
+def _master(copies: int = 5) -> pd.DataFrame:
+    """The sample master tiled into a larger frame with unique WBS elements."""
+    base = load_wbs_master()
+    frames = []
+    for i in range(copies):
+        part = base.copy()
+        part["wbs_element"] = part["wbs_element"] + f"-{i}"
+        frames.append(part)
+    return pd.concat(frames, ignore_index=True)
+
+
+def _random_delta(master: pd.DataFrame, rng: np.random.Generator):
+    """Perturb a random handful of wells; also add and remove a few."""
+    n_changed = int(rng.integers(1, 12))
+    changed = master.sample(n_changed, random_state=rng).copy()
+    for cat in COST_CATEGORIES:
+        for kind in ("itd", "vow", "ops_budget"):
+            col = f"{cat}_{kind}"
+            changed[col] = (changed[col] * rng.uniform(0.5, 1.5, n_changed)).round().astype("int64")
+    changed["prior_gross_accrual"] = (
+        changed["prior_gross_accrual"] * rng.uniform(0.5, 1.5, n_changed)
+    ).round().astype("int64")
+    changed["system_wi_pct"] = np.where(
+        rng.random(n_changed) < 0.3, rng.uniform(0.2, 1.0, n_changed), changed["wi_pct"],
+    )
+    # Some wells move to another BU
+    moved = rng.random(n_changed) < 0.2
+    changed.loc[moved, "business_unit"] = "DJ Basin"
+
+    added = master.sample(int(rng.integers(0, 3)), random_state=rng).copy()
+    added["wbs_element"] = [f"NEW-{rng.integers(1_000_000)}-{i}" for i in range(len(added))]
+
+    remaining = master[~master["wbs_element"].isin(changed["wbs_element"])]
+    removed = remaining["wbs_element"].sample(int(rng.integers(0, 3)), random_state=rng).tolist()
+    return pd.concat([changed, added], ignore_index=True), removed
+
+
+def _apply_to_master(master, delta, removed):
+    """The delta applied to the master the slow way, for a full recompute."""
+    out = master.set_index("wbs_element", drop=False)
+    existing = delta[delta["wbs_element"].isin(out.index)].set_index("wbs_element", drop=False)
+    out.loc[existing.index] = existing[out.columns]
+    new = delta[~delta["wbs_element"].isin(master["wbs_element"])]
+    out = pd.concat([out.reset_index(drop=True), new], ignore_index=True)
+    return out[~out["wbs_element"].isin(removed)].reset_index(drop=True)
+
+
+def _assert_matches_full(state: CloseState, master: pd.DataFrame):
+    cf = build_close_frame(master)
+    full_acc = accruals_view(cf)
+    full_nd = net_down_view(cf)
+    full_out = outlook_view(cf)
+
+    acc = state.accruals()
+    assert acc["accruals"] == full_acc["accruals"]
+    assert acc["exceptions"] == full_acc["exceptions"]
+    assert acc["summary"] == pytest.approx(full_acc["summary"])
+
+    nd = state.net_down()
+    assert nd["adjustments"] == full_nd["adjustments"]
+    assert nd["summary"] == pytest.approx(full_nd["summary"])
+
+    out = state.outlook()
+    assert out["outlook"] == full_out["outlook"]
+    assert out["exceptions"] == full_out["exceptions"]
+    assert out["summary"] == pytest.approx(full_out["summary"])
+
+    assert state.exceptions() == (
+        full_acc["exceptions"] + net_down_exceptions(full_nd["adjustments"])
+        + outlook_exceptions(cf)
+    )
+    by_bu = {bu: totals.as_dict() for bu, totals in close_totals_by_bu(cf).items()}
+    summary = state.close_summary()["by_business_unit"]
+    assert list(summary) == list(by_bu)
+    for bu, totals in by_bu.items():
+        assert summary[bu] == pytest.approx(totals)
+
+
+class TestCloseState:
+    def test_initial_state_matches_full_close(self):
+        master = _master()
+        _assert_matches_full(CloseState.from_master(master), master)
+
+    @pytest.mark.parametrize("seed", range(10))
+    def test_random_deltas_match_full_recompute(self, seed):
+        rng = np.random.default_rng(seed)
+        master = _master()
+        state = CloseState.from_master(master)
+        for _ in range(5):
+            delta, removed = _random_delta(master, rng)
+            state.apply_delta(delta, removed)
+            master = _apply_to_master(master, delta, removed)
+            _assert_matches_full(state, master)
+
+    def test_reports_affected_wells(self):
+        master = _master(1)
+        state = CloseState.from_master(master)
+        changed = master.iloc[[0]].copy()
+        added = master.iloc[[1]].copy()
+        added["wbs_element"] = "NEW-1"
+        result = state.apply_delta(
+            pd.concat([changed, added], ignore_index=True),
+            removed=[master["wbs_element"].iloc[2]],
+        )
+        assert result == {
+            "updated": [master["wbs_element"].iloc[0]],
+            "added": ["NEW-1"],
+            "removed": [master["wbs_element"].iloc[2]],
+        }
+
+    def test_removed_and_readded_well_moves_to_the_end(self):
+        master = _master(1)
+        state = CloseState.from_master(master)
+        well = master["wbs_element"].iloc[2]
+        readded = master.iloc[[2]].copy()
+        readded["drill_vow"] = readded["drill_vow"] + 1_000
+        patched = patch_close_frame(state.cf, readded, removed=[well])
+
+        result = state.apply_delta(readded, removed=[well])
+        assert result == {"updated": [], "added": [well], "removed": [well]}
+        assert state.cf["wbs_element"].iloc[-1] == well
+        pd.testing.assert_frame_equal(state.cf, patched)
+        moved = pd.concat([master.drop(index=2), readded], ignore_index=True)
+        _assert_matches_full(state, moved)
+
+    def test_repeated_well_takes_its_last_row(self):
+        master = _master(1)
+        state = CloseState.from_master(master)
+        first, last = master.iloc[[4]].copy(), master.iloc[[4]].copy()
+        first["drill_vow"] = first["drill_vow"] + 5_000
+        last["drill_vow"] = last["drill_vow"] + 9_000
+        changed = pd.concat([first, master.iloc[[6]], last], ignore_index=True)
+        patched = patch_close_frame(state.cf, changed)
+
+        assert state.apply_delta(changed)["updated"] == [
+            master["wbs_element"].iloc[6], master["wbs_element"].iloc[4]]
+        pd.testing.assert_frame_equal(state.cf, patched)
+        expected = master.copy()
+        expected.loc[4, "drill_vow"] = last["drill_vow"].iloc[0]
+        _assert_matches_full(state, expected)
+
+    def test_updates_patch_the_frame_in_place(self):
+        master = _master()
+        state = CloseState.from_master(master)
+        cf = state.cf
+        view = cf.iloc[[3]]
+        before = view.copy()
+        changed = master.iloc[[3]].copy()
+        changed["drill_vow"] = changed["drill_vow"] + 1_000
+        state.apply_delta(changed)
+        assert state.cf is cf
+        pd.testing.assert_frame_equal(view, before)
+        _assert_matches_full(state, _apply_to_master(master, changed, []))
+
+    def test_removing_last_well_of_bu_drops_bu(self):
+        master = _master(1)
+        state = CloseState.from_master(master)
+        wells = master.loc[master["business_unit"] == "Powder River", "wbs_element"].tolist()
+        state.apply_delta(master.iloc[0:0], removed=wells)
+        assert "Powder River" not in state.close_summary()["by_business_unit"]
+
+    def test_untouched_wells_are_not_recomputed(self, monkeypatch):
+        import agent.incremental as incremental
+
+        master = _master()
+        state = CloseState.from_master(master)
+        seen = []
+        real = incremental.build_close_frame
+        monkeypatch.setattr(
+            incremental, "build_close_frame", lambda df: seen.append(len(df)) or real(df),
+        )
+        state.apply_delta(master.iloc[[3, 7]].copy())
+        assert seen == [2]
@@ -0,0 +1,156 @@
+"""Tests for delta ingestion from the file-drop directory."""
+
+import os
+import sys
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import tools
+from agent.engine import build_close_frame
+from agent.streaming import stream_close
+from utils import data_loader, ingest
+
+
+@pytest.fixture
+def inbox(tmp_data_dir):
+    tools.clear_caches()
+    path = ingest.inbox_dir()
+    path.mkdir()
+    yield path
+    tools.clear_caches()
+
+
+def _drop(inbox, name, rows):
+    pd.DataFrame(rows).to_csv(inbox / name, index=False)
+
+
+def _new_well(wbs_element="WBS-9001"):
+    row = pd.read_csv(data_loader.DATA_DIR / "wbs_master.csv").iloc[0].to_dict()
+    row.update(wbs_element=wbs_element, well_name="Delta 9001-1H", afe_number="AFE-99001",
+               business_unit="Eagle Ford")
+    return row
+
+
+class TestIngestDeltas:
+    def test_partial_upsert_updates_in_place(self, inbox):
+        version = data_loader.data_version()
+        wbs = data_loader.load_wbs_master()["wbs_element"].iloc[3]
+        _drop(inbox, "001.upsert.csv", [{"wbs_element": wbs, "drill_vow": 1234.56}])
+
+        report = ingest.ingest_deltas()
+        assert report.updated == [wbs] and report.added == [] and report.removed == []
+        assert data_loader.data_version() != version
+        df = data_loader.load_wbs_master()
+        assert df["wbs_element"].iloc[3] == wbs
+        assert df["drill_vow"].iloc[3] == 123456
+        assert not list(inbox.glob("*.csv"))
+        assert len(list(ingest.applied_dir().iterdir())) == 1
+
+    def test_new_and_deleted_wells(self, inbox):
+        before = data_loader.load_wbs_master()
+        gone = before["wbs_element"].iloc[0]
+        _drop(inbox, "001.upsert.csv", [_new_well()])
+        _drop(inbox, "002.delete.csv", [{"wbs_element": gone}])
+
+        report = ingest.ingest_deltas()
+        assert report.files == ["001.upsert.csv", "002.delete.csv"]
+        assert report.added == ["WBS-9001"] and report.removed == [gone]
+        df = data_loader.load_wbs_master()
+        assert len(df) == len(before)
+        assert df["wbs_element"].iloc[-1] == "WBS-9001"
+        assert df["business_unit"].iloc[-1] == "Eagle Ford"
+        assert data_loader.find_well("Delta 9001-1H") == len(df) - 1
+        assert "Eagle Ford" in data_loader.load_bu_partitions()
+
+    def test_new_well_needs_every_column(self, inbox):
+        _drop(inbox, "001.upsert.csv", [{"wbs_element": "WBS-9001", "drill_vow": 1.0}])
+        with pytest.raises(ValueError, match="missing columns"):
+            ingest.ingest_deltas()
+
+    def test_schedule_changes(self, inbox):
+        _drop(inbox, "001.schedule.csv", [
+            {"wbs_element": "WBS-1001", "planned_phase": "Spud", "planned_date": "2026-02-01"},
+            {"wbs_element": "WBS-1001", "planned_phase": "TD", "planned_date": None},
+        ])
+        report = ingest.ingest_deltas()
+        assert report.schedule_changed == ["WBS-1001"]
+        phases = data_loader.load_phase_dates()
+        row = phases.index.get_loc("WBS-1001")
+        assert str(phases.dates[row, 0]) == "2026-02-01"
+        assert pd.isna(phases.dates[row, 1])
+
+    def test_no_pending_files(self, inbox):
+        version = data_loader.data_version()
+        assert ingest.ingest_deltas() == ingest.IngestReport([], [], [], [], [])
+        assert data_loader.data_version() == version
+
+    def test_cold_load_replays_applied_deltas(self, inbox):
+        master = data_loader.load_wbs_master()
+        _drop(inbox, "001.upsert.csv", [
+            {"wbs_element": master["wbs_element"].iloc[2], "comp_itd": 10.0}, _new_well(),
+        ])
+        _drop(inbox, "002.delete.csv", [{"wbs_element": master["wbs_element"].iloc[5]}])
+        _drop(inbox, "003.schedule.csv", [
+            {"wbs_element": "WBS-9001", "planned_phase": "Spud", "planned_date": "2026-03-01"},
+        ])
+        ingest.ingest_deltas()
+        merged = data_loader.load_wbs_master()
+        sched = data_loader.load_drill_schedule()
+
+        data_loader.clear_caches()
+        pd.testing.assert_frame_equal(data_loader.load_wbs_master(), merged)
+        pd.testing.assert_frame_equal(data_loader.load_drill_schedule(), sched)
+
+    def test_regenerated_csv_supersedes_deltas(self, inbox):
+        _drop(inbox, "001.upsert.csv", [_new_well()])
+        ingest.ingest_deltas()
+        path = data_loader.DATA_DIR / "wbs_master.csv"
+        path.write_bytes(path.read_bytes())
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        assert "WBS-9001" not in data_loader.load_wbs_master()["wbs_element"].tolist()
+
+
+class TestRefreshFromDeltas:
+    def _deltas(self, inbox):
+        master = data_loader.load_wbs_master()
+        w = master["wbs_element"]
+        _drop(inbox, "001.upsert.csv", [
+            {"wbs_element": w.iloc[1], "drill_vow": 1.0, "system_wi_pct": 0.5},
+            _new_well("WBS-9001"), _new_well("WBS-9002"),
+        ])
+        _drop(inbox, "002.delete.csv", [{"wbs_element": w.iloc[4]}, {"wbs_element": w.iloc[1]}])
+        # Deleted then re-added: moves to the end
+        _drop(inbox, "003.upsert.csv", [{**_new_well(w.iloc[4]), "well_name": "Readded"}])
+
+    def test_patched_close_frame_matches_rebuild(self, inbox):
+        tools.calculate_accruals()
+        self._deltas(inbox)
+        w = data_loader.load_wbs_master()["wbs_element"]
+        report = tools.refresh_from_deltas()
+        assert report.added == ["WBS-9001", "WBS-9002", w.iloc[4]]
+        assert report.removed == [w.iloc[1], w.iloc[4]]
+        patched = tools._close_frame()
+        pd.testing.assert_frame_equal(
+            patched, build_close_frame(data_loader.load_wbs_master()), check_dtype=False,
+        )
+        patched_steps = [tools.calculate_accruals(), tools.calculate_net_down(),
+                         tools.calculate_outlook()]
+        tools.clear_caches()
+        assert [tools.calculate_accruals(), tools.calculate_net_down(),
+                tools.calculate_outlook()] == patched_steps
+
+    @pytest.mark.parametrize("chunksize", [1, 4, 1000])
+    def test_streaming_sees_deltas(self, inbox, chunksize):
+        self._deltas(inbox)
+        ingest.ingest_deltas()
+        streamed = stream_close("all", chunksize)
+        full = tools.calculate_accruals(streaming=False)
+        assert streamed["accruals"]["exceptions"] == full["exceptions"]
+        assert streamed["accruals"]["summary"] == pytest.approx(full["summary"])
+        assert streamed["close_totals"].keys() == tools.get_close_summary(
+            streaming=False)["by_business_unit"].keys()
@@ -1,11 +1,19 @@
-"""Tests for agent orchestrator — tool definitions and event types."""
+"""Tests for agent orchestrator — tool definitions, event types and tool dispatch."""
 
+import json
 import sys
+import threading
+import time
 from pathlib import Path
 
+import pytest
+
 sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
+from agent import orchestrator
+from agent.orchestrator import ToolResultEvent, execute_tool_calls
 from agent.tool_definitions import TOOL_DEFINITIONS
+from tests.conftest import text_block, tool_use_block
 
 
 class TestToolDefinitions:
@@ -51,3 +59,111 @@ class TestClarifyEvent:
         assert evt.options == ["Yes", "No"]
         assert evt.tool_use_id == "toolu_123"
         assert evt.type == "clarify"
+
+
+
+@pytest.fixture
+def slow_tools(monkeypatch):
+    """Replace the tool table with sleepers that record overlap."""
+    state = {"running": 0, "max_running": 0, "log": []}
+    lock = threading.Lock()
+
+    def make(name, seconds):
+        def fn(**kw):
+            with lock:
+                state["running"] += 1
+                state["max_running"] = max(state["max_running"], state["running"])
+                state["log"].append(("start", name))
+            time.sleep(seconds)
+            with lock:
+                state["running"] -= 1
+                state["log"].append(("end", name))
+            return {"tool": name, **kw}
+        return fn
+
+    tools = {"slow_a": make("slow_a", 0.3), "slow_b": make("slow_b", 0.2),
+             "slow_c": make("slow_c", 0.1), "writer": make("writer", 0.05)}
+    monkeypatch.setattr(orchestrator, "TOOL_FUNCTIONS", tools)
+    return state
+
+
+def _calls(*names):
+    return [tool_use_block(f"toolu_{i}", name, {"n": i}) for i, name in enumerate(names)]
+
+
+class TestConcurrentToolCalls:
+    def test_wall_time_is_slowest_tool(self, slow_tools):
+        start = time.perf_counter()
+        results = list(execute_tool_calls(_calls("slow_a", "slow_b", "slow_c"), max_workers=4))
+        elapsed = time.perf_counter() - start
+        assert elapsed < 0.5
+        assert slow_tools["max_running"] == 3
+        assert [tc.id for tc, _ in results] == ["toolu_0", "toolu_1", "toolu_2"]
+        assert [json.loads(r)["n"] for _, r in results] == [0, 1, 2]
+
+    def test_single_worker_runs_in_order(self, slow_tools):
+        list(execute_tool_calls(_calls("slow_c", "slow_c"), max_workers=1))
+        assert slow_tools["max_running"] == 1
+
+    def test_pool_is_bounded(self, slow_tools):
+        list(execute_tool_calls(_calls(*["slow_c"] * 6), max_workers=2))
+        assert slow_tools["max_running"] == 2
+
+    def test_serial_tools_run_alone(self, slow_tools, monkeypatch):
+        monkeypatch.setattr(orchestrator, "SERIAL_TOOLS", frozenset({"writer"}))
+        results = list(execute_tool_calls(_calls("slow_b", "writer", "slow_c"), max_workers=4))
+        log = slow_tools["log"]
+        writer_start = log.index(("start", "writer"))
+        writer_end = log.index(("end", "writer"))
+        assert log.index(("end", "slow_b")) < writer_start
+        assert writer_end < log.index(("start", "slow_c"))
+        assert [tc.name for tc, _ in results] == ["slow_b", "writer", "slow_c"]
+
+    def test_data_writers_are_serial(self, slow_tools, monkeypatch):
+        monkeypatch.setitem(orchestrator.TOOL_FUNCTIONS, "refresh_from_deltas",
+                            orchestrator.TOOL_FUNCTIONS["writer"])
+        list(execute_tool_calls(_calls("slow_b", "refresh_from_deltas", "slow_c"), max_workers=4))
+        log = slow_tools["log"]
+        assert log.index(("end", "slow_b")) < log.index(("start", "writer"))
+        assert log.index(("end", "writer")) < log.index(("start", "slow_c"))
+
+    def test_failing_tool_reports_error_in_place(self, slow_tools, monkeypatch):
+        def broken(**kw):
+            raise RuntimeError("bad input")
+        monkeypatch.setitem(orchestrator.TOOL_FUNCTIONS, "broken", broken)
+        results = list(execute_tool_calls(_calls("slow_c", "broken", "slow_c"), max_workers=4))
+        assert json.loads(results[1][1]) == {"error": "bad input"}
+        assert json.loads(results[2][1])["n"] == 2
+
+
+class TestSerialTools:
+    def test_writers_are_real_tools(self):
+        assert orchestrator.SERIAL_TOOLS == {"snapshot_close", "refresh_from_deltas"}
+        assert orchestrator.SERIAL_TOOLS <= orchestrator.TOOL_FUNCTIONS.keys()
+        names = {t["name"] for t in TOOL_DEFINITIONS}
+        assert orchestrator.SERIAL_TOOLS <= names
+
+    def test_refresh_without_deltas(self):
+        result = json.loads(orchestrator.dispatch_tool("refresh_from_deltas", {}))
+        assert result["files"] == [] and result["updated"] == []
+
+
+class TestRunToolResults:
+    def test_results_follow_tool_use_order(self, slow_tools, fake_orchestrator):
+        agent = fake_orchestrator(
+            [
+                [text_block("Running."), *_calls("slow_a", "slow_b", "slow_c")],
+                [text_block("Done.")],
+            ],
+            max_tool_workers=4,
+        )
+        messages = [{"role": "user", "content": "close"}]
+        start = time.perf_counter()
+        events = list(agent.run(messages))
+        assert time.perf_counter() - start < 0.5
+
+        results = [e for e in events if isinstance(e, ToolResultEvent)]
+        assert [e.tool_name for e in results] == ["slow_a", "slow_b", "slow_c"]
+        tool_results = messages[2]["content"]
+        assert [r["tool_use_id"] for r in tool_results] == ["toolu_0", "toolu_1", "toolu_2"]
+        assert isinstance(events[-1], DoneEvent)
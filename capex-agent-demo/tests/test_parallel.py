@@ -0,0 +1,143 @@
+"""Tests for the process-pool sharded close."""
+
+import sys
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import parallel, tools
+from agent.parallel import parallel_close, plan_shards, shard_filters, shard_inputs
+from utils.data_loader import load_wbs_master, read_shard, write_shard_source
+
+
+@pytest.mark.parametrize("shard_by,workers", [("bu", 1), ("bu", 3), ("rows", 1), ("rows", 4)])
+@pytest.mark.parametrize("business_unit", ["all", "Permian Basin"])
+class TestParallelMatchesSerial:
+    def test_results(self, shard_by, workers, business_unit):
+        result = parallel_close(business_unit, shard_by, workers)
+        accruals = tools.calculate_accruals(business_unit, streaming=False)
+        net_down = tools.calculate_net_down(business_unit, streaming=False)
+        outlook = tools.calculate_outlook(business_unit, streaming=False)
+
+        assert result["accruals"]["exceptions"] == accruals["exceptions"]
+        assert result["accruals"]["summary"] == pytest.approx(accruals["summary"])
+        assert result["net_down"]["adjustments"] == net_down["adjustments"]
+        assert result["net_down"]["summary"] == pytest.approx(net_down["summary"])
+        assert result["outlook"]["exceptions"] == outlook["exceptions"]
+        assert result["outlook"]["summary"] == pytest.approx(outlook["summary"])
+
+        by_bu = tools.get_close_summary(business_unit, streaming=False)["by_business_unit"]
+        assert {bu: t.as_dict() for bu, t in result["close_totals"].items()} == by_bu
+        assert list(result["close_totals"]) == list(by_bu)
+
+        expected = tools.generate_outlook_load_file(business_unit)
+        pd.testing.assert_frame_equal(result["load_file"]["load_file"], expected["load_file"])
+
+
+class TestShardPlan:
+    def test_bu_shards_cover_master(self):
+        shards = plan_shards("all", "bu")
+        assert len(shards) == 3
+        assert sorted(p for s in shards for p in s.tolist()) == list(range(len(load_wbs_master())))
+
+    def test_row_shards_are_contiguous(self):
+        shards = plan_shards("all", "rows", 4)
+        assert len(shards) == 4
+        assert [p for s in shards for p in s.tolist()] == list(range(len(load_wbs_master())))
+
+    def test_unknown_mode(self):
+        with pytest.raises(ValueError):
+            plan_shards("all", "random")
+
+    def test_reports_shard_layout(self):
+        result = parallel_close(shard_by="rows", workers=2)
+        assert result["accruals"]["parallel"] == {"shards": 2, "workers": 2, "shard_by": "rows"}
+
+
+class TestShardSource:
+    @pytest.mark.parametrize("business_unit", ["all", "Permian Basin"])
+    @pytest.mark.parametrize("shard_by,n_shards", [("bu", 1), ("rows", 4)])
+    def test_partition_reads_match_master(self, business_unit, shard_by, n_shards):
+        source = write_shard_source()
+        for shard in plan_shards(business_unit, shard_by, n_shards):
+            positions, df, dates, scheduled = read_shard(
+                source, shard_filters(business_unit, shard_by, shard))
+            expected = shard_inputs(shard)
+            np.testing.assert_array_equal(positions, expected[0])
+            pd.testing.assert_frame_equal(df.reset_index(drop=True),
+                                          expected[1].reset_index(drop=True))
+            np.testing.assert_array_equal(dates, expected[2])
+            np.testing.assert_array_equal(scheduled, expected[3])
+
+    def test_workers_get_partition_keys_not_rows(self, monkeypatch):
+        submitted = []
+
+        class InlinePool:
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def submit(self, fn, *args):
+                submitted.append(args)
+                future = Future()
+                future.set_result(fn(*args))
+                return future
+
+        expected = parallel_close(workers=1)
+        monkeypatch.setattr(parallel, "ProcessPoolExecutor", InlinePool)
+        result = parallel_close(workers=3)
+        assert len(submitted) == 3
+        for args in submitted:
+            assert not any(isinstance(a, (pd.DataFrame, np.ndarray)) for a in args)
+        assert result["accruals"]["exceptions"] == expected["accruals"]["exceptions"]
+        pd.testing.assert_frame_equal(result["load_file"]["load_file"],
+                                      expected["load_file"]["load_file"])
+
+    def test_no_columnar_cache_runs_serially(self, monkeypatch):
+        class NoPool:
+            def __init__(self, *args, **kwargs):
+                raise AssertionError("pool started without a shard source")
+
+        monkeypatch.setenv("CAPEX_COLUMNAR_CACHE", "0")
+        monkeypatch.setattr(parallel, "ProcessPoolExecutor", NoPool)
+        write_shard_source.cache_clear()
+        result = parallel_close(workers=3)
+        write_shard_source.cache_clear()
+        assert result["accruals"]["parallel"]["shards"] == 3
+
+
+class TestPoolFallback:
+    def test_broken_pool_runs_serially(self, monkeypatch):
+        class DyingPool:
+            """A pool whose workers are killed (e.g. by the OOM killer)."""
+
+            def __init__(self, *args, **kwargs):
+                pass
+
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def submit(self, fn, *args):
+                future = Future()
+                future.set_exception(BrokenProcessPool("worker died"))
+                return future
+
+        expected = parallel_close(shard_by="rows", workers=1)
+        monkeypatch.setattr(parallel, "ProcessPoolExecutor", DyingPool)
+        result = parallel_close(shard_by="rows", workers=3)
+        assert result["accruals"]["exceptions"] == expected["accruals"]["exceptions"]
+        assert result["close_totals"] == expected["close_totals"]
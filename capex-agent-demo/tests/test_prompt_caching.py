@@ -0,0 +1,106 @@
+"""Tests for prompt caching: cache breakpoints and cache usage events."""
+
+import copy
+import sys
+from pathlib import Path
+
+import anthropic
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.orchestrator import (
+    CACHE_CONTROL,
+    AgentOrchestrator,
+    UsageEvent,
+    cached_messages,
+)
+from agent.prompts import SYSTEM_PROMPT
+from agent.tool_definitions import TOOL_DEFINITIONS
+from benchmarks.fake_api import FakeAnthropicServer
+from tests.conftest import text_block, tool_use_block
+
+HISTORY = [
+    {"role": "user", "content": "Run the close"},
+    {"role": "assistant", "content": [text_block("Running."), tool_use_block("toolu_1", "calculate_accruals")]},
+    {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "toolu_1", "content": "{}"}]},
+    {"role": "assistant", "content": [tool_use_block("toolu_2", "calculate_outlook")]},
+    {"role": "user", "content": [{"type": "tool_result", "tool_use_id": "toolu_2", "content": "{}"}]},
+]
+
+
+def _breakpoints(request: dict) -> list:
+    marked = [("tool", t["name"]) for t in request["tools"] if "cache_control" in t]
+    marked += [("system", 0) for b in request["system"] if "cache_control" in b]
+    for i, message in enumerate(request["messages"]):
+        content = message["content"]
+        if isinstance(content, list) and isinstance(content[-1], dict) and "cache_control" in content[-1]:
+            marked.append(("message", i))
+    return marked
+
+
+class TestBreakpoints:
+    def test_static_prefix_and_last_two_user_turns(self):
+        agent = AgentOrchestrator(api_key="test-key")
+        request = agent._request(HISTORY)
+        assert _breakpoints(request) == [
+            ("tool", TOOL_DEFINITIONS[-1]["name"]), ("system", 0), ("message", 2), ("message", 4)]
+        assert request["system"][0]["text"] == SYSTEM_PROMPT
+        assert [t["name"] for t in request["tools"]] == [t["name"] for t in TOOL_DEFINITIONS]
+
+    def test_history_is_not_modified(self):
+        history = copy.deepcopy(HISTORY)
+        cached_messages(history)
+        assert history == HISTORY
+        assert "cache_control" not in TOOL_DEFINITIONS[-1]
+
+    def test_plain_text_turn_becomes_a_block(self):
+        (message,) = cached_messages([{"role": "user", "content": "Run the close"}])
+        assert message["content"] == [
+            {"type": "text", "text": "Run the close", "cache_control": CACHE_CONTROL}]
+
+    def test_caching_off(self):
+        request = AgentOrchestrator(api_key="test-key", prompt_caching=False)._request(HISTORY)
+        assert request["system"] == SYSTEM_PROMPT
+        assert request["tools"] is TOOL_DEFINITIONS
+        assert request["messages"] is HISTORY
+
+
+@pytest.fixture
+def fake_api():
+    server = FakeAnthropicServer().start()
+    yield server
+    server.stop()
+
+
+class TestUsageEvents:
+    def _usage(self, client, **kwargs) -> list:
+        agent = AgentOrchestrator(client=client, **kwargs)
+        events = list(agent.run([{"role": "user", "content": "Run the close"}]))
+        assert events[-1].type == "done"
+        return [e for e in events if isinstance(e, UsageEvent)]
+
+    def test_later_turns_read_the_cache(self, fake_api):
+        with anthropic.Anthropic(api_key="test-key", base_url=fake_api.base_url) as client:
+            first, second = self._usage(client)
+            assert (first.turn, second.turn) == (0, 1)
+            assert first.cache_read_input_tokens == 0
+            assert first.cache_creation_input_tokens > 0
+            # Turn 2 re-reads all of turn 1's prompt and only writes the new part
+            assert second.cache_read_input_tokens == first.cache_creation_input_tokens
+            assert second.input_tokens == 0
+
+            # A new close shares the cached tools and system prompt
+            (next_first, _) = self._usage(client)
+            assert next_first.cache_read_input_tokens > 0
+
+    def test_no_cache_without_breakpoints(self, fake_api):
+        with anthropic.Anthropic(api_key="test-key", base_url=fake_api.base_url) as client:
+            usage = self._usage(client, prompt_caching=False)
+        assert all(u.cache_read_input_tokens == u.cache_creation_input_tokens == 0 for u in usage)
+        assert usage[1].input_tokens > usage[0].input_tokens > 0
+
+    def test_stub_without_usage_yields_no_event(self, fake_orchestrator):
+        agent = fake_orchestrator([[text_block("Done.")]])
+        events = list(agent.run([{"role": "user", "content": "hi"}]))
+        assert [e.type for e in events] == ["text", "done"]
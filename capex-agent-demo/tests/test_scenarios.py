@@ -0,0 +1,140 @@
+"""Tests for the vectorized what-if scenarios."""
+
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.engine import COST_CATEGORIES, build_close_frame
+from agent.orchestrator import dispatch_tool
+from agent.scenarios import evaluate_scenarios, scenario_inputs
+from agent.summary import close_totals
+from agent.tools import get_close_summary, run_scenarios
+from utils.data_loader import load_wbs_master
+
+
+@pytest.fixture(scope="module")
+def master():
+    return load_wbs_master()
+
+
+@pytest.fixture(scope="module")
+def cf(master):
+    return build_close_frame(master)
+
+
+def _edited_close(master, edit):
+    """Totals of a full close over a master edited the slow way."""
+    df = master.copy()
+    edit(df)
+    return close_totals(build_close_frame(df))
+
+
+SCENARIOS = {
+    "correct_all_wi": (
+        [{"field": "system_wi_pct", "set": "wi_pct"}],
+        lambda df: df.__setitem__("system_wi_pct", df["wi_pct"]),
+    ),
+    "dj_wi_drop": (
+        [{"field": "wi_pct", "set": 0.5, "business_unit": "DJ Basin"}],
+        lambda df: df.__setitem__(
+            "wi_pct", df["wi_pct"].where(df["business_unit"] != "DJ Basin", 0.5)),
+    ),
+    "drill_budget_up": (
+        [{"field": "drill_ops_budget", "scale": 1.1}],
+        lambda df: df.__setitem__(
+            "drill_ops_budget", np.rint(df["drill_ops_budget"] * 1.1).astype("int64")),
+    ),
+    "one_well_budget": (
+        [{"field": "hu_ops_budget", "set": 12345.67, "wbs_element": "WBS-1003"}],
+        lambda df: df.__setitem__(
+            "hu_ops_budget", df["hu_ops_budget"].where(df["wbs_element"] != "WBS-1003", 1234567)),
+    ),
+}
+
+
+class TestMatchesEditedMaster:
+    def test_each_scenario_matches_a_full_rerun(self, master, cf):
+        names = list(SCENARIOS)
+        results = evaluate_scenarios(cf, [{"overrides": SCENARIOS[n][0]} for n in names])
+        for name, totals in zip(names, results):
+            assert totals == _edited_close(master, SCENARIOS[name][1]), name
+
+    def test_empty_scenario_is_baseline(self, cf):
+        assert evaluate_scenarios(cf, [{"overrides": []}]) == [close_totals(cf)]
+
+    def test_scenarios_are_independent(self, cf):
+        overrides = [{"overrides": SCENARIOS[n][0]} for n in SCENARIOS]
+        together = evaluate_scenarios(cf, overrides)
+        alone = [evaluate_scenarios(cf, [o])[0] for o in overrides]
+        assert together == alone
+
+
+class TestOverrides:
+    def test_later_set_wins_then_scale(self, cf):
+        inputs = scenario_inputs(cf, [{"overrides": [
+            {"field": "wi_pct", "set": 0.2},
+            {"field": "wi_pct", "set": 0.4, "business_unit": "Powder River"},
+            {"field": "wi_pct", "scale": 0.5, "wbs_element": "WBS-1001"},
+        ]}])
+        wi = inputs["wi_pct"][0]
+        powder = (cf["business_unit"] == "Powder River").to_numpy()
+        assert np.allclose(wi[powder], 0.4)
+        assert wi[0] == pytest.approx(0.1)
+        assert np.allclose(wi[~powder][1:], 0.2)
+
+    def test_ops_budgets_round_to_cents(self, cf):
+        inputs = scenario_inputs(cf, [{"overrides": [{"field": "comp_ops_budget", "scale": 1.0001}]}])
+        assert np.array_equal(inputs["comp_ops_budget"], np.rint(inputs["comp_ops_budget"]))
+
+    @pytest.mark.parametrize("override,message", [
+        ({"field": "itd", "set": 1}, "Unknown scenario field"),
+        ({"field": "wi_pct"}, "exactly one"),
+        ({"field": "wi_pct", "set": 1, "scale": 2}, "exactly one"),
+        ({"field": "drill_ops_budget", "set": "wi_pct"}, "can't be set"),
+        ({"field": "wi_pct", "set": 1, "wbs_element": "WBS-NOPE"}, "not found"),
+        ({"field": "wi_pct", "set": 1, "business_unit": "Nowhere"}, "not found"),
+    ])
+    def test_invalid_overrides(self, cf, override, message):
+        with pytest.raises(ValueError, match=message):
+            evaluate_scenarios(cf, [{"overrides": [override]}])
+
+
+class TestRunScenariosTool:
+    def test_baseline_and_changes(self):
+        result = run_scenarios([
+            {"name": "Fix WI", "overrides": [{"field": "system_wi_pct", "set": "wi_pct"}]},
+            {"overrides": [{"field": "drill_ops_budget", "scale": 1.1}]},
+        ])
+        grand = get_close_summary()["grand_totals"]
+        assert result["scenario_count"] == 2
+        assert result["baseline"]["total_net_accrual"] == grand["total_net_accrual"]
+        fix_wi, budget = result["scenarios"]
+        assert fix_wi["name"] == "Fix WI"
+        assert budget["name"] == "scenario_2"
+        assert fix_wi["totals"]["wells_with_mismatch"] == 0
+        assert fix_wi["totals"]["total_net_down_adjustment"] == 0
+        assert fix_wi["change"]["total_net_down_adjustment"] == -grand["total_net_down_adjustment"]
+        assert budget["change"]["total_future_outlook"] > 0
+        assert budget["change"]["total_net_accrual"] == 0
+
+    def test_business_unit_scope(self):
+        result = run_scenarios([{"overrides": []}], "DJ Basin")
+        dj = get_close_summary("DJ Basin")["grand_totals"]
+        assert result["baseline"]["total_future_outlook"] == dj["total_future_outlook"]
+
+    def test_dispatch(self):
+        payload = json.loads(dispatch_tool("run_scenarios", {"scenarios": [
+            {"overrides": [{"field": f"{cat}_ops_budget", "scale": 0.9} for cat in COST_CATEGORIES]},
+        ]}))
+        assert payload["scenarios"][0]["change"]["total_future_outlook"] < 0
+
+    def test_dispatch_reports_bad_override(self):
+        payload = json.loads(dispatch_tool("run_scenarios", {"scenarios": [
+            {"overrides": [{"field": "vow", "scale": 2}]},
+        ]}))
+        assert "Unknown scenario field" in payload["error"]
@@ -0,0 +1,131 @@
+"""Tests for the Monte Carlo schedule-slip simulation."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.allocation import allocation_matrix, future_outlook_matrix, month_calendar
+from agent.engine import COST_CATEGORIES
+from agent.simulation import (
+    _quantile,
+    simulate_outlook,
+    summarize_simulation,
+    trials_per_batch,
+)
+from agent.tools import REFERENCE_DATE, close_view, generate_outlook_load_file, simulate_schedule_slip
+from utils.data_loader import SCHEDULE_PHASES, load_phase_dates
+
+FIXED = {phase: {"kind": "fixed", "days": 0} for phase in SCHEDULE_PHASES}
+
+
+@pytest.fixture(scope="module")
+def inputs():
+    cf = close_view()
+    phases = load_phase_dates()
+    return cf, phases.dates, phases.scheduled, month_calendar(REFERENCE_DATE, 12)
+
+
+def _bu_totals(cf, alloc):
+    """BU x category x month totals of a deterministic allocation."""
+    return np.stack([alloc[(cf["business_unit"] == bu).to_numpy()].sum(axis=0)
+                     for bu in cf["business_unit"].unique()])
+
+
+class TestDeterministicLimits:
+    def test_no_slip_matches_load_file(self, inputs):
+        cf, dates, scheduled, calendar = inputs
+        result = simulate_outlook(cf, dates, scheduled, calendar, trials=5, slips=FIXED, seed=0)
+        expected = _bu_totals(cf, allocation_matrix(future_outlook_matrix(cf), dates, scheduled, calendar))
+        for trial in result.totals:
+            np.testing.assert_allclose(trial, expected, atol=1e-6)
+
+        summary = summarize_simulation(result)
+        load = generate_outlook_load_file(months_forward=12)["load_file"]
+        for label, rows in load.groupby("cost_category", sort=False):
+            bands = summary["by_category"][label]
+            for month in result.months:
+                assert bands["P10"][month] == bands["P90"][month]
+                assert bands["P50"][month] == pytest.approx(rows[month].sum(), abs=0.01)
+
+    def test_fixed_slip_shifts_every_phase(self, inputs):
+        cf, dates, scheduled, calendar = inputs
+        slips = {**FIXED, "Spud": {"kind": "fixed", "days": 20}}
+        result = simulate_outlook(cf, dates, scheduled, calendar, trials=2, slips=slips)
+        shifted = dates + np.timedelta64(20, "D")
+        expected = _bu_totals(cf, allocation_matrix(future_outlook_matrix(cf), shifted, scheduled, calendar))
+        np.testing.assert_allclose(result.totals[0], expected, atol=1e-6)
+
+    def test_basin_override_only_moves_that_basin(self, inputs):
+        cf, dates, scheduled, calendar = inputs
+        basin = {"DJ Basin": {"Frac Start": {"kind": "fixed", "days": 60}}}
+        base = simulate_outlook(cf, dates, scheduled, calendar, trials=1, slips=FIXED)
+        moved = simulate_outlook(cf, dates, scheduled, calendar, trials=1, slips=FIXED, basin_slips=basin)
+        for b, bu in enumerate(base.business_units):
+            same = np.allclose(base.totals[0, b], moved.totals[0, b])
+            assert same == (bu != "DJ Basin")
+
+
+class TestSampling:
+    def test_seeded_runs_repeat(self, inputs):
+        a = simulate_outlook(*inputs, trials=50, seed=7, batch_trials=8)
+        b = simulate_outlook(*inputs, trials=50, seed=7, batch_trials=8)
+        np.testing.assert_array_equal(a.totals, b.totals)
+
+    def test_batch_size_does_not_change_results(self, inputs, monkeypatch):
+        small = simulate_outlook(*inputs, trials=40, seed=11, batch_trials=3)
+        whole = simulate_outlook(*inputs, trials=40, seed=11, batch_trials=40)
+        # Same slips; only the BLAS reduction order of the BU sums may differ
+        np.testing.assert_allclose(small.totals, whole.totals, rtol=1e-12)
+        assert summarize_simulation(small) == summarize_simulation(whole)
+
+        monkeypatch.setenv("CAPEX_SIM_BATCH_MB", "1")
+        low_memory = summarize_simulation(simulate_outlook(*inputs, trials=40, seed=11))
+        assert low_memory == summarize_simulation(whole)
+
+    def test_triangular_draws_stay_in_range(self):
+        spec = {"kind": "triangular", "low": -5, "mode": 0, "high": 30}
+        u = np.random.default_rng(0).random(200_000)
+        days = _quantile(spec, u, None)
+        assert days.min() >= -5 and days.max() <= 30
+        assert days.mean() == pytest.approx(25 / 3, abs=0.1)
+
+    def test_batches_cover_all_trials(self, inputs):
+        cf, _, _, calendar = inputs
+        result = simulate_outlook(*inputs, trials=23, seed=1, batch_trials=5)
+        assert result.totals.shape == (23, cf["business_unit"].nunique(), len(COST_CATEGORIES), 12)
+        assert np.isfinite(result.totals).all()
+
+    def test_batch_size_follows_budget(self):
+        assert trials_per_batch(1500, 24, budget=64 * 1024 * 1024) == 23
+        assert trials_per_batch(10**7, 24, budget=1) == 1
+
+    def test_percentiles_are_ordered(self, inputs):
+        summary = summarize_simulation(simulate_outlook(*inputs, trials=200, seed=3))
+        for bands in [summary["total"], *summary["by_category"].values(),
+                      *summary["by_business_unit"].values()]:
+            for month in summary["months"]:
+                assert bands["P10"][month] <= bands["P50"][month] <= bands["P90"][month]
+
+    @pytest.mark.parametrize("slips,message", [
+        ({"Spud": {"kind": "gamma"}}, "Unknown slip distribution"),
+        ({"Spud": {"kind": "normal", "mean": 3}}, "needs sd"),
+        ({"Spud": {"kind": "triangular", "low": 5, "mode": 0, "high": 9}}, "low <= mode"),
+        ({"Rig Release": {"kind": "fixed", "days": 1}}, "Unknown schedule phase"),
+    ])
+    def test_invalid_slips(self, inputs, slips, message):
+        with pytest.raises(ValueError, match=message):
+            simulate_outlook(*inputs, trials=1, slips=slips)
+
+
+class TestSimulateScheduleSlipTool:
+    def test_shape(self):
+        result = simulate_schedule_slip("Permian Basin", months_forward=3, trials=20, seed=0)
+        assert result["trials"] == 20
+        assert len(result["months"]) == 3
+        assert list(result["by_business_unit"]) == ["Permian Basin"]
+        assert set(result["by_category"]) == {"Drilling", "Completions", "Flowback", "Hookup"}
+        assert set(result["total"]) == {"P10", "P50", "P90"}
@@ -0,0 +1,121 @@
+"""Tests for the period snapshot store."""
+
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import tools
+from agent.streaming import stream_close
+from utils import snapshots
+from utils.data_loader import load_wbs_master
+
+
+@pytest.fixture
+def store(tmp_data_dir):
+    tools.clear_caches()
+    yield snapshots
+    tools.clear_caches()
+
+
+def _prior_as_snapshot(period, scale=1.0):
+    """Snapshot whose total gross accrual is the master's prior column (scaled)."""
+    cf = tools._close_frame().copy()
+    cf["total_gross_accrual"] = load_wbs_master()["prior_gross_accrual"].to_numpy() / 100 * scale
+    snapshots.write_snapshot(period, cf)
+    return cf
+
+
+class TestSnapshotStore:
+    def test_write_and_lookup(self, store):
+        path = tools.snapshot_close()
+        assert path.name == f"{tools.CLOSE_PERIOD}.parquet"
+        assert store.list_periods() == [tools.CLOSE_PERIOD]
+        detail = tools.get_well_detail("WBS-1001")
+        assert store.lookup_accrual(tools.CLOSE_PERIOD, "WBS-1001") == pytest.approx(
+            detail["total_gross_accrual"], abs=0.005)
+        assert store.lookup_accrual(tools.CLOSE_PERIOD, "WBS-0000") is None
+
+    def test_accrual_history_is_aligned(self, store):
+        _prior_as_snapshot("2025-11", scale=0.5)
+        _prior_as_snapshot("2025-12")
+        wells = ["WBS-1003", "WBS-0000", "WBS-1001"]
+        history = store.load_accrual_history(["2025-12", "2025-11"], wells)
+        assert history.values.shape == (3, 2)
+        assert np.isnan(history.values[1]).all()
+        prior = load_wbs_master().set_index("wbs_element")["prior_gross_accrual"] / 100
+        assert history.values[0, 0] == prior["WBS-1003"]
+        assert history.values[2, 1] == pytest.approx(prior["WBS-1001"] * 0.5, abs=0.005)
+
+    def test_bad_and_missing_periods(self, store):
+        with pytest.raises(ValueError):
+            store.snapshot_path("2025-13")
+        with pytest.raises(KeyError):
+            store.load_snapshot("2020-01")
+
+
+@pytest.mark.parametrize("engine", tools.ENGINES)
+class TestPriorPeriodSwing:
+    def test_master_prior_snapshot_matches_default(self, store, engine):
+        _prior_as_snapshot("2025-12")
+        assert tools.calculate_accruals(engine=engine, prior_period="2025-12") == \
+            tools.calculate_accruals(engine=engine)
+
+    def test_swing_against_other_period(self, store, engine):
+        _prior_as_snapshot("2025-06", scale=0.5)
+        swings = [e for e in tools.calculate_accruals(engine=engine, prior_period="2025-06")["exceptions"]
+                  if e["exception_type"] == "Large Swing"]
+        default = [e for e in tools.calculate_accruals(engine=engine)["exceptions"]
+                   if e["exception_type"] == "Large Swing"]
+        assert len(swings) > len(default)
+
+    def test_streaming_matches(self, store, engine):
+        _prior_as_snapshot("2025-06", scale=0.5)
+        streamed = stream_close("all", 5, prior_period="2025-06")["accruals"]
+        full = tools.calculate_accruals(engine=engine, streaming=False, prior_period="2025-06")
+        assert streamed["exceptions"] == full["exceptions"]
+
+
+class TestSnapshotWrites:
+    def test_data_caches_survive_a_snapshot(self, store):
+        cf = tools._close_frame()
+        default = tools.calculate_accruals()
+        version = snapshots.data_loader.data_version()
+        tools.snapshot_close("2025-06")
+        assert snapshots.data_loader.data_version() == version
+        assert tools._close_frame() is cf
+        assert tools.calculate_accruals() is default
+
+    def test_rewrite_is_seen_by_prior_period_calls(self, store):
+        _prior_as_snapshot("2025-06")
+        before = tools.calculate_accruals(prior_period="2025-06")
+        _prior_as_snapshot("2025-06", scale=0.5)
+        assert tools.calculate_accruals(prior_period="2025-06") != before
+
+
+class TestSnapshotsFromAnotherProcess:
+    def test_prior_period_results_follow_the_store(self, store, monkeypatch):
+        def swings(result):
+            return [e for e in result["exceptions"] if e["exception_type"] == "Large Swing"]
+
+        _prior_as_snapshot("2025-06")
+        before = tools.calculate_accruals(prior_period="2025-06")
+        streamed_before = stream_close("all", 5, prior_period="2025-06")["accruals"]
+        default = tools.calculate_accruals()
+
+        # A writer in another process is only seen through the store's files
+        monkeypatch.setattr(snapshots, "_note_write", lambda: None)
+        _prior_as_snapshot("2025-06", scale=0.5)
+        path = snapshots.snapshot_path("2025-06")
+        stat = path.stat()
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+        after = tools.calculate_accruals(prior_period="2025-06")
+        assert len(swings(after)) > len(swings(before))
+        streamed = stream_close("all", 5, prior_period="2025-06")["accruals"]
+        assert streamed["exceptions"] == after["exceptions"] != streamed_before["exceptions"]
+        assert tools.calculate_accruals() is default
@@ -0,0 +1,99 @@
+"""Tests for the chunked streaming close."""
+
+import sys
+from io import BytesIO
+from pathlib import Path
+
+import pytest
+from openpyxl import load_workbook
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent.streaming import stream_close
+from agent.tools import (
+    calculate_accruals,
+    calculate_net_down,
+    calculate_outlook,
+    clear_caches,
+    get_close_summary,
+    get_exceptions,
+)
+from utils.data_loader import iter_wbs_master_chunks, load_wbs_master, should_stream
+from utils.excel_export import generate_close_package
+
+
+class TestChunkReader:
+    def test_chunks_are_bounded(self):
+        chunks = list(iter_wbs_master_chunks(chunksize=5))
+        assert all(len(c) <= 5 for c in chunks)
+        assert sum(len(c) for c in chunks) == len(load_wbs_master())
+
+    def test_chunks_filtered_by_bu(self):
+        rows = sum(len(c) for c in iter_wbs_master_chunks("DJ Basin", chunksize=4))
+        assert rows == len(load_wbs_master("DJ Basin"))
+
+    def test_chunks_use_declared_schema(self):
+        chunk = next(iter_wbs_master_chunks(chunksize=5))
+        assert chunk["drill_vow"].tolist() == load_wbs_master().head(5)["drill_vow"].tolist()
+
+
+@pytest.mark.parametrize("chunksize", [1, 5, 1000])
+@pytest.mark.parametrize("business_unit", ["all", "Permian Basin"])
+class TestStreamingMatchesInMemory:
+    def test_accruals(self, chunksize, business_unit):
+        streamed = stream_close(business_unit, chunksize)["accruals"]
+        full = calculate_accruals(business_unit, streaming=False)
+        assert streamed["exceptions"] == full["exceptions"]
+        assert streamed["summary"] == pytest.approx(full["summary"])
+        assert "accruals" not in streamed
+
+    def test_net_down(self, chunksize, business_unit):
+        streamed = stream_close(business_unit, chunksize)["net_down"]
+        full = calculate_net_down(business_unit, streaming=False)
+        assert streamed["adjustments"] == full["adjustments"]
+        assert streamed["summary"] == pytest.approx(full["summary"])
+
+    def test_outlook(self, chunksize, business_unit):
+        streamed = stream_close(business_unit, chunksize)["outlook"]
+        full = calculate_outlook(business_unit, streaming=False)
+        assert streamed["exceptions"] == full["exceptions"]
+        assert streamed["summary"] == pytest.approx(full["summary"])
+
+    def test_close_summary(self, chunksize, business_unit):
+        streamed = stream_close(business_unit, chunksize)["close_totals"]
+        full = get_close_summary(business_unit, streaming=False)["by_business_unit"]
+        assert list(streamed) == list(full)
+        # Integer-cent totals: exact regardless of chunking
+        assert {bu: t.as_dict() for bu, t in streamed.items()} == full
+
+
+class TestStreamingThreshold:
+    def test_streams_over_threshold(self, monkeypatch):
+        expected = get_exceptions()
+        summary = get_close_summary()
+        monkeypatch.setenv("CAPEX_STREAMING_THRESHOLD_MB", "0")
+        clear_caches()
+        try:
+            assert should_stream()
+            assert "streaming" in calculate_accruals()
+            assert "outlook" not in calculate_outlook()
+            assert "accruals" in calculate_accruals(streaming=False)
+            assert "accruals" in calculate_accruals(engine="rowwise")
+            assert get_exceptions() == expected
+            assert get_close_summary()["by_business_unit"].keys() == summary["by_business_unit"].keys()
+        finally:
+            clear_caches()
+
+    def test_full_results_under_threshold(self):
+        assert not should_stream()
+        assert "accruals" in calculate_accruals()
+        assert "streaming" in calculate_accruals(streaming=True)
+
+    def test_close_package_over_threshold(self, monkeypatch):
+        monkeypatch.setenv("CAPEX_STREAMING_THRESHOLD_MB", "0")
+        clear_caches()
+        try:
+            workbook = load_workbook(BytesIO(generate_close_package()))
+            assert "Accrual Summary" in workbook.sheetnames
+        finally:
+            clear_caches()
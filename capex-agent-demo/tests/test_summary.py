@@ -0,0 +1,111 @@
+"""Tests for the mergeable close totals."""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import tools
+from agent.engine import accruals_view, build_close_frame, net_down_view, outlook_view
+from agent.summary import (
+    CloseTotals,
+    close_totals,
+    close_totals_by_bu,
+    merge_by_bu,
+    to_cents,
+)
+from utils.data_loader import load_wbs_master
+
+
+@pytest.fixture(scope="module")
+def cf():
+    return build_close_frame(load_wbs_master())
+
+
+def _partials(cf, n_parts, rng):
+    """close_totals over a random partition of the close frame's rows."""
+    labels = rng.integers(0, n_parts, len(cf))
+    return [close_totals(cf[labels == i]) for i in range(n_parts)]
+
+
+class TestMerge:
+    def test_identity(self, cf):
+        totals = close_totals(cf)
+        assert totals + CloseTotals() == totals
+        assert CloseTotals.merge_all([]) == CloseTotals()
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_partition_merge_is_exact(self, cf, seed):
+        rng = np.random.default_rng(seed)
+        parts = _partials(cf, int(rng.integers(2, 8)), rng)
+        assert CloseTotals.merge_all(parts) == close_totals(cf)
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_order_and_grouping_independent(self, cf, seed):
+        rng = np.random.default_rng(seed)
+        parts = _partials(cf, 6, rng)
+        shuffled = [parts[i] for i in rng.permutation(len(parts))]
+        left = ((parts[0] + parts[1]) + parts[2]) + CloseTotals.merge_all(parts[3:])
+        right = parts[0] + (parts[1] + (parts[2] + CloseTotals.merge_all(parts[3:])))
+        assert left == right == CloseTotals.merge_all(shuffled)
+
+    def test_subtract_backs_out_a_partial(self, cf):
+        half = close_totals(cf.iloc[: len(cf) // 2])
+        rest = close_totals(cf.iloc[len(cf) // 2:])
+        assert close_totals(cf) - half == rest
+
+    def test_merge_by_bu(self, cf):
+        first, second = cf.iloc[:7], cf.iloc[7:]
+        merged = merge_by_bu([close_totals_by_bu(first), close_totals_by_bu(second)])
+        assert merged == close_totals_by_bu(cf)
+
+
+class TestCents:
+    def test_to_cents_rounds(self):
+        assert to_cents([0.125, 0.135, -1.005, 2.0]).tolist() == [12, 14, -100, 200]
+
+    def test_money_fields_are_ints(self, cf):
+        totals = close_totals(cf)
+        for value in (totals.gross_accrual, totals.net_accrual,
+                      totals.net_down, totals.future_outlook):
+            assert type(value) is int
+
+    def test_net_down_only_counts_mismatched_wells(self, cf):
+        expected = to_cents(cf.loc[cf["wi_mismatch"], "net_down_adjustment"]).sum()
+        assert close_totals(cf).net_down == expected
+
+
+class TestCounts:
+    def test_counts_match_flags(self, cf):
+        totals = close_totals(cf)
+        assert totals.well_count == len(cf)
+        for flag in ("negative_accrual", "large_swing", "wi_mismatch", "over_budget"):
+            assert totals.count(flag) == int(cf[flag].sum())
+
+    def test_by_type_and_severity_match_exceptions(self):
+        exceptions = tools.get_exceptions()
+        totals = close_totals(build_close_frame(load_wbs_master()))
+        assert totals.by_type() == exceptions["by_type"]
+        assert totals.by_severity() == exceptions["by_severity"]
+
+
+class TestRenderedSummaries:
+    def test_views_render_from_totals(self, cf):
+        totals = close_totals(cf)
+        assert accruals_view(cf)["summary"] == totals.accrual_summary()
+        assert net_down_view(cf)["summary"] == totals.net_down_summary()
+        assert outlook_view(cf)["summary"] == totals.outlook_summary()
+
+    def test_accrual_summary_counts_its_exceptions(self, cf):
+        view = accruals_view(cf)
+        assert view["summary"]["exception_count"] == len(view["exceptions"])
+
+    def test_close_summary_grand_is_merge_of_bus(self):
+        summary = tools.get_close_summary()
+        by_bu = close_totals_by_bu(build_close_frame(load_wbs_master()))
+        assert summary["grand_totals"] == CloseTotals.merge_all(by_bu.values()).as_dict()
+        assert summary["by_business_unit"] == {bu: t.as_dict() for bu, t in by_bu.items()}
+        assert summary["exceptions_by_severity"] == CloseTotals.merge_all(by_bu.values()).by_severity()
@@ -0,0 +1,190 @@
+"""Tests for the per-conversation tool result memo."""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from agent import orchestrator
+from agent.orchestrator import ToolResultEvent, ToolResultMemo, canonical_input
+from tests.conftest import text_block, tool_use_block
+
+
+@pytest.fixture
+def counted_tools(monkeypatch):
+    """Tool table whose calls are counted, and a controllable data version."""
+    calls = []
+    version = {"v": 1}
+
+    def accruals(**kw):
+        calls.append(("calculate_accruals", kw))
+        return {"total": 100, **kw}
+
+    def broken(**kw):
+        calls.append(("broken", kw))
+        raise RuntimeError("bad input")
+
+    def refresh(**kw):
+        calls.append(("refresh_from_deltas", kw))
+        version["v"] += 1
+        return {"files": ["001.upsert.csv"]}
+
+    monkeypatch.setattr(orchestrator, "TOOL_FUNCTIONS", {
+        "calculate_accruals": accruals, "broken": broken, "refresh_from_deltas": refresh,
+    })
+    monkeypatch.setattr(orchestrator, "data_version", lambda: version["v"])
+    return calls, version
+
+
+def _turn(*calls):
+    return [text_block("Checking."), *(tool_use_block(*c) for c in calls)]
+
+
+def _results(events):
+    return [e for e in events if isinstance(e, ToolResultEvent)]
+
+
+class TestCanonicalInput:
+    def test_defaults_and_key_order(self):
+        assert canonical_input("calculate_accruals", {}) == \
+            canonical_input("calculate_accruals", {"business_unit": "all"})
+        assert canonical_input("get_exceptions", {"severity": "HIGH", "business_unit": "all"}) == \
+            canonical_input("get_exceptions", {"business_unit": "all", "severity": "HIGH"})
+        assert canonical_input("calculate_accruals", {"business_unit": "DJ Basin"}) != \
+            canonical_input("calculate_accruals", {})
+
+
+class TestRepeatedCalls:
+    def test_repeat_across_turns_is_a_reference(self, counted_tools, fake_orchestrator):
+        calls, _ = counted_tools
+        agent = fake_orchestrator([
+            _turn(("toolu_1", "calculate_accruals", {})),
+            _turn(("toolu_2", "calculate_accruals", {"business_unit": "all"})),
+            [text_block("Done.")],
+        ])
+        messages = [{"role": "user", "content": "close"}]
+        events = list(agent.run(messages))
+
+        assert len(calls) == 1
+        first, repeat = _results(events)
+        assert not first.cached and repeat.cached
+        reference = json.loads(messages[4]["content"][0]["content"])
+        assert reference["same_result_as"] == "toolu_1"
+        assert agent.memo.stats() == {"hits": 1, "misses": 1, "entries": 1}
+
+    def test_repeat_within_a_turn(self, counted_tools, fake_orchestrator):
+        calls, _ = counted_tools
+        agent = fake_orchestrator([
+            _turn(("toolu_1", "calculate_accruals", {}), ("toolu_2", "calculate_accruals", {})),
+            [text_block("Done.")],
+        ], max_tool_workers=4)
+        messages = [{"role": "user", "content": "close"}]
+        list(agent.run(messages))
+        assert len(calls) == 1
+        blocks = messages[2]["content"]
+        assert [b["tool_use_id"] for b in blocks] == ["toolu_1", "toolu_2"]
+        assert json.loads(blocks[0]["content"])["total"] == 100
+        assert json.loads(blocks[1]["content"])["same_result_as"] == "toolu_1"
+
+    def test_data_change_is_a_miss(self, counted_tools):
+        _, version = counted_tools
+        memo = ToolResultMemo()
+        tc = tool_use_block("toolu_1", "calculate_accruals", {})
+        assert memo.plan([tc]) == {}
+        memo.record(tc, '{"total": 100}')
+        version["v"] = 2
+        assert memo.plan([tool_use_block("toolu_2", "calculate_accruals", {})]) == {}
+        assert (memo.hits, memo.misses) == (0, 2)
+
+    def test_snapshot_write_is_a_miss_for_prior_period_calls(self, counted_tools, monkeypatch):
+        from utils import snapshots
+        memo = ToolResultMemo()
+        for i, args in enumerate([{}, {"prior_period": "2025-06"}]):
+            tc = tool_use_block(f"toolu_{i}", "calculate_accruals", args)
+            memo.plan([tc])
+            memo.record(tc, '{"total": 100}')
+        monkeypatch.setattr(snapshots, "_writes", snapshots._writes + 1)
+        refs = memo.plan([tool_use_block("toolu_2", "calculate_accruals", {}),
+                          tool_use_block("toolu_3", "calculate_accruals", {"prior_period": "2025-06"})])
+        assert refs == {"toolu_2": "toolu_0"}
+
+    def test_errors_are_not_memoized(self, counted_tools, fake_orchestrator):
+        calls, _ = counted_tools
+        agent = fake_orchestrator([
+            _turn(("toolu_1", "broken", {})),
+            _turn(("toolu_2", "broken", {})),
+            [text_block("Done.")],
+        ])
+        list(agent.run([{"role": "user", "content": "close"}]))
+        assert len(calls) == 2
+        assert agent.memo.hits == 0
+
+    def test_data_change_within_a_turn(self, counted_tools, fake_orchestrator):
+        calls, _ = counted_tools
+        agent = fake_orchestrator([
+            _turn(("toolu_1", "calculate_accruals", {}), ("toolu_2", "refresh_from_deltas", {}),
+                  ("toolu_3", "calculate_accruals", {})),
+            [text_block("Done.")],
+        ], max_tool_workers=4)
+        messages = [{"role": "user", "content": "close"}]
+        events = list(agent.run(messages))
+        assert [name for name, _ in calls] == [
+            "calculate_accruals", "refresh_from_deltas", "calculate_accruals"]
+        assert not any(e.cached for e in _results(events))
+        assert "same_result_as" not in messages[2]["content"][2]["content"]
+
+    def test_failed_source_within_a_turn_is_rerun(self, counted_tools, fake_orchestrator):
+        calls, _ = counted_tools
+        agent = fake_orchestrator([
+            _turn(("toolu_1", "broken", {}), ("toolu_2", "broken", {})),
+            [text_block("Done.")],
+        ], max_tool_workers=4)
+        messages = [{"role": "user", "content": "close"}]
+        events = list(agent.run(messages))
+        assert len(calls) == 2
+        assert [e.cached for e in _results(events)] == [False, False]
+        assert [json.loads(b["content"]) for b in messages[2]["content"]] == [
+            {"error": "bad input"}] * 2
+        assert agent.memo.stats() == {"hits": 0, "misses": 2, "entries": 0}
+
+    def test_serial_tools_always_run(self, counted_tools, monkeypatch):
+        monkeypatch.setattr(orchestrator, "SERIAL_TOOLS", frozenset({"calculate_accruals"}))
+        memo = ToolResultMemo()
+        calls = [tool_use_block(f"toolu_{i}", "calculate_accruals", {}) for i in range(2)]
+        assert memo.plan(calls) == {}
+        assert memo.stats() == {"hits": 0, "misses": 0, "entries": 0}
+
+    def test_memo_is_per_conversation(self, counted_tools, fake_orchestrator):
+        calls, _ = counted_tools
+        memo = ToolResultMemo()
+        for tool_use_id in ("toolu_1", "toolu_2"):
+            agent = fake_orchestrator([
+                _turn((tool_use_id, "calculate_accruals", {})),
+                [text_block("Done.")],
+            ], memo=memo)
+            list(agent.run([{"role": "user", "content": "close"}]))
+        assert len(calls) == 1 and memo.hits == 1
+
+        fresh = fake_orchestrator([_turn(("toolu_3", "calculate_accruals", {})), [text_block("Done.")]])
+        list(fresh.run([{"role": "user", "content": "close"}]))
+        assert len(calls) == 2
+
+    def test_async_loop(self, counted_tools, fake_async_orchestrator):
+        calls, _ = counted_tools
+        agent = fake_async_orchestrator([
+            _turn(("toolu_1", "calculate_accruals", {})),
+            _turn(("toolu_2", "calculate_accruals", {}), ("toolu_3", "broken", {})),
+            [text_block("Done.")],
+        ])
+
+        async def collect():
+            return [e async for e in agent.run([{"role": "user", "content": "close"}])]
+
+        events = asyncio.run(collect())
+        assert [e.cached for e in _results(events)] == [False, True, False]
+        assert [name for name, _ in calls] == ["calculate_accruals", "broken"]
+        assert agent.memo.stats() == {"hits": 1, "misses": 2, "entries": 1}
@@ -17,78 +17,100 @@ import pandas as pd
 COST_CATEGORIES = ["drill", "comp", "fb", "hu"]
 
 
+ENGINES = ["columnar", "rowwise"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
 class TestCalculateAccruals:
-    """Step 1: Gross and net accrual calculation."""
+    """Step 1: Gross and net accrual calculation (both engines)."""
 
-    def test_returns_dict_with_required_keys(self):
-        result = calculate_accruals()
+    def test_returns_dict_with_required_keys(self, engine):
+        result = calculate_accruals(engine=engine)
         assert "accruals" in result
         assert "summary" in result
         assert "exceptions" in result
 
-    def test_accrual_record_has_required_fields(self):
-        result = calculate_accruals()
+    def test_accrual_record_has_required_fields(self, engine):
+        result = calculate_accruals(engine=engine)
         record = result["accruals"][0]
         for field in ["wbs_element", "well_name", "total_gross_accrual",
                        "total_net_accrual", "wi_pct"]:
             assert field in record, f"Missing field: {field}"
 
-    def test_accrual_record_has_per_category_fields(self):
-        result = calculate_accruals()
+    def test_accrual_record_has_per_category_fields(self, engine):
+        result = calculate_accruals(engine=engine)
         record = result["accruals"][0]
         for cat in COST_CATEGORIES:
             assert f"{cat}_gross_accrual" in record
             assert f"{cat}_net_accrual" in record
 
-    def test_gross_accrual_equals_vow_minus_itd(self):
-        result = calculate_accruals()
+    def test_gross_accrual_equals_vow_minus_itd(self, engine):
+        result = calculate_accruals(engine=engine)
         for rec in result["accruals"]:
             assert isinstance(rec["total_gross_accrual"], (int, float))
 
-    def test_net_accrual_equals_gross_times_wi(self):
-        result = calculate_accruals()
+    def test_net_accrual_equals_gross_times_wi(self, engine):
+        result = calculate_accruals(engine=engine)
         for rec in result["accruals"]:
             expected_net = rec["total_gross_accrual"] * rec["wi_pct"]
             assert abs(rec["total_net_accrual"] - expected_net) < 1.0, (
                 f"Net accrual mismatch for {rec['wbs_element']}"
             )
 
-    def test_negative_accrual_exception_detected(self):
-        result = calculate_accruals()
+    def test_negative_accrual_exception_detected(self, engine):
+        result = calculate_accruals(engine=engine)
         neg_exceptions = [e for e in result["exceptions"]
                           if e["exception_type"] == "Negative Accrual"]
         assert len(neg_exceptions) >= 1
 
-    def test_large_swing_exception_detected(self):
-        result = calculate_accruals()
+    def test_large_swing_exception_detected(self, engine):
+        result = calculate_accruals(engine=engine)
         swing_exceptions = [e for e in result["exceptions"]
                             if e["exception_type"] == "Large Swing"]
         assert len(swing_exceptions) >= 1
 
-    def test_summary_totals(self):
-        result = calculate_accruals()
+    def test_summary_totals(self, engine):
+        result = calculate_accruals(engine=engine)
         summary = result["summary"]
         assert "total_gross_accrual" in summary
         assert "total_net_accrual" in summary
         assert "well_count" in summary
         assert "exception_count" in summary
 
-    def test_business_unit_filter(self):
-        result = calculate_accruals(business_unit="Permian Basin")
+    def test_business_unit_filter(self, engine):
+        result = calculate_accruals(business_unit="Permian Basin", engine=engine)
         for rec in result["accruals"]:
             assert rec["business_unit"] == "Permian Basin"
 
-
+    def test_matches_other_engine(self, engine):
+        other = next(e for e in ENGINES if e != engine)
+        result = calculate_accruals(engine=engine)
+        expected = calculate_accruals(engine=other)
+        assert result["exceptions"] == expected["exceptions"]
+        assert len(result["accruals"]) == len(expected["accruals"])
+        for rec, exp in zip(result["accruals"], expected["accruals"]):
+            assert list(rec) == list(exp)
+            for key, value in exp.items():
+                assert rec[key] == pytest.approx(value), f"{exp['wbs_element']} {key}"
+        for key, value in expected["summary"].items():
+            assert result["summary"][key] == pytest.approx(value)
+
+    def test_unknown_engine_rejected(self, engine):
+        with pytest.raises(ValueError):
+            calculate_accruals(engine=f"{engine}-typo")
+
+
+@pytest.mark.parametrize("engine", ENGINES)
 class TestCalculateNetDown:
-    """Step 2: WI% net-down adjustment."""
+    """Step 2: WI% net-down adjustment (both engines)."""
 
-    def test_returns_dict_with_required_keys(self):
-        result = calculate_net_down()
+    def test_returns_dict_with_required_keys(self, engine):
+        result = calculate_net_down(engine=engine)
         assert "adjustments" in result
         assert "summary" in result
 
-    def test_adjustment_record_fields(self):
-        result = calculate_net_down()
+    def test_adjustment_record_fields(self, engine):
+        result = calculate_net_down(engine=engine)
         if result["adjustments"]:
             rec = result["adjustments"][0]
             for field in ["wbs_element", "total_system_cost", "system_wi_pct",
@@ -96,49 +118,86 @@ class TestCalculateNetDown:
                            "adjusted_net_cost"]:
                 assert field in rec, f"Missing field: {field}"
 
-    def test_only_mismatched_wells_have_adjustments(self):
-        result = calculate_net_down()
+    def test_only_mismatched_wells_have_adjustments(self, engine):
+        result = calculate_net_down(engine=engine)
         for adj in result["adjustments"]:
             assert adj["system_wi_pct"] != adj["actual_wi_pct"], (
                 f"{adj['wbs_element']} has no WI% mismatch but got adjustment"
             )
 
-    def test_net_down_formula(self):
-        result = calculate_net_down()
+    def test_net_down_formula(self, engine):
+        result = calculate_net_down(engine=engine)
         for adj in result["adjustments"]:
             expected = adj["total_system_cost"] * (adj["system_wi_pct"] - adj["actual_wi_pct"])
             assert abs(adj["net_down_adjustment"] - expected) < 1.0
 
-    def test_adjusted_net_cost_formula(self):
-        result = calculate_net_down()
+    def test_adjusted_net_cost_formula(self, engine):
+        result = calculate_net_down(engine=engine)
         for adj in result["adjustments"]:
             expected = adj["total_system_cost"] * adj["actual_wi_pct"]
             assert abs(adj["adjusted_net_cost"] - expected) < 1.0
 
-    def test_large_wi_gap_produces_large_adjustment(self):
-        result = calculate_net_down()
+    def test_large_wi_gap_produces_large_adjustment(self, engine):
+        result = calculate_net_down(engine=engine)
         large = [a for a in result["adjustments"]
                  if a["wbs_element"] == "WBS-1007"]
         assert len(large) == 1
         assert abs(large[0]["net_down_adjustment"]) > 500_000
 
-    def test_summary_total_adjustment(self):
-        result = calculate_net_down()
+    def test_summary_total_adjustment(self, engine):
+        result = calculate_net_down(engine=engine)
         expected_total = sum(a["net_down_adjustment"] for a in result["adjustments"])
         assert abs(result["summary"]["total_net_down_adjustment"] - expected_total) < 1.0
 
-
+    def test_matches_other_engine(self, engine):
+        other = next(e for e in ENGINES if e != engine)
+        result = calculate_net_down(engine=engine)
+        expected = calculate_net_down(engine=other)
+        assert [a["wbs_element"] for a in result["adjustments"]] == [
+            a["wbs_element"] for a in expected["adjustments"]
+        ]
+        for rec, exp in zip(result["adjustments"], expected["adjustments"]):
+            assert list(rec) == list(exp)
+            for key, value in exp.items():
+                assert rec[key] == pytest.approx(value)
+        assert result["summary"] == pytest.approx(expected["summary"])
+
+
+class TestWiMismatchTolerance:
+    """Float WI% noise from CSV must not create spurious net-downs."""
+
+    def _frame(self, system_wi):
+        from utils.data_loader import load_wbs_master
+        df = load_wbs_master().head(3).copy()
+        df["wi_pct"] = 0.75
+        df["system_wi_pct"] = system_wi
+        return df
+
+    def test_float_noise_is_not_a_mismatch(self):
+        from agent.engine import build_close_frame
+        df = self._frame([0.1 + 0.65, 0.75 + 1e-12, 0.75])
+        assert not build_close_frame(df)["wi_mismatch"].any()
+
+    def test_real_mismatch_detected(self):
+        from agent.engine import build_close_frame, net_down_view
+        df = self._frame([0.75, 0.80, 0.75])
+        result = net_down_view(build_close_frame(df))
+        assert result["summary"]["wells_with_mismatch"] == 1
+        assert result["adjustments"][0]["wbs_element"] == df.iloc[1]["wbs_element"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
 class TestCalculateOutlook:
-    """Step 3: Future outlook allocation."""
+    """Step 3: Future outlook allocation (both engines)."""
 
-    def test_returns_dict_with_required_keys(self):
-        result = calculate_outlook()
+    def test_returns_dict_with_required_keys(self, engine):
+        result = calculate_outlook(engine=engine)
         assert "outlook" in result
         assert "summary" in result
         assert "exceptions" in result
 
-    def test_outlook_record_fields(self):
-        result = calculate_outlook()
+    def test_outlook_record_fields(self, engine):
+        result = calculate_outlook(engine=engine)
         if result["outlook"]:
             rec = result["outlook"][0]
             for field in ["wbs_element", "well_name"]:
@@ -146,62 +205,74 @@ class TestCalculateOutlook:
             for cat in COST_CATEGORIES:
                 assert f"{cat}_future_outlook" in rec
 
-    def test_future_outlook_formula(self):
+    def test_future_outlook_formula(self, engine):
         """Future Outlook = Ops Budget - Total In System (after WI% adjustment)."""
-        result = calculate_outlook()
+        result = calculate_outlook(engine=engine)
         for rec in result["outlook"]:
             for cat in COST_CATEGORIES:
                 assert isinstance(rec[f"{cat}_future_outlook"], (int, float))
 
-    def test_over_budget_exception_detected(self):
-        result = calculate_outlook()
+    def test_over_budget_exception_detected(self, engine):
+        result = calculate_outlook(engine=engine)
         over_budget = [e for e in result["exceptions"]
                        if e["exception_type"] == "Over Budget"]
         assert len(over_budget) >= 1
 
-    def test_summary_totals(self):
-        result = calculate_outlook()
+    def test_summary_totals(self, engine):
+        result = calculate_outlook(engine=engine)
         assert "total_future_outlook" in result["summary"]
 
+    def test_matches_other_engine(self, engine):
+        other = next(e for e in ENGINES if e != engine)
+        result = calculate_outlook(engine=engine)
+        expected = calculate_outlook(engine=other)
+        assert result["exceptions"] == expected["exceptions"]
+        for rec, exp in zip(result["outlook"], expected["outlook"]):
+            assert list(rec) == list(exp)
+            for key, value in exp.items():
+                assert rec[key] == pytest.approx(value)
+        assert result["summary"] == pytest.approx(expected["summary"])
+
 
+@pytest.mark.parametrize("engine", ENGINES)
 class TestGenerateOutlookLoadFile:
-    """Monthly outlook grid for OneStream."""
+    """Monthly outlook grid for OneStream (both engines)."""
 
-    def test_returns_dataframe(self):
-        result = generate_outlook_load_file()
+    def test_returns_dataframe(self, engine):
+        result = generate_outlook_load_file(engine=engine)
         assert "load_file" in result
         assert isinstance(result["load_file"], pd.DataFrame)
 
-    def test_columns_include_well_and_category(self):
-        result = generate_outlook_load_file()
+    def test_columns_include_well_and_category(self, engine):
+        result = generate_outlook_load_file(engine=engine)
         df = result["load_file"]
         assert "well_name" in df.columns
         assert "wbs_element" in df.columns
         assert "cost_category" in df.columns
 
-    def test_has_monthly_columns(self):
-        result = generate_outlook_load_file()
+    def test_has_monthly_columns(self, engine):
+        result = generate_outlook_load_file(engine=engine)
         df = result["load_file"]
         month_cols = [c for c in df.columns if c not in
                       ["well_name", "wbs_element", "cost_category", "total"]]
         assert len(month_cols) >= 3, "Should have at least 3 monthly columns"
 
-    def test_four_rows_per_well(self):
-        result = generate_outlook_load_file()
+    def test_four_rows_per_well(self, engine):
+        result = generate_outlook_load_file(engine=engine)
         df = result["load_file"]
         for wbs in df["wbs_element"].unique():
             well_rows = df[df["wbs_element"] == wbs]
             assert len(well_rows) == 4, f"{wbs} should have 4 rows (one per category)"
 
-    def test_category_values(self):
-        result = generate_outlook_load_file()
+    def test_category_values(self, engine):
+        result = generate_outlook_load_file(engine=engine)
         df = result["load_file"]
         expected = {"Drilling", "Completions", "Flowback", "Hookup"}
         actual = set(df["cost_category"].unique())
         assert actual == expected
 
-    def test_monthly_values_sum_to_total(self):
-        result = generate_outlook_load_file()
+    def test_monthly_values_sum_to_total(self, engine):
+        result = generate_outlook_load_file(engine=engine)
         df = result["load_file"]
         month_cols = [c for c in df.columns if c not in
                       ["well_name", "wbs_element", "cost_category", "total"]]
@@ -211,6 +282,51 @@ class TestGenerateOutlookLoadFile:
                 f"Monthly values don't sum to total for {row['wbs_element']} {row['cost_category']}"
             )
 
+    @pytest.mark.parametrize("months_forward", [1, 6, 24])
+    @pytest.mark.parametrize("business_unit", ["all", "DJ Basin"])
+    def test_matches_other_engine(self, engine, months_forward, business_unit):
+        other = next(e for e in ENGINES if e != engine)
+        result = generate_outlook_load_file(business_unit, months_forward, engine=engine)
+        expected = generate_outlook_load_file(business_unit, months_forward, engine=other)
+        assert result["months"] == expected["months"]
+        pd.testing.assert_frame_equal(result["load_file"], expected["load_file"])
+
+
+class TestAllocationEdgeCases:
+    """Array allocator vs the reference loop on incomplete schedules."""
+
+    def test_missing_schedule_and_phases(self):
+        from agent.allocation import allocate_load_file, month_calendar
+        from agent.engine import build_close_frame
+        from agent.tools import REFERENCE_DATE, _generate_outlook_load_file_rowwise
+        from utils.data_loader import (
+            load_drill_schedule, load_wbs_master, pivot_phase_dates, to_dollars,
+        )
+
+        wbs_df = load_wbs_master()
+        sched = load_drill_schedule()
+        unscheduled = wbs_df["wbs_element"].iloc[0]
+        partial = wbs_df["wbs_element"].iloc[1]
+        sched = sched[sched["wbs_element"] != unscheduled]
+        sched = sched[~((sched["wbs_element"] == partial)
+                        & (sched["planned_phase"] == "Frac End"))]
+
+        expected = _generate_outlook_load_file_rowwise(to_dollars(wbs_df), sched, 6)["load_file"]
+        phases = pivot_phase_dates(wbs_df["wbs_element"], sched)
+        result = allocate_load_file(
+            build_close_frame(wbs_df), phases.dates, phases.scheduled,
+            month_calendar(REFERENCE_DATE, 6),
+        )
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_month_calendar_bounds(self):
+        from datetime import date
+        from agent.allocation import month_calendar
+        cal = month_calendar(date(2026, 11, 15), 3)
+        assert cal.labels == ("Nov-26", "Dec-26", "Jan-27")
+        assert str(cal.starts[2]) == "2027-01-01"
+        assert str(cal.ends[1]) == "2026-12-31"
+
 
 class TestGetExceptions:
     def test_returns_all_exceptions(self):
@@ -232,6 +348,65 @@ class TestGetWellDetail:
                       "net_down_adjustment", "total_in_system", "total_future_outlook"]:
             assert key in result, f"Missing: {key}"
 
+    def test_consistent_with_step_results(self):
+        result = get_well_detail("WBS-1007")
+        acc = next(a for a in calculate_accruals()["accruals"]
+                   if a["wbs_element"] == "WBS-1007")
+        adj = next(a for a in calculate_net_down()["adjustments"]
+                   if a["wbs_element"] == "WBS-1007")
+        out = next(o for o in calculate_outlook()["outlook"]
+                   if o["wbs_element"] == "WBS-1007")
+        assert result["total_gross_accrual"] == acc["total_gross_accrual"]
+        assert result["total_net_accrual"] == pytest.approx(acc["total_net_accrual"])
+        assert result["net_down_adjustment"] == pytest.approx(adj["net_down_adjustment"])
+        assert result["total_future_outlook"] == pytest.approx(out["total_future_outlook"])
+
+    def test_money_is_float_dollars(self):
+        from utils.data_loader import load_wbs_master, to_dollars
+        result = get_well_detail("WBS-1007")
+        master = to_dollars(load_wbs_master()).set_index("wbs_element")
+        for cat in COST_CATEGORIES:
+            for kind in ("itd", "vow", "ops_budget"):
+                key = f"{cat}_{kind}"
+                assert type(result[key]) is float
+                assert result[key] == master.loc["WBS-1007", key]
+        assert result["prior_gross_accrual"] == master.loc["WBS-1007", "prior_gross_accrual"]
+        assert type(result["total_gross_accrual"]) is float
+
+    def test_lookup_by_well_name_and_afe(self):
+        from utils.data_loader import load_wbs_master
+        by_wbs = get_well_detail("WBS-1007")
+        row = load_wbs_master().set_index("wbs_element").loc["WBS-1007"]
+        assert get_well_detail(row["well_name"]) == by_wbs
+        assert get_well_detail(row["afe_number"]) == by_wbs
+
+    def test_unknown_well(self):
+        result = get_well_detail("WBS-0000")
+        assert "error" in result
+
+
+class TestCloseKernel:
+    """The close frame is built once and shared by every view."""
+
+    def test_full_close_builds_frame_once(self, monkeypatch):
+        import agent.tools as tools
+        calls = []
+        real = tools.build_close_frame
+        monkeypatch.setattr(tools, "build_close_frame",
+                            lambda df: calls.append(len(df)) or real(df))
+        tools.clear_caches()
+        try:
+            calculate_accruals()
+            calculate_net_down()
+            calculate_outlook()
+            get_exceptions()
+            get_close_summary()
+            get_well_detail("WBS-1007")
+            generate_outlook_load_file()
+        finally:
+            tools.clear_caches()
+        assert len(calls) == 1
+
 
 class TestGenerateJournalEntry:
     def test_returns_journal_entry(self):
@@ -253,11 +428,35 @@ class TestGetCloseSummary:
                       "total_net_down_adjustment", "total_future_outlook"]:
             assert key in totals
 
+    def test_bu_totals_match_step_summaries(self):
+        result = get_close_summary()
+        for bu, totals in result["by_business_unit"].items():
+            accruals = calculate_accruals(bu)["summary"]
+            net_down = calculate_net_down(bu)["summary"]
+            outlook = calculate_outlook(bu)["summary"]
+            assert totals["total_gross_accrual"] == accruals["total_gross_accrual"]
+            assert totals["total_net_accrual"] == pytest.approx(accruals["total_net_accrual"])
+            assert totals["total_net_down_adjustment"] == pytest.approx(
+                net_down["total_net_down_adjustment"])
+            assert totals["total_future_outlook"] == pytest.approx(outlook["total_future_outlook"])
+            assert totals["well_count"] == accruals["well_count"]
+            assert totals["exception_count"] == (
+                accruals["exception_count"] + outlook["over_budget_count"])
+
+    def test_grand_totals_match_full_close(self):
+        totals = get_close_summary()["grand_totals"]
+        assert totals["total_gross_accrual"] == calculate_accruals()["summary"]["total_gross_accrual"]
+        assert totals["well_count"] == calculate_accruals()["summary"]["well_count"]
+
+    def test_business_unit_filter(self):
+        result = get_close_summary("DJ Basin")
+        assert list(result["by_business_unit"]) == ["DJ Basin"]
+
 
 class TestToolDefinitions:
     def test_all_definitions_valid(self):
         from agent.tool_definitions import TOOL_DEFINITIONS
-        assert len(TOOL_DEFINITIONS) == 10
+        assert len(TOOL_DEFINITIONS) == 13
         for td in TOOL_DEFINITIONS:
             assert "name" in td
             assert "description" in td
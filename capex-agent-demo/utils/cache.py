@@ -0,0 +1,156 @@
+"""Data-version-aware memoization for loaders and close calculations.
+
+functools.lru_cache keys only on the call arguments, so a long-running
+Streamlit or CLI process kept serving results computed from an old
+wbs_master.csv until someone called clear_caches().  versioned_cache keys
+every entry on a data version as well: when the version function reports a
+new value (e.g. the CSV was overwritten by the daily refresh), all entries
+computed against the old version are dropped and recomputed on demand.
+
+Each cache has an explicit maxsize with least-recently-used eviction, plus
+hit/miss/eviction counters.  Concurrent misses on one key (e.g. two tools
+running in parallel that both need the close frame) compute it once; the
+other callers wait for that result.  The wrapper keeps the cache_clear() /
+cache_info() interface of lru_cache so existing call sites are unchanged.
+"""
+
+import inspect
+import threading
+from collections import OrderedDict, namedtuple
+from functools import wraps
+
+CacheInfo = namedtuple(
+    "CacheInfo", ["hits", "misses", "evictions", "invalidations", "maxsize", "currsize"],
+)
+
+_REGISTRY = {}
+
+
+class VersionedCache:
+    """Bounded LRU mapping whose contents belong to a single data version."""
+
+    def __init__(self, maxsize: int, version_fn):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self.version_fn = version_fn
+        self._entries = OrderedDict()
+        self._version = None
+        self._lock = threading.Lock()
+        self._pending = {}   # key -> Event set when its in-flight compute ends
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_compute(self, key, compute):
+        """Return the cached value for key, computing it on a miss."""
+        version = self.version_fn()
+        while True:
+            with self._lock:
+                self._sync(version)
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return self._entries[key]
+                pending = self._pending.get(key)
+                if pending is None:
+                    self.misses += 1
+                    pending = self._pending[key] = threading.Event()
+                    break
+            # Another thread is computing this key: wait, then look again
+            # (it may have failed or belonged to an older version)
+            pending.wait()
+
+        # Compute outside the lock
+        try:
+            value = compute()
+            with self._lock:
+                if version == self._version:
+                    self._store(key, value)
+        finally:
+            with self._lock:
+                if self._pending.get(key) is pending:
+                    del self._pending[key]
+            pending.set()
+        return value
+
+    def put(self, key, value):
+        """Store a value computed elsewhere under the current data version.
+
+        Used to prime a cache after an incremental update, so the next call
+        is a hit instead of a full recompute.
+        """
+        version = self.version_fn()
+        with self._lock:
+            self._sync(version)
+            self._store(key, value)
+
+    def _sync(self, version):
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def _store(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._version = None
+
+    def info(self) -> CacheInfo:
+        with self._lock:
+            return CacheInfo(self.hits, self.misses, self.evictions,
+                             self.invalidations, self.maxsize, len(self._entries))
+
+
+def versioned_cache(version_fn, maxsize: int = 8, arg_version=None):
+    """Decorator: memoize a function per (data version, bound arguments).
+
+    arg_version(arguments) -> hashable, if given, is added to each entry's
+    key: a second version that only some calls depend on (e.g. the snapshot
+    store, for calls with a prior_period).  Entries keyed on its old values
+    are not used again and age out of the LRU.
+    """
+
+    def decorator(fn):
+        cache = VersionedCache(maxsize, version_fn)
+        signature = inspect.signature(fn)
+
+        def make_key(args, kwargs):
+            # Bind to the signature so f(), f("all") and f(business_unit="all")
+            # share one entry
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            key = tuple(bound.arguments.items())
+            if arg_version is not None:
+                key += (arg_version(bound.arguments),)
+            return key
+
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            return cache.get_or_compute(make_key(args, kwargs), lambda: fn(*args, **kwargs))
+
+        def cache_put(value, *args, **kwargs):
+            cache.put(make_key(args, kwargs), value)
+
+        wrapper.cache = cache
+        wrapper.cache_put = cache_put
+        wrapper.cache_clear = cache.clear
+        wrapper.cache_info = cache.info
+        _REGISTRY[f"{fn.__module__}.{fn.__qualname__}"] = cache
+        return wrapper
+
+    return decorator
+
+
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters for every versioned cache, keyed by function."""
+    return {name: cache.info()._asdict() for name, cache in _REGISTRY.items()}
@@ -4,43 +4,478 @@ Two data sources:
 - wbs_master.csv: Wide table with all financial data per well
 - drill_schedule.csv: Phase dates for time-based outlook allocation
 
-CSV reads are cached with functools.lru_cache so repeated tool calls
-within a session don't re-read from disk.  We use lru_cache (not
+CSV reads are cached with utils.cache.versioned_cache so repeated tool calls
+within a session don't re-read from disk.  Cache entries are keyed on
+data_version() — a fingerprint of both CSVs — so an overwritten file is
+picked up automatically on the next call.  A hash index from the well key
+columns (wbs_element, well_name, afe_number) to row position is built once
+per load so per-well lookups don't scan the frame.  We use our own cache (not
 @st.cache_data) because this module is also imported by CLI and tests.
 Streamlit-specific caching is layered on in app.py where needed.
+
+Cold starts skip CSV parsing through an optional columnar cache: the first
+load of each CSV writes a typed Parquet copy to DATA_DIR/.cache, tagged with
+the CSV's size and mtime, and later loads read that copy while the CSV is
+unchanged.  A missing, stale or unreadable cache file falls back to the CSV.
+write_shard_source() writes the merged master (deltas applied) to the same
+directory so process-pool shard workers can read just their partition.
+The cache uses pyarrow (in requirements.txt) and can be disabled with
+CAPEX_COLUMNAR_CACHE=0.
+
+The WBS master is loaded against a declared schema (WBS_SCHEMA) to keep the
+long-lived frame small: categoricals for business_unit/status, string-backed
+IDs, and money as exact int64 cents.  Because money is stored in cents,
+callers that need dollars (the close kernel, tool payloads) convert with
+to_dollars().  wbs_memory_report() shows the per-column savings.
+
+Extracts too large for one DataFrame can be read in bounded chunks with
+iter_wbs_master_chunks(); should_stream() reports when wbs_master.csv is over
+the CAPEX_STREAMING_THRESHOLD_MB size threshold, and the close tools stream
+then unless the caller passes streaming=False.
+
+Day-to-day changes arrive as small delta files dropped in DATA_DIR/incoming
+(see utils.ingest).  Applied deltas are replayed on top of the base CSVs when
+the frames are loaded, and data_version() covers them too.
+
+The drill schedule is also pivoted once per data load into a wells x phases
+datetime64 array aligned with the WBS master rows (load_phase_dates), so the
+outlook allocator gathers phase dates by row position instead of rebuilding a
+per-call lookup.
 """
 
-from functools import lru_cache
+import atexit
+import json
+import os
+from collections import namedtuple
 from pathlib import Path
+import numpy as np
 import pandas as pd
 
+from utils.cache import versioned_cache
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: loaders fall back to CSV-only
+    pa = None
+    pq = None
+
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
+DATA_FILES = ("wbs_master.csv", "drill_schedule.csv")
+
+CACHE_DIRNAME = ".cache"
+_SOURCE_METADATA_KEY = b"capex_source"
+# Bump when the typed layout of a cached frame changes so old caches go stale
+SCHEMA_VERSION = 2
+
+MONEY_COLUMNS = [
+    f"{cat}_{kind}"
+    for cat in ("drill", "comp", "fb", "hu")
+    for kind in ("budget", "itd", "vow", "ops_budget")
+] + ["prior_gross_accrual"]
+
+# Delta file drop directory and its archive of applied files (utils.ingest)
+INBOX_DIRNAME = "incoming"
+APPLIED_DIRNAME = "applied"
+
+# Bumped in-process by every ingest, so the version moves even when the
+# applied directory's mtime doesn't (coarse filesystem timestamps)
+_generation = 0
+
+STREAM_CHUNK_ROWS = 50_000
+DEFAULT_STREAMING_THRESHOLD_MB = 512
+
+# Declared dtypes for wbs_master.csv.  Money columns hold int64 cents.
+WBS_SCHEMA = {
+    "wbs_element": "string",
+    "well_name": "string",
+    "afe_number": "string",
+    "business_unit": "category",
+    "status": "category",
+    "start_date": "datetime64[ms]",
+    "wi_pct": "float64",
+    "system_wi_pct": "float64",
+    **{col: "int64" for col in MONEY_COLUMNS},
+}
+
+
+def data_version() -> tuple:
+    """Fingerprint of the input data: (name, mtime_ns, size) per CSV plus deltas.
+
+    Any change to either file (or to DATA_DIR), or an ingest of delta files,
+    yields a new version.
+    """
+    version = [str(DATA_DIR)]
+    for name in DATA_FILES:
+        try:
+            stat = (DATA_DIR / name).stat()
+            version.append((name, stat.st_mtime_ns, stat.st_size))
+        except FileNotFoundError:
+            version.append((name, None, None))
+    try:
+        applied = (DATA_DIR / INBOX_DIRNAME / APPLIED_DIRNAME).stat().st_mtime_ns
+    except FileNotFoundError:
+        applied = None
+    version.append(("deltas", _generation, applied))
+    return tuple(version)
+
+
+def bump_generation() -> None:
+    """Move data_version() on after an in-process change to the data."""
+    global _generation
+    _generation += 1
+
+
+def _source_fingerprint(path: Path) -> dict:
+    stat = path.stat()
+    return {"name": path.name, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+            "schema": SCHEMA_VERSION}
+
+
+def columnar_cache_path(csv_name: str) -> Path:
+    """Location of the Parquet cache for one of the DATA_FILES."""
+    return DATA_DIR / CACHE_DIRNAME / (Path(csv_name).stem + ".parquet")
+
+
+def _columnar_cache_enabled() -> bool:
+    return pq is not None and os.environ.get("CAPEX_COLUMNAR_CACHE", "1") != "0"
+
+
+def _read_columnar_cache(cache_path: Path, source: dict):
+    """Return the cached frame if it was written from this exact CSV, else None."""
+    try:
+        metadata = pq.read_schema(cache_path).metadata or {}
+        if json.loads(metadata.get(_SOURCE_METADATA_KEY, b"null")) != source:
+            return None
+        return pd.read_parquet(cache_path, engine="pyarrow")
+    except (OSError, ValueError, pa.ArrowException):
+        return None
+
+
+def _write_columnar_cache(cache_path: Path, df: pd.DataFrame, source: dict) -> None:
+    """Write df as Parquet (atomically); failures leave the CSV path in charge."""
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata[_SOURCE_METADATA_KEY] = json.dumps(source).encode()
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pa.ArrowException):
+        pass
+
+
+def _load_csv(csv_name: str, parse) -> pd.DataFrame:
+    """Load one of the DATA_FILES through the columnar cache when possible."""
+    csv_path = DATA_DIR / csv_name
+    if not _columnar_cache_enabled():
+        return parse(csv_path)
+
+    source = _source_fingerprint(csv_path)
+    cache_path = columnar_cache_path(csv_name)
+    df = _read_columnar_cache(cache_path, source)
+    if df is None:
+        df = parse(csv_path)
+        _write_columnar_cache(cache_path, df, source)
+    return df
+
+
+def to_cents(values: pd.Series) -> pd.Series:
+    """Dollar amounts -> exact int64 cents."""
+    if pd.api.types.is_integer_dtype(values):
+        return values.astype("int64") * 100
+    return pd.Series(np.rint(values.to_numpy(dtype=float) * 100), index=values.index).astype("int64")
+
+
+def apply_wbs_schema(raw: pd.DataFrame) -> pd.DataFrame:
+    """Cast a raw wbs_master frame to WBS_SCHEMA (money in cents).
+
+    Columns not in the schema are passed through unchanged.
+    """
+    df = raw.copy()
+    for col, dtype in WBS_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if col in MONEY_COLUMNS:
+            df[col] = to_cents(df[col])
+        elif dtype.startswith("datetime64"):
+            df[col] = pd.to_datetime(df[col]).astype(dtype)
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def to_dollars(df: pd.DataFrame) -> pd.DataFrame:
+    """Copy of a schema-typed WBS frame with money columns as float dollars."""
+    money = [c for c in MONEY_COLUMNS if c in df.columns]
+    return df.assign(**{c: df[c] / 100 for c in money})
+
+
+def memory_report(before: pd.DataFrame, after: pd.DataFrame) -> pd.DataFrame:
+    """Deep bytes per column for two versions of the same frame, plus a total row."""
+    b = before.memory_usage(deep=True, index=False)
+    a = after.memory_usage(deep=True, index=False)
+    report = pd.DataFrame({
+        "dtype_before": before.dtypes.astype(str),
+        "bytes_before": b,
+        "dtype_after": after.dtypes.astype(str),
+        "bytes_after": a,
+    })
+    report.loc["TOTAL"] = ["", b.sum(), "", a.sum()]
+    report["saved_pct"] = (1 - report["bytes_after"] / report["bytes_before"]).round(3) * 100
+    return report
+
+
+def wbs_memory_report() -> pd.DataFrame:
+    """memory_report for wbs_master.csv: inferred read_csv dtypes vs WBS_SCHEMA."""
+    raw = pd.read_csv(DATA_DIR / "wbs_master.csv")
+    return memory_report(raw, apply_wbs_schema(raw))
+
+
+def _parse_wbs_master(path: Path) -> pd.DataFrame:
+    return apply_wbs_schema(pd.read_csv(path))
+
+
+def _parse_drill_schedule(path: Path) -> pd.DataFrame:
+    return pd.read_csv(
+        path,
+        parse_dates=["planned_date"],
+        dtype={"planned_phase": "category"},
+    )
+
 
-@lru_cache(maxsize=1)
+@versioned_cache(data_version, maxsize=1)
 def _read_wbs_master() -> pd.DataFrame:
-    """Read the raw CSV once and cache it."""
-    return pd.read_csv(DATA_DIR / "wbs_master.csv")
+    """Read the WBS master (plus applied deltas) once per data version and cache it."""
+    from utils.ingest import replay_deltas
+
+    return replay_deltas("wbs_master.csv", _load_csv("wbs_master.csv", _parse_wbs_master))
+
+
+@versioned_cache(data_version, maxsize=1)
+def load_bu_partitions() -> dict:
+    """Partition map {business_unit: row positions} over the full WBS master.
+
+    Built once per data version, in first-appearance order; positions index
+    load_wbs_master("all") and are read-only.  Iterate this instead of calling
+    df["business_unit"].unique().
+    """
+    df = _read_wbs_master()
+    grouped = df.groupby("business_unit", sort=False, observed=True).indices
+    partitions = {}
+    for bu, positions in grouped.items():
+        positions = np.asarray(positions, dtype=np.int64)
+        positions.flags.writeable = False
+        partitions[str(bu)] = positions
+    return partitions
+
+
+@versioned_cache(data_version, maxsize=16)
+def _read_bu_frame(business_unit: str) -> pd.DataFrame:
+    positions = load_bu_partitions().get(business_unit, np.empty(0, dtype=np.int64))
+    return _read_wbs_master().iloc[positions]
 
 
 def load_wbs_master(business_unit: str = "all") -> pd.DataFrame:
-    """Load WBS Master, optionally filtered by business unit."""
+    """Load WBS Master (WBS_SCHEMA types, money in cents), optionally filtered by BU.
+
+    BU frames are cut once per data version from the partition map and
+    cached, so repeated filtered calls are dictionary lookups.
+    """
+    if business_unit == "all":
+        return _read_wbs_master()
+    return _read_bu_frame(business_unit)
+
+
+def should_stream() -> bool:
+    """True when wbs_master.csv is over the streaming size threshold.
+
+    The threshold is CAPEX_STREAMING_THRESHOLD_MB (default 512 MB).
+    """
+    threshold_mb = float(os.environ.get(
+        "CAPEX_STREAMING_THRESHOLD_MB", DEFAULT_STREAMING_THRESHOLD_MB,
+    ))
+    size = (DATA_DIR / "wbs_master.csv").stat().st_size
+    return size >= threshold_mb * 1024 * 1024
+
+
+def iter_wbs_master_chunks(business_unit: str = "all", chunksize: int = STREAM_CHUNK_ROWS):
+    """Yield WBS_SCHEMA-typed chunks of wbs_master.csv, at most chunksize rows each.
+
+    Reads the CSV incrementally (bypassing the in-memory and columnar caches),
+    so peak memory is set by chunksize rather than the file size.  Applied
+    deltas are patched into each chunk; wells they add come last.
+    """
+    from utils.ingest import NetWbsDelta
+
+    delta = NetWbsDelta.applied()
+    seen = set()
+
+    def select(chunk):
+        if business_unit != "all":
+            chunk = chunk[chunk["business_unit"] == business_unit]
+        return chunk.reset_index(drop=True)
+
+    columns = None
+    with pd.read_csv(DATA_DIR / "wbs_master.csv", chunksize=chunksize) as reader:
+        for raw in reader:
+            chunk = apply_wbs_schema(raw)
+            columns = chunk.columns
+            if delta:
+                chunk = delta.apply_to_chunk(chunk, seen)
+            chunk = select(chunk)
+            if len(chunk):
+                yield chunk
+    if delta and columns is not None:
+        tail = delta.tail(seen, columns)
+        for start in range(0, len(tail), chunksize):
+            chunk = select(tail.iloc[start:start + chunksize])
+            if len(chunk):
+                yield chunk
+
+
+WELL_KEY_COLUMNS = ("wbs_element", "well_name", "afe_number")
+
+
+@versioned_cache(data_version, maxsize=1)
+def load_well_index() -> dict:
+    """Map {key column: {value: row position}} over the full WBS master.
+
+    Row positions index load_wbs_master("all").  If a value repeats within a
+    column the first row wins.
+    """
     df = _read_wbs_master()
-    if business_unit != "all":
-        df = df[df["business_unit"] == business_unit]
-    return df
+    index = {}
+    for col in WELL_KEY_COLUMNS:
+        values = df[col].tolist()
+        positions = {}
+        for pos, value in enumerate(values):
+            positions.setdefault(value, pos)
+        index[col] = positions
+    return index
+
+
+def find_well(key: str) -> int | None:
+    """Row position of a well by WBS element, AFE number or well name."""
+    index = load_well_index()
+    for col in WELL_KEY_COLUMNS:
+        pos = index[col].get(key)
+        if pos is not None:
+            return pos
+    return None
 
 
-@lru_cache(maxsize=1)
+@versioned_cache(data_version, maxsize=1)
 def load_drill_schedule() -> pd.DataFrame:
-    """Load drill/frac schedule with parsed dates."""
-    return pd.read_csv(
-        DATA_DIR / "drill_schedule.csv",
-        parse_dates=["planned_date"],
+    """Load drill/frac schedule (plus applied deltas) with parsed dates."""
+    from utils.ingest import replay_deltas
+
+    return replay_deltas(
+        "drill_schedule.csv", _load_csv("drill_schedule.csv", _parse_drill_schedule),
     )
 
 
+SCHEDULE_PHASES = ("Spud", "TD", "Frac Start", "Frac End", "First Production")
+
+PhaseDates = namedtuple("PhaseDates", ["index", "dates", "scheduled"])
+PhaseDates.__doc__ = """Drill schedule pivot.
+
+index: wbs_element per row; dates: rows x SCHEDULE_PHASES datetime64[D]
+(NaT where a phase is missing); scheduled: whether the well has any
+schedule rows at all.
+"""
+
+
+def pivot_phase_dates(wbs_elements, sched_df: pd.DataFrame) -> PhaseDates:
+    """Pivot a drill schedule to one row per wbs_element (in the given order)."""
+    index = pd.Index(wbs_elements)
+    sched = sched_df.drop_duplicates(["wbs_element", "planned_phase"], keep="last")
+    pivot = sched.pivot(index="wbs_element", columns="planned_phase", values="planned_date")
+    pivot = pivot.reindex(index=index, columns=list(SCHEDULE_PHASES))
+    dates = pivot.to_numpy(dtype="datetime64[D]")
+    scheduled = np.asarray(index.isin(sched["wbs_element"].unique()))
+    dates.flags.writeable = False
+    scheduled.flags.writeable = False
+    return PhaseDates(index, dates, scheduled)
+
+
+@versioned_cache(data_version, maxsize=1)
+def load_phase_dates() -> PhaseDates:
+    """Drill schedule pivot aligned with load_wbs_master("all") row order."""
+    return pivot_phase_dates(_read_wbs_master()["wbs_element"], load_drill_schedule())
+
+
+def _phase_column(phase: str) -> str:
+    return "_phase_" + phase.replace(" ", "_").lower()
+
+
+@versioned_cache(data_version, maxsize=1)
+def write_shard_source():
+    """Write the merged WBS master, with its phase dates, as Parquet for shard workers.
+
+    Rows are in load_wbs_master("all") order with a _position column, so a
+    worker reads just its partition with read_shard (filters on
+    business_unit or _position skip whole row groups).  Written once per data
+    version, so applied deltas are included.  The file is per process and
+    removed at exit.  Returns the path, or None when the columnar cache is
+    disabled or the file can't be written.
+    """
+    if not _columnar_cache_enabled():
+        return None
+    df = _read_wbs_master()
+    phases = load_phase_dates()
+    frame = df.assign(
+        _position=np.arange(len(df), dtype=np.int64),
+        _scheduled=phases.scheduled,
+        **{_phase_column(p): phases.dates[:, i] for i, p in enumerate(SCHEDULE_PHASES)},
+    )
+    cache_path = DATA_DIR / CACHE_DIRNAME / f"wbs_shards.{os.getpid()}.parquet"
+    try:
+        cache_path.parent.mkdir(exist_ok=True)
+        if not cache_path.exists():
+            atexit.register(cache_path.unlink, missing_ok=True)
+        tmp_path = cache_path.with_suffix(".tmp")
+        frame.to_parquet(tmp_path, engine="pyarrow", index=False,
+                         row_group_size=STREAM_CHUNK_ROWS)
+        os.replace(tmp_path, cache_path)
+    except (OSError, pa.ArrowException):
+        return None
+    return cache_path
+
+
+def read_shard(path, filters: list) -> tuple:
+    """(positions, master rows, phase dates, scheduled flags) for one partition.
+
+    Reads the rows of a write_shard_source file matching filters (pyarrow
+    filter tuples).  The phase data matches PhaseDates.dates/scheduled.
+    """
+    frame = pd.read_parquet(path, engine="pyarrow", filters=filters)
+    phase_cols = [_phase_column(p) for p in SCHEDULE_PHASES]
+    dates = frame[phase_cols].to_numpy(dtype="datetime64[D]")
+    positions = frame["_position"].to_numpy(dtype=np.int64)
+    scheduled = frame["_scheduled"].to_numpy(dtype=bool)
+    df = frame.drop(columns=["_position", "_scheduled", *phase_cols])
+    return positions, df, dates, scheduled
+
+
+def store_merged(master: pd.DataFrame, schedule: pd.DataFrame) -> None:
+    """Seed the loader caches with frames merged in memory (utils.ingest).
+
+    Call after the data version has moved on; the derived caches (partitions,
+    well index, phase pivot) rebuild from these on first use.
+    """
+    _read_wbs_master.cache_put(master)
+    load_drill_schedule.cache_put(schedule)
+
+
 def clear_caches():
     """Clear all data caches. Useful for testing or data refresh."""
     _read_wbs_master.cache_clear()
+    load_bu_partitions.cache_clear()
+    _read_bu_frame.cache_clear()
+    load_well_index.cache_clear()
     load_drill_schedule.cache_clear()
+    load_phase_dates.cache_clear()
+    write_shard_source.cache_clear()
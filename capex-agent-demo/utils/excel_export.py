@@ -60,9 +60,10 @@ def generate_close_package(business_unit: str = "all") -> bytes:
     """
     output = io.BytesIO()
 
-    accrual_result = calculate_accruals(business_unit)
-    net_down_result = calculate_net_down(business_unit)
-    outlook_result = calculate_outlook(business_unit)
+    # The sheets list every well, so never take the streamed results
+    accrual_result = calculate_accruals(business_unit, streaming=False)
+    net_down_result = calculate_net_down(business_unit, streaming=False)
+    outlook_result = calculate_outlook(business_unit, streaming=False)
     load_result = generate_outlook_load_file(business_unit)
     exception_result = get_exceptions(business_unit)
 
@@ -0,0 +1,314 @@
+"""Delta ingestion for the daily WBS master / drill schedule refresh.
+
+Instead of regenerating wbs_master.csv and drill_schedule.csv wholesale, the
+daily feed can drop small delta files into DATA_DIR/incoming:
+
+- <name>.upsert.csv    WBS master rows keyed by wbs_element.  For known
+                       wells, missing columns and blank cells are left
+                       unchanged; new wells need every column.  Money is in
+                       dollars, as in wbs_master.csv.
+- <name>.delete.csv    a wbs_element column of wells to remove.
+- <name>.schedule.csv  wbs_element, planned_phase, planned_date rows; a blank
+                       planned_date removes that phase.
+
+ingest_deltas() applies pending files in name order to the in-memory master
+and schedule, touching only the delta rows (updated wells keep their row
+position, new wells are appended, removed wells are dropped), then moves the
+files to incoming/applied.  That bumps data_version(), and the merged frames
+are stored straight into the loader caches so nothing is re-read.  Applied
+deltas are replayed on top of the base CSVs on a cold load; regenerating a
+base CSV supersedes every delta applied before it.
+"""
+
+import os
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+
+from utils import data_loader
+
+DELTA_SUFFIXES = {
+    ".upsert.csv": "upsert",
+    ".delete.csv": "delete",
+    ".schedule.csv": "schedule",
+}
+# Which base CSV each delta kind modifies
+DELTA_TARGETS = {
+    "upsert": "wbs_master.csv",
+    "delete": "wbs_master.csv",
+    "schedule": "drill_schedule.csv",
+}
+
+IngestReport = namedtuple(
+    "IngestReport", ["files", "updated", "added", "removed", "schedule_changed"],
+)
+IngestReport.__doc__ = """Result of one ingest_deltas() run.
+
+files: delta file names applied, in order; updated: wells whose master row
+changed in place; added/removed: wells whose row was appended/dropped (a well
+deleted and re-added in the batch is in both, as it moves to the end);
+schedule_changed: wells with phase-date changes.
+"""
+
+
+def inbox_dir() -> Path:
+    """The file-drop directory for delta files."""
+    return data_loader.DATA_DIR / data_loader.INBOX_DIRNAME
+
+
+def applied_dir() -> Path:
+    return inbox_dir() / data_loader.APPLIED_DIRNAME
+
+
+def delta_kind(path: Path) -> str | None:
+    for suffix, kind in DELTA_SUFFIXES.items():
+        if path.name.endswith(suffix):
+            return kind
+    return None
+
+
+def pending_deltas() -> list:
+    """Delta files waiting in the inbox, in the order they will be applied."""
+    inbox = inbox_dir()
+    if not inbox.is_dir():
+        return []
+    return sorted(p for p in inbox.iterdir() if p.is_file() and delta_kind(p))
+
+
+def applied_deltas(target: str) -> list:
+    """Applied delta files for one base CSV that are newer than that CSV."""
+    applied = applied_dir()
+    if not applied.is_dir():
+        return []
+    base_mtime = (data_loader.DATA_DIR / target).stat().st_mtime_ns
+    return sorted(
+        p for p in applied.iterdir()
+        if delta_kind(p) and DELTA_TARGETS[delta_kind(p)] == target
+        and p.stat().st_mtime_ns >= base_mtime
+    )
+
+
+def read_delta(path: Path) -> pd.DataFrame:
+    """Parse one delta file into loader types."""
+    kind = delta_kind(path)
+    if kind == "upsert":
+        # Typed per row run (see upsert_runs): blank cells mean "unchanged"
+        return pd.read_csv(path, dtype={"wbs_element": "string"})
+    if kind == "delete":
+        return pd.read_csv(path, usecols=["wbs_element"], dtype="string")
+    return pd.read_csv(path, parse_dates=["planned_date"], dtype={"planned_phase": "category"})
+
+
+def _align_categories(left: pd.DataFrame, right: pd.DataFrame):
+    """Give shared categorical columns one (sorted) category set."""
+    left = left.copy(deep=False)
+    right = right.copy(deep=False)
+    for col in left.columns.intersection(right.columns):
+        if isinstance(left[col].dtype, pd.CategoricalDtype):
+            values = set(left[col].cat.categories) | set(right[col].astype("category").cat.categories)
+            dtype = pd.CategoricalDtype(sorted(values))
+            left[col] = left[col].astype(dtype)
+            right[col] = right[col].astype(dtype)
+    return left, right
+
+
+def upsert_runs(upserts: pd.DataFrame):
+    """Split raw upsert rows into WBS_SCHEMA-typed runs of consecutive rows
+    that fill the same columns, dropping the blank ones."""
+    filled = upserts.notna().to_numpy()
+    start = 0
+    for end in range(1, len(upserts) + 1):
+        if end == len(upserts) or (filled[end] != filled[start]).any():
+            run = upserts.iloc[start:end].loc[:, filled[start]]
+            yield data_loader.apply_wbs_schema(run)
+            start = end
+
+
+def merge_wbs_upserts(master: pd.DataFrame, upserts: pd.DataFrame) -> pd.DataFrame:
+    """Apply raw upsert rows (as read from an upsert file) to the master."""
+    for run in upsert_runs(upserts):
+        master = _merge_typed_upserts(master, run)
+    return master
+
+
+def _merge_typed_upserts(master: pd.DataFrame, upserts: pd.DataFrame) -> pd.DataFrame:
+    """Update known wells in place (given columns only), append new wells."""
+    upserts = upserts.drop_duplicates("wbs_element", keep="last")
+    positions = pd.Index(master["wbs_element"]).get_indexer(upserts["wbs_element"])
+    is_new = positions < 0
+    new_rows = upserts[is_new]
+    missing = [c for c in master.columns if c not in upserts.columns]
+    if len(new_rows) and missing:
+        raise ValueError(f"Upsert rows for new wells are missing columns: {missing}")
+
+    merged, upserts = _align_categories(master, upserts)
+    known = positions[~is_new]
+    if len(known):
+        for col in upserts.columns.drop("wbs_element").intersection(merged.columns):
+            merged.iloc[known, merged.columns.get_loc(col)] = upserts.loc[~is_new, col].to_numpy()
+    if len(new_rows):
+        merged = pd.concat([merged, upserts.loc[is_new, merged.columns]], ignore_index=True)
+    return merged
+
+
+def merge_wbs_deletes(master: pd.DataFrame, deletes: pd.DataFrame) -> pd.DataFrame:
+    keep = ~master["wbs_element"].isin(deletes["wbs_element"])
+    if keep.all():
+        return master
+    return master[keep].reset_index(drop=True)
+
+
+def merge_schedule_changes(sched: pd.DataFrame, changes: pd.DataFrame) -> pd.DataFrame:
+    """Replace the (wbs_element, planned_phase) rows named in changes."""
+    changes = changes.drop_duplicates(["wbs_element", "planned_phase"], keep="last")
+    sched, changes = _align_categories(sched, changes)
+    keys = pd.MultiIndex.from_frame(changes[["wbs_element", "planned_phase"]].astype(str))
+    current = pd.MultiIndex.from_frame(sched[["wbs_element", "planned_phase"]].astype(str))
+    kept = sched[~current.isin(keys)]
+    added = changes[changes["planned_date"].notna()]
+    return pd.concat([kept, added[sched.columns]], ignore_index=True)
+
+
+def apply_delta(kind: str, master_or_sched: pd.DataFrame, delta: pd.DataFrame) -> pd.DataFrame:
+    """Apply one parsed delta file to the frame it targets."""
+    if kind == "upsert":
+        return merge_wbs_upserts(master_or_sched, delta)
+    if kind == "delete":
+        return merge_wbs_deletes(master_or_sched, delta)
+    return merge_schedule_changes(master_or_sched, delta)
+
+
+def replay_deltas(target: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Re-apply the applied deltas for a base CSV on a cold load."""
+    for path in applied_deltas(target):
+        df = apply_delta(delta_kind(path), df, read_delta(path))
+    return df
+
+
+class NetWbsDelta:
+    """Net effect of the applied WBS deltas, for the chunked reader.
+
+    The streaming path never holds the whole master, so instead of merging
+    file by file it folds the deltas into per-well column patches and applies
+    them to each chunk, then yields wells that were not in the base extract
+    as a final chunk.  Row order matches the in-memory merge: a well removed
+    and later re-added moves to the end.
+    """
+
+    def __init__(self, deltas):
+        self.patches = {}      # wbs_element -> {column: value} since its last delete
+        self.created = {}      # wbs_element -> sequence of the upsert that (re)created it
+        self.dropped = set()   # wells whose base row is gone (deleted at some point)
+        self.deleted = set()   # wells deleted by the last delta touching them
+        seq = 0
+        for kind, delta in deltas:
+            if kind == "delete":
+                for well in delta["wbs_element"].tolist():
+                    self.patches.pop(well, None)
+                    self.created.pop(well, None)
+                    self.dropped.add(well)
+                    self.deleted.add(well)
+                continue
+            records = [rec for run in upsert_runs(delta)
+                       for rec in run.to_dict(orient="records")]
+            for rec in records:
+                well = rec["wbs_element"]
+                seq += 1
+                self.deleted.discard(well)
+                if well not in self.patches:
+                    self.patches[well] = {}
+                    self.created[well] = seq
+                self.patches[well].update(rec)
+
+    @classmethod
+    def applied(cls) -> "NetWbsDelta":
+        return cls([(delta_kind(p), read_delta(p)) for p in applied_deltas("wbs_master.csv")])
+
+    def __bool__(self):
+        return bool(self.patches or self.dropped)
+
+    def apply_to_chunk(self, chunk: pd.DataFrame, seen: set) -> pd.DataFrame:
+        """Patch one base chunk; adds the patched wells it contained to seen."""
+        chunk = chunk[~chunk["wbs_element"].isin(self.dropped)]
+        hits = [w for w in chunk["wbs_element"].tolist() if w in self.patches]
+        seen.update(hits)
+        # One merge per distinct column set so partial patches don't null out
+        # columns they don't carry
+        by_columns = {}
+        for well in hits:
+            by_columns.setdefault(tuple(self.patches[well]), []).append(self.patches[well])
+        for columns, records in by_columns.items():
+            chunk = _merge_typed_upserts(chunk, pd.DataFrame(records, columns=list(columns)))
+        return chunk.reset_index(drop=True)
+
+    def tail(self, seen: set, columns) -> pd.DataFrame:
+        """Wells added by the deltas (not patched into any base chunk)."""
+        wells = sorted(
+            (w for w in self.patches if w not in seen and w not in self.deleted),
+            key=self.created.__getitem__,
+        )
+        records = [self.patches[w] for w in wells]
+        missing = {c for rec in records for c in columns if c not in rec}
+        if missing:
+            raise ValueError(f"Upsert rows for new wells are missing columns: {sorted(missing)}")
+        frame = pd.DataFrame(records, columns=list(columns))
+        return frame.astype({c: data_loader.WBS_SCHEMA[c] for c in columns
+                             if c in data_loader.WBS_SCHEMA})
+
+
+def ingest_deltas() -> IngestReport:
+    """Merge pending delta files into the loaded data and report what changed."""
+    files = pending_deltas()
+    if not files:
+        return IngestReport([], [], [], [], [])
+
+    master = before = data_loader.load_wbs_master()
+    sched = data_loader.load_drill_schedule()
+    touched = {}
+    deleted = set()
+    schedule_changed = {}
+    for path in files:
+        kind = delta_kind(path)
+        delta = read_delta(path)
+        wells = dict.fromkeys(delta["wbs_element"].tolist())
+        if kind == "schedule":
+            sched = apply_delta(kind, sched, delta)
+            schedule_changed.update(wells)
+            continue
+        master = apply_delta(kind, master, delta)
+        touched.update(wells)
+        if kind == "delete":
+            deleted.update(wells)
+
+    wells = list(touched)
+    was_present = pd.Index(before["wbs_element"]).get_indexer(wells) >= 0
+    is_present = pd.Index(master["wbs_element"]).get_indexer(wells) >= 0
+    moved = [w in deleted for w in wells]
+    rows = list(zip(wells, was_present, is_present, moved))
+    report = IngestReport(
+        files=[p.name for p in files],
+        updated=[w for w, was, now, m in rows if was and now and not m],
+        added=[w for w, was, now, m in rows if now and (m or not was)],
+        removed=[w for w, was, now, m in rows if was and (m or not now)],
+        schedule_changed=list(schedule_changed),
+    )
+
+    _archive(files)
+    # The data version has moved on; seed the loaders with the merged frames
+    data_loader.store_merged(master, sched)
+    return report
+
+
+def _archive(files: list) -> None:
+    """Move applied files out of the inbox, numbered so replay keeps their order."""
+    applied = applied_dir()
+    applied.mkdir(parents=True, exist_ok=True)
+    seq = len([p for p in applied.iterdir() if delta_kind(p)])
+    for path in files:
+        seq += 1
+        target = applied / f"{seq:06d}-{path.name}"
+        os.replace(path, target)
+        # Stamp with the apply time: replay skips deltas older than the base CSV
+        os.utime(target)
+    data_loader.bump_generation()
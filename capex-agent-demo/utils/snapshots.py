@@ -0,0 +1,211 @@
+"""Period-partitioned snapshot store for accrual history.
+
+Each closed period is written once as its own Parquet file under
+DATA_DIR/snapshots (e.g. 2025-12.parquet) holding one row per wbs_element
+with the period's accruals in int64 cents.  Snapshots are read through
+versioned caches keyed on the store's file listing, with a hash index per
+period, so:
+
+- lookup_accrual(period, wbs_element) is a dictionary lookup after the
+  first read of that period;
+- load_accrual_history(periods, wbs_elements) gathers N periods into one
+  wells x periods array aligned with the given well order (e.g. the master
+  rows), NaN where a well has no snapshot row;
+- prior_accrual_cents(period, wbs_elements) gives a prior_gross_accrual
+  column for any earlier period, which is how the Large Swing check compares
+  against a period other than the one baked into wbs_master.csv.
+
+The store needs pyarrow (in requirements.txt).
+"""
+
+import os
+import re
+from collections import namedtuple
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from utils import data_loader
+from utils.cache import versioned_cache
+
+SNAPSHOT_DIRNAME = "snapshots"
+
+PERIOD_PATTERN = re.compile(r"^\d{4}-(0[1-9]|1[0-2])$")
+
+SNAPSHOT_COLUMNS = (
+    [f"{cat}_gross_accrual" for cat in ("drill", "comp", "fb", "hu")]
+    + ["total_gross_accrual", "total_net_accrual"]
+)
+
+AccrualHistory = namedtuple("AccrualHistory", ["index", "periods", "values"])
+AccrualHistory.__doc__ = """Accruals for N periods aligned to a list of wells.
+
+index: wbs_element per row; periods: period labels per column; values:
+rows x periods float64 dollars (NaN where the well has no snapshot row).
+"""
+
+
+def snapshot_dir() -> Path:
+    return data_loader.DATA_DIR / SNAPSHOT_DIRNAME
+
+
+def _check_period(period: str) -> str:
+    if not isinstance(period, str) or not PERIOD_PATTERN.match(period):
+        raise ValueError(f"Period must look like 'YYYY-MM', got {period!r}")
+    return period
+
+
+def period_start(period: str) -> date:
+    """First day of a 'YYYY-MM' period."""
+    year, month = _check_period(period).split("-")
+    return date(int(year), int(month), 1)
+
+
+def previous_period(period: str) -> str:
+    start = period_start(period)
+    year, month = (start.year, start.month - 1) if start.month > 1 else (start.year - 1, 12)
+    return f"{year:04d}-{month:02d}"
+
+
+def snapshot_path(period: str) -> Path:
+    return snapshot_dir() / f"{_check_period(period)}.parquet"
+
+
+_writes = 0  # snapshots written by this process
+
+
+def _note_write() -> None:
+    global _writes
+    _writes += 1
+
+
+def snapshot_version() -> tuple:
+    """Fingerprint of the store: (name, mtime_ns, size) per snapshot file.
+
+    Led by the count of snapshots written in this process, so a rewrite
+    within the filesystem's mtime resolution is still a new version.
+    """
+    directory = snapshot_dir()
+    if not directory.is_dir():
+        return (str(directory), _writes)
+    entries = []
+    for path in sorted(directory.glob("*.parquet")):
+        stat = path.stat()
+        entries.append((path.name, stat.st_mtime_ns, stat.st_size))
+    return (str(directory), _writes, *entries)
+
+
+def prior_period_version(arguments: dict):
+    """versioned_cache arg_version for calls taking a prior_period.
+
+    The store is not part of data_version(), so a call that reads a
+    snapshot also keys on snapshot_version(); calls without a prior_period
+    do not touch the store and skip the directory scan.
+    """
+    return snapshot_version() if arguments.get("prior_period") else None
+
+
+def _require_pyarrow():
+    if data_loader.pq is None:
+        raise ImportError("The snapshot store needs pyarrow (pip install pyarrow)")
+
+
+def list_periods() -> list:
+    """Snapshotted periods, oldest first."""
+    return [name.removesuffix(".parquet") for name, *_ in snapshot_version()[2:]]
+
+
+def write_snapshot(period: str, cf: pd.DataFrame) -> Path:
+    """Store a close frame's accruals as the snapshot for period.
+
+    cf is a close frame (agent.engine.build_close_frame, money in dollars).
+    Rewriting an existing period replaces it.
+    """
+    _require_pyarrow()
+    path = snapshot_path(period)
+    snap = pd.DataFrame({
+        "wbs_element": cf["wbs_element"].astype("string").to_numpy(),
+        "business_unit": cf["business_unit"].astype("string").to_numpy(),
+        **{c: data_loader.to_cents(cf[c].reset_index(drop=True)) for c in SNAPSHOT_COLUMNS},
+    })
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+    snap.to_parquet(tmp_path, engine="pyarrow", index=False)
+    os.replace(tmp_path, path)
+    # Only results keyed on the store (prior_period_version) are stale now;
+    # the source data did not change, so data_version() stays put
+    _note_write()
+    return path
+
+
+@versioned_cache(snapshot_version, maxsize=24)
+def load_snapshot(period: str) -> pd.DataFrame:
+    """One period's snapshot (money in cents)."""
+    _require_pyarrow()
+    path = snapshot_path(period)
+    if not path.exists():
+        raise KeyError(f"No snapshot for period {period}")
+    return pd.read_parquet(path, engine="pyarrow")
+
+
+@versioned_cache(snapshot_version, maxsize=24)
+def _snapshot_index(period: str) -> dict:
+    return {w: i for i, w in enumerate(load_snapshot(period)["wbs_element"].tolist())}
+
+
+def lookup_accrual(period: str, wbs_element: str,
+                   column: str = "total_gross_accrual") -> float | None:
+    """A well's accrual (dollars) in a snapshotted period, or None if absent."""
+    position = _snapshot_index(period).get(wbs_element)
+    if position is None:
+        return None
+    return int(load_snapshot(period)[column].iloc[position]) / 100
+
+
+def _aligned_cents(period: str, index: pd.Index, column: str):
+    snap = load_snapshot(period)
+    positions = pd.Index(snap["wbs_element"]).get_indexer(index)
+    found = positions >= 0
+    values = np.zeros(len(index), dtype=np.int64)
+    values[found] = snap[column].to_numpy()[positions[found]]
+    return values, found
+
+
+def load_accrual_history(periods, wbs_elements,
+                         column: str = "total_gross_accrual") -> AccrualHistory:
+    """Gather N periods of one accrual column into a wells x periods array."""
+    index = pd.Index(wbs_elements)
+    periods = [_check_period(p) for p in periods]
+    values = np.full((len(index), len(periods)), np.nan)
+    for j, period in enumerate(periods):
+        cents, found = _aligned_cents(period, index, column)
+        values[found, j] = cents[found] / 100
+    values.flags.writeable = False
+    return AccrualHistory(index, periods, values)
+
+
+def prior_accrual_cents(period: str, wbs_elements) -> np.ndarray:
+    """A prior_gross_accrual column (int64 cents) taken from a snapshot.
+
+    Wells with no row in that period get 0, which the close kernel treats as
+    "no prior" (no Large Swing).
+    """
+    cents, found = _aligned_cents(period, pd.Index(wbs_elements), "total_gross_accrual")
+    return np.where(found, cents, 0).astype(np.int64)
+
+
+def with_prior_period(df: pd.DataFrame, period: str | None) -> pd.DataFrame:
+    """WBS master frame whose prior_gross_accrual comes from a snapshot period.
+
+    period=None returns df unchanged (the prior column from wbs_master.csv).
+    """
+    if period is None:
+        return df
+    return df.assign(prior_gross_accrual=prior_accrual_cents(period, df["wbs_element"]))
+
+
+def clear_caches():
+    load_snapshot.cache_clear()
+    _snapshot_index.cache_clear()